@@ -0,0 +1,151 @@
+# benchmarks/load.py
+"""
+HTTP load test against src.api.main:app in SIM_MODE=1, plus tick-loop jitter.
+
+The server runs in-process (uvicorn in a thread) so a tick listener can
+timestamp every simulated tick; the load generators run in separate
+processes so their CPU use doesn't share the server's GIL.
+"""
+import http.client
+import multiprocessing
+import threading
+import time
+from typing import Any, Dict, List
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": round(pick(0.50), 3),
+        "p90": round(pick(0.90), 3),
+        "p99": round(pick(0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def _request(conn: http.client.HTTPConnection, method: str, path: str) -> float:
+    start = time.perf_counter()
+    conn.request(method, path)
+    response = conn.getresponse()
+    response.read()
+    if response.status >= 400:
+        raise RuntimeError(f"{method} {path} -> {response.status}")
+    return (time.perf_counter() - start) * 1000.0
+
+
+def _poller(port: int, deadline: float, latencies: List[float], errors: List[str]):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    while time.perf_counter() < deadline:
+        try:
+            latencies.append(_request(conn, "GET", "/data"))
+        except Exception as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.close()
+
+
+def _cycler(port: int, deadline: float, out: Dict[str, List[float]], errors: List[str], period: float):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    while time.perf_counter() < deadline:
+        for path in ("/start", "/stop"):
+            try:
+                out[path].append(_request(conn, "POST", path))
+            except Exception as e:
+                errors.append(str(e))
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            time.sleep(period / 2)
+    conn.close()
+
+
+def _client_process(port: int, duration: float, threads: int, cycle: bool, cycle_period: float, results):
+    deadline = time.perf_counter() + duration
+    data_latencies: List[float] = []
+    cycle_latencies: Dict[str, List[float]] = {"/start": [], "/stop": []}
+    errors: List[str] = []
+    workers = [threading.Thread(target=_poller, args=(port, deadline, data_latencies, errors)) for _ in range(threads)]
+    if cycle:
+        workers.append(threading.Thread(target=_cycler, args=(port, deadline, cycle_latencies, errors, cycle_period)))
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put({"/data": data_latencies, **cycle_latencies, "errors": errors})
+
+
+class _TickProbe:
+    def __init__(self):
+        self.ticks: List[float] = []
+
+    def __call__(self, now: float):
+        self.ticks.append(time.perf_counter())
+
+    def lateness_ms(self, since: int, nominal: float) -> List[float]:
+        ticks = self.ticks[since:]
+        return [((b - a) - nominal) * 1000.0 for a, b in zip(ticks, ticks[1:])]
+
+
+def run_load(duration: float, clients: int, procs: int, idle: float, port: int, cycle_period: float) -> Dict[str, Any]:
+    import uvicorn
+
+    from src.api import ble_runner, main
+
+    probe = _TickProbe()
+    ble_runner.add_tick_listener(probe)
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    nominal = ble_runner.SIM_TICK_SECONDS
+    idle_start = len(probe.ticks)
+    time.sleep(idle)
+    idle_lateness = probe.lateness_ms(idle_start, nominal)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    per_proc = max(1, clients // procs)
+    processes = [
+        ctx.Process(target=_client_process, args=(port, duration, per_proc, i == 0, cycle_period, results))
+        for i in range(procs)
+    ]
+    load_start = len(probe.ticks)
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    load_lateness = probe.lateness_ms(load_start, nominal)
+
+    server.should_exit = True
+    thread.join(timeout=10)
+    ble_runner.remove_tick_listener(probe)
+
+    endpoints: Dict[str, Any] = {}
+    for path in ("/data", "/start", "/stop"):
+        latencies = [value for result in collected for value in result[path]]
+        endpoints[path] = {**percentiles(latencies), "rps": round(len(latencies) / duration, 1)}
+
+    return {
+        "duration_s": duration,
+        "clients": per_proc * procs,
+        "processes": procs,
+        "endpoints_ms": endpoints,
+        "errors": sum(len(result["errors"]) for result in collected),
+        "tick_lateness_ms": {
+            "nominal_tick_s": nominal,
+            "idle": percentiles(idle_lateness),
+            "under_load": percentiles(load_lateness),
+        },
+    }
@@ -0,0 +1,169 @@
+# benchmarks/micro.py
+"""
+Microbenchmarks for the hot paths: PM5 notification decoding and handling,
+tick history, task unlock lookup, live-view publishing, session persistence
+and the caller side of logging.
+"""
+import asyncio
+import logging
+import os
+import queue
+import tempfile
+import time
+import timeit
+from typing import Any, Callable, Dict
+
+
+def _per_call(fn: Callable[[], Any], number: int, repeat: int = 5) -> Dict[str, float]:
+    timings = timeit.repeat(fn, number=number, repeat=repeat)
+    best = min(timings) / number
+    return {"best_us": round(best * 1e6, 3), "calls": number, "repeat": repeat}
+
+
+def bench_notification_handler(number: int = 20000) -> Dict[str, float]:
+    from src.api import ble_runner
+    from src.api.replay import build_power_packet
+
+    device = ble_runner.ErgDevice("bench")
+    device.on_connect(ble_runner._now_mono())
+    packet = build_power_packet(180)
+    return _per_call(lambda: device.notification_handler(None, packet), number)
+
+
+def bench_pm5_decode(number: int = 50000) -> Dict[str, Any]:
+    """Decode cost per notification for each multiplexed packet type and for a synthetic ride's stream."""
+    from src.api import pm5
+    from src.api.replay import synthesize_trace
+
+    values = {"elapsed": 600.0, "distance": 2500.0, "stroke_power": 180, "stroke_rate": 28, "pace": 120.0,
+              "total_calories": 90, "stroke_count": 300}
+    results: Dict[str, Any] = {}
+    for char_id in pm5.MULTIPLEXED_BY_ID:
+        packet = pm5.encode_multiplexed(char_id, **values)
+        results[f"0x{char_id:02x}"] = _per_call(lambda packet=packet: pm5.decode_multiplexed(packet), number)
+
+    packets = [payload for _, payload in synthesize_trace(600.0, cadence=30.0)]
+    decode = pm5.decode_multiplexed
+
+    def decode_stream():
+        for packet in packets:
+            decode(packet)
+
+    stream = _per_call(decode_stream, max(1, number // len(packets)))
+    results["stream"] = {"packets": len(packets), "best_us": round(stream["best_us"] / len(packets), 3)}
+    return results
+
+
+def bench_tick(number: int = 20000) -> Dict[str, float]:
+    from src.api import ble_runner
+
+    device = ble_runner.ErgDevice("bench")
+    device.on_connect(ble_runner._now_mono())
+    now = ble_runner._now_mono()
+    return _per_call(lambda: device.tick(now, ble_runner.TICK_SECONDS, True), number)
+
+
+def bench_history(number: int = 20000) -> Dict[str, Any]:
+    from src.api.live_history import HISTORY_CAPACITY, TickHistory
+
+    history = TickHistory()
+    for i in range(HISTORY_CAPACITY):
+        history.append(float(i), 0.0, 150.0, 80.0, 1)
+    return {
+        "append": _per_call(lambda: history.append(1.0, 0.0, 150.0, 80.0, 1), number),
+        "delta_encode": _per_call(lambda: history.since(history.next_seq - 5).encode(), number),
+        "full_backfill_encode": _per_call(lambda: history.since(0).encode(), 200),
+    }
+
+
+def bench_unlocked_tasks(number: int = 50000) -> Dict[str, Any]:
+    from src.api import main
+
+    index = main.get_task_catalog().index
+    energy = index.thresholds[len(index.thresholds) // 2]
+    return {
+        "get_unlocked_tasks": _per_call(lambda: main.get_unlocked_tasks(energy), number),
+        "get_current_level": _per_call(lambda: main.get_current_level(energy), number),
+    }
+
+
+def bench_publish_live(number: int = 5000) -> Dict[str, float]:
+    from src.api import main
+
+    return _per_call(main.publish_live, number)
+
+
+def bench_session_persistence(sessions: int = 200) -> Dict[str, float]:
+    from src.api.session_store import SessionStore
+    from src.api.session_writer import SessionWriter
+
+    snapshot = {
+        "elapsed_time": 300,
+        "distance_meters": 2500,
+        "energy_kwh": 0.012,
+        "energy_kwh_display": 0.012,
+        "tasks_unlocked": ["a", "b", "c", "d", "e"],
+        "unlocked_count": 5,
+        "current_level": 5,
+        "total_tasks": 6,
+        "sim_mode": True,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, "sessions.sqlite3"))
+        writer = SessionWriter(tmp, store)
+
+        async def submit_all():
+            start = time.perf_counter()
+            for i in range(sessions):
+                await writer.submit({**snapshot, "stopped_at": f"2026-01-01T12:00:{i % 60:02d}"})
+            return time.perf_counter() - start
+
+        submit_s = asyncio.run(submit_all())
+        start = time.perf_counter()
+        writer.close(timeout=60)
+        drain_s = time.perf_counter() - start
+
+    return {
+        "sessions": sessions,
+        "submit_us_per_session": round(submit_s / sessions * 1e6, 3),
+        "durable_ms_per_session": round((submit_s + drain_s) / sessions * 1e3, 3),
+    }
+
+
+def bench_logging(number: int = 20000) -> Dict[str, Any]:
+    """What a logger call costs the event loop: filter + enqueue (the listener thread is not timed)."""
+    from src.api.logs import NonBlockingQueueHandler, RepeatFilter, setup_logging
+
+    setup_logging("bench")
+
+    def make_logger(name: str, window: float) -> logging.Logger:
+        log = logging.getLogger(f"bench.{name}")
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        handler = NonBlockingQueueHandler(queue.SimpleQueue())
+        handler.addFilter(RepeatFilter(window))
+        log.handlers = [handler]
+        return log
+
+    emitted = make_logger("emitted", 0)
+    folded = make_logger("folded", 3600)
+    lateness = {"loop": "sim", "lateness_ms": 12.5}
+    return {
+        "enqueued": _per_call(lambda: emitted.info("tick late by %.1f ms", 12.5, extra=lateness), number),
+        "suppressed_repeat": _per_call(lambda: folded.info("PM5 not found, retrying in %ss", 5), number),
+        "below_level": _per_call(lambda: emitted.debug("notification %s", 0x31), number),
+    }
+
+
+def run_all() -> Dict[str, Any]:
+    return {
+        "notification_handler": bench_notification_handler(),
+        "pm5_decode": bench_pm5_decode(),
+        "device_tick": bench_tick(),
+        "tick_history": bench_history(),
+        "task_lookup": bench_unlocked_tasks(),
+        "publish_live": bench_publish_live(),
+        "session_persistence": bench_session_persistence(),
+        "logging": bench_logging(),
+    }
@@ -0,0 +1,131 @@
+# benchmarks/run.py
+"""
+Reproducible benchmark run for the backend; results are written as JSON so
+runs from different commits can be compared.
+
+    python -m benchmarks.run                      # load test + microbenchmarks
+    python -m benchmarks.run --skip-load          # microbenchmarks + cold start + session stress only
+    python -m benchmarks.run --compare OLD.json NEW.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+
+
+def _git_sha() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _flatten(prefix: str, value: Any, out: Dict[str, float]):
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, inner, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = float(value)
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    old_flat: Dict[str, float] = {}
+    new_flat: Dict[str, float] = {}
+    _flatten("", old.get("results", {}), old_flat)
+    _flatten("", new.get("results", {}), new_flat)
+
+    print(f"{'metric':60} {old.get('git_sha', '?'):>12} {new.get('git_sha', '?'):>12} {'change':>9}")
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        a, b = old_flat[key], new_flat[key]
+        change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+        print(f"{key:60} {a:12.3f} {b:12.3f} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend benchmark suite")
+    parser.add_argument("--duration", type=float, default=10.0, help="load phase length (s)")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent /data pollers")
+    parser.add_argument("--procs", type=int, default=2, help="load generator processes")
+    parser.add_argument("--idle", type=float, default=3.0, help="idle tick-jitter baseline (s)")
+    parser.add_argument("--cycle-period", type=float, default=1.0, help="seconds per /start+/stop cycle")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-startup", action="store_true")
+    parser.add_argument("--skip-stress", action="store_true")
+    parser.add_argument("--stress-cycles", type=int, default=5000, help="start/stop cycles in the session stress test")
+    parser.add_argument("--output", default=str(RESULTS_DIR))
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    os.environ["SIM_MODE"] = "1"
+    output_dir = Path(args.output).resolve()
+    sys.path.insert(0, str(REPO_DIR))
+
+    # The app writes session_logs/ relative to the working directory
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        results: Dict[str, Any] = {}
+        if not args.skip_startup:
+            from benchmarks.startup import run_startup
+
+            print("⏱️ Measuring cold start (time to first 200 on /)...")
+            results["startup"] = run_startup(port=args.port + 1)
+        if not args.skip_stress:
+            from benchmarks.session_stress import run_session_stress
+
+            print(f"⏱️ Running session start/stop stress test ({args.stress_cycles} cycles)...")
+            results["session_stress"] = run_session_stress(args.stress_cycles)
+        if not args.skip_micro:
+            from benchmarks.micro import run_all
+
+            print("⏱️ Running microbenchmarks...")
+            results["micro"] = run_all()
+        if not args.skip_load:
+            from benchmarks.load import run_load
+
+            print(f"⏱️ Running load test ({args.clients} clients, {args.duration:.0f}s)...")
+            results["load"] = run_load(
+                args.duration, args.clients, args.procs, args.idle, args.port, args.cycle_period
+            )
+
+    sha = _git_sha()
+    report = {
+        "git_sha": sha,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {k: v for k, v in vars(args).items() if k != "compare"},
+        "results": results,
+    }
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{sha}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"📄 Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
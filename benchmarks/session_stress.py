@@ -0,0 +1,155 @@
+# benchmarks/session_stress.py
+"""
+Start/stop stress test for the session lifecycle in SIM_MODE=1.
+
+Calls main's /start and /stop handlers back to back on one event loop (no
+HTTP, so the lifecycle and the session-end pipeline are the bottleneck) and
+checks that:
+
+- every /start begins from zeroed metrics and every /stop yields one summary
+- a /stop without a running session is a no-op (nothing persisted)
+- no asyncio tasks leak and at most one cooldown timer is ever pending
+- a session started after the storm survives the old cooldowns
+- the last summary stays visible for the cooldown, then is cleared
+- every session gets its own trace file pair, even when several start within
+  the same second
+
+    python -m benchmarks.session_stress --cycles 5000
+
+Runs in a child process (the cooldown is read from the environment at import).
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+def _pending_cooldowns(loop, lifecycle_cls) -> int:
+    return sum(
+        1 for handle in getattr(loop, "_scheduled", ())
+        if not handle.cancelled() and getattr(handle._callback, "__func__", None) is lifecycle_cls._end_cooldown
+    )
+
+
+async def _stress(cycles: int, cooldown: float) -> Dict[str, Any]:
+    from src.api import acquisition, main
+    from src.api.session_lifecycle import SessionLifecycle
+
+    loop = asyncio.get_running_loop()
+    failures: List[str] = []
+
+    def check(ok: bool, message: str):
+        if not ok and len(failures) < 20:
+            failures.append(message)
+
+    async with main.lifespan(main.app):
+        await asyncio.sleep(0.5)
+        tasks_before = len(asyncio.all_tasks())
+        max_timers = 0
+        persisted = 0
+
+        start = time.perf_counter()
+        for i in range(cycles):
+            await main.start_session()
+            state = main.current_state()
+            check(state.session_active and state.energy_kwh == 0.0, f"cycle {i}: start not fresh: {state}")
+
+            result = await main.stop_session()
+            check(result["persistence"] is not None, f"cycle {i}: stop did not persist")
+            persisted += result["persistence"] is not None
+            check(not main.current_state().session_active, f"cycle {i}: still active after stop")
+
+            if i % 10 == 0:
+                again = await main.stop_session()
+                check(again["persistence"] is None, f"cycle {i}: second stop persisted")
+                max_timers = max(max_timers, _pending_cooldowns(loop, SessionLifecycle))
+            if i % 100 == 0:
+                # Let the sim loop and the live view run now and then
+                await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+
+        tasks_after = len(asyncio.all_tasks())
+        check(tasks_after <= tasks_before, f"tasks leaked: {tasks_before} -> {tasks_after}")
+        check(max_timers <= 1, f"{max_timers} cooldown timers pending at once")
+
+        # A new session outlives every earlier cooldown
+        await main.start_session()
+        main.acquisition.refresh()
+        await asyncio.sleep(cooldown * 3)
+        state = main.current_state()
+        check(state.session_active and state.elapsed > cooldown, f"session cleared by an old timer: {state}")
+        check(main.get_last_session_snapshot() == {}, "stale summary visible during a session")
+
+        # Its summary is visible during the cooldown and gone after it
+        await main.stop_session()
+        check(main.get_last_session_snapshot().get("elapsed_time") is not None, "summary missing after stop")
+        await asyncio.sleep(cooldown * 0.5)
+        check(bool(main.get_last_session_snapshot()), "summary cleared before the cooldown ended")
+        await asyncio.sleep(cooldown)
+        main.acquisition.refresh()
+        check(main.get_last_session_snapshot() == {}, "summary not cleared after the cooldown")
+        check(main.current_state().energy_kwh == 0.0, "metrics not reset after the cooldown")
+        check(main.acquisition.info.get("session_state") == "idle", "lifecycle not idle after the cooldown")
+
+    # Leaving the lifespan drained the trace writer: one pair per session (the storm plus the last one)
+    trace_pairs = len(glob.glob(os.path.join(acquisition.TRACE_DIR, "*.notify.bin")))
+    check(trace_pairs == cycles + 1, f"{trace_pairs} trace files for {cycles + 1} sessions")
+
+    return {
+        "cycles": cycles,
+        "cycles_per_s": round(cycles / elapsed, 1),
+        "us_per_cycle": round(elapsed / cycles * 1e6, 1),
+        "persisted": persisted,
+        "tasks_before": tasks_before,
+        "tasks_after": tasks_after,
+        "max_pending_cooldowns": max_timers,
+        "trace_pairs": trace_pairs,
+        "failures": failures,
+        "ok": not failures,
+    }
+
+
+def run_session_stress(cycles: int = 5000, cooldown: float = 0.3) -> Dict[str, Any]:
+    env = {
+        **os.environ,
+        "SIM_MODE": "1",
+        "PYTHONPATH": str(REPO_DIR),
+        "SESSION_COOLDOWN_SEC": str(cooldown),
+        "TASKS_WATCH": "0",
+        "ACQUISITION": "local",
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.session_stress", "--child", "--cycles", str(cycles),
+             "--cooldown", str(cooldown)],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True, timeout=600,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session start/stop stress test")
+    parser.add_argument("--cycles", type=int, default=5000)
+    parser.add_argument("--cooldown", type=float, default=0.3, help="SESSION_COOLDOWN_SEC for the run")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_stress(args.cycles, args.cooldown))))
+        return
+    results = run_session_stress(args.cycles, args.cooldown)
+    print(json.dumps(results, indent=2))
+    raise SystemExit(0 if results["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/startup.py
+"""
+Cold-start benchmark: time from a fresh interpreter to the first 200 on GET /
+in SIM_MODE=1. Every run is a new process, so import caches don't carry over.
+
+    python -m benchmarks.startup --runs 5
+
+FastAPI/uvicorn's own import time is reported separately (framework_import_ms);
+first_200_ms covers everything after it: importing src.api.main, the lifespan
+startup and the first request. The target is first_200_ms < 300 ms.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from benchmarks.load import percentiles
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+TARGET_FIRST_200_MS = 300.0
+
+
+def _child(port: int):
+    t0 = time.perf_counter()
+    import fastapi  # noqa: F401
+    import uvicorn
+
+    t_framework = time.perf_counter()
+    from src.api import main
+
+    t_import = time.perf_counter()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+
+    status = None
+    while status != 200:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            status = conn.getresponse().status
+            conn.close()
+        except OSError:
+            time.sleep(0.002)
+    t_ready = time.perf_counter()
+
+    print(json.dumps({
+        "framework_import_ms": (t_framework - t0) * 1000.0,
+        "app_import_ms": (t_import - t_framework) * 1000.0,
+        "first_200_ms": (t_ready - t_framework) * 1000.0,
+        "process_first_200_ms": (t_ready - t0) * 1000.0,
+    }))
+    server.should_exit = True
+
+
+def run_startup(runs: int = 5, port: int = 8766) -> Dict[str, Any]:
+    env = {**os.environ, "SIM_MODE": "1", "PYTHONPATH": str(REPO_DIR)}
+    samples: Dict[str, list] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startup", "--child", "--port", str(port)],
+                cwd=workdir, env=env, capture_output=True, text=True, check=True, timeout=60,
+            )
+            for key, value in json.loads(out.stdout.strip().splitlines()[-1]).items():
+                samples.setdefault(key, []).append(value)
+
+    results: Dict[str, Any] = {key: percentiles(values) for key, values in samples.items()}
+    results["target_first_200_ms"] = TARGET_FIRST_200_MS
+    results["within_target"] = results["first_200_ms"]["p50"] < TARGET_FIRST_200_MS
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.port)
+        return
+    print(json.dumps(run_startup(args.runs, args.port), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ import {
 } from "@chakra-ui/react";
 import DashboardLayout from "./components/DashboardLayout";
 import { AI_TASKS } from "./constants/aiTasks";
+import { API_BASE } from "./constants/api";
 
 function App() {
   const [isRunning, setIsRunning] = useState(false);
@@ -24,6 +25,8 @@ function App() {
 
   const closedManuallyRef = useRef(false);
   const timeoutRef = useRef(null);
+  const liveRef = useRef(null);
+  const lastSnapshotAtRef = useRef(null);
   const toast = useToast();
 
   const TOTAL_TASKS = AI_TASKS.length;
@@ -68,60 +71,108 @@ function App() {
     return 0;
   };
 
+  const applyData = (d) => {
+    setData(d);
+
+    if (d.session_active) {
+      setStatus("Active");
+      setIsRunning(true);
+      setHistory((prev) => [
+        ...prev.slice(-29),
+        {
+          time: new Date().toLocaleTimeString(),
+          power: d.power_watts,
+          stroke: d.stroke_rate,
+        },
+      ]);
+      closedManuallyRef.current = false;
+      if (showSummary) setShowSummary(false);
+    } else {
+      setStatus("Inactive");
+      setIsRunning(false);
+      if (closedManuallyRef.current) return;
+
+      if (d.last_session_snapshot && d.last_session_snapshot.elapsed_time > 0) {
+        // Streamed deltas repeat the snapshot only when it changes, so this
+        // fires once per session end (polling fires it every second).
+        if (lastSnapshotAtRef.current === d.last_session_snapshot.stopped_at) return;
+        lastSnapshotAtRef.current = d.last_session_snapshot.stopped_at;
+
+        setLastSession(d.last_session_snapshot);
+        setShowSummary(true);
+
+        const unlocked = getUnlockedCountFromSnapshot(d.last_session_snapshot);
+        const displayEnergy = getDisplayEnergyFromSnapshot(d.last_session_snapshot);
+
+        const msg = `Session beendet. Energie: ${displayEnergy
+          .toFixed(4)
+          .replace(".", ",")} kWh • Aufgaben: ${unlocked} / ${TOTAL_TASKS}`;
+
+        dispatchAvatarTempMessage(msg, 30000);
+
+        clearTimeout(timeoutRef.current);
+        timeoutRef.current = setTimeout(() => {
+          setShowSummary(false);
+          setLastSession(null);
+        }, 30000);
+      }
+    }
+  };
+
   const fetchData = async () => {
     try {
-      const res = await axios.get("http://127.0.0.1:8080/data");
-      const d = res.data;
-      setData(d);
-
-      if (d.session_active) {
-        setStatus("Active");
-        setIsRunning(true);
-        setHistory((prev) => [
-          ...prev.slice(-29),
-          {
-            time: new Date().toLocaleTimeString(),
-            power: d.power_watts,
-            stroke: d.stroke_rate,
-          },
-        ]);
-        closedManuallyRef.current = false;
-        if (showSummary) setShowSummary(false);
-      } else {
-        setStatus("Inactive");
-        setIsRunning(false);
-        if (closedManuallyRef.current) return;
-
-        if (d.last_session_snapshot && d.last_session_snapshot.elapsed_time > 0) {
-          setLastSession(d.last_session_snapshot);
-          setShowSummary(true);
-
-          const unlocked = getUnlockedCountFromSnapshot(d.last_session_snapshot);
-          const displayEnergy = getDisplayEnergyFromSnapshot(d.last_session_snapshot);
-
-          const msg = `Session beendet. Energie: ${displayEnergy
-            .toFixed(4)
-            .replace(".", ",")} kWh • Aufgaben: ${unlocked} / ${TOTAL_TASKS}`;
-
-          dispatchAvatarTempMessage(msg, 30000);
-
-          clearTimeout(timeoutRef.current);
-          timeoutRef.current = setTimeout(() => {
-            setShowSummary(false);
-            setLastSession(null);
-          }, 30000);
-        }
-      }
+      const res = await axios.get(`${API_BASE}/data`);
+      applyData(res.data);
     } catch (error) {
       console.error("Error fetching data:", error);
     }
   };
 
   useEffect(() => {
-    fetchData();
-    const interval = setInterval(fetchData, 1000);
+    // Prefer the pushed stream (bootstrap + deltas at tick rate);
+    // fall back to 1 Hz polling if EventSource is unavailable.
+    if (typeof window.EventSource === "undefined") {
+      fetchData();
+      const interval = setInterval(fetchData, 1000);
+      return () => {
+        clearInterval(interval);
+        clearTimeout(timeoutRef.current);
+      };
+    }
+
+    const source = new EventSource(`${API_BASE}/stream`);
+
+    source.addEventListener("bootstrap", (event) => {
+      const { data: full } = JSON.parse(event.data);
+      liveRef.current = full;
+      applyData(full);
+    });
+
+    source.addEventListener("delta", (event) => {
+      const { changes } = JSON.parse(event.data);
+      liveRef.current = { ...liveRef.current, ...changes };
+      applyData(liveRef.current);
+
+      // The task config was edited on the server: fetch the new (immutable) version once.
+      if (changes.tasks_version) {
+        axios
+          .get(`${API_BASE}/tasks/${changes.tasks_version}`)
+          .then((res) => {
+            if (liveRef.current.tasks_version !== changes.tasks_version) return;
+            liveRef.current = { ...liveRef.current, ai_tasks: res.data };
+            applyData(liveRef.current);
+          })
+          .catch((error) => console.error("Error fetching tasks:", error));
+      }
+    });
+
+    source.onerror = (error) => {
+      // EventSource reconnects on its own and receives a fresh bootstrap.
+      console.error("Live stream error:", error);
+    };
+
     return () => {
-      clearInterval(interval);
+      source.close();
       clearTimeout(timeoutRef.current);
     };
   }, []);
@@ -138,7 +189,7 @@ function App() {
       return;
     }
     try {
-      await axios.post("http://127.0.0.1:8080/start");
+      await axios.post(`${API_BASE}/start`);
       setIsRunning(true);
       setStatus("Active");
       setShowSummary(false);
@@ -151,7 +202,7 @@ function App() {
 
   const handleStop = async () => {
     try {
-      await axios.post("http://127.0.0.1:8080/stop");
+      await axios.post(`${API_BASE}/stop`);
       setIsRunning(false);
       setStatus("Inactive");
     } catch (error) {
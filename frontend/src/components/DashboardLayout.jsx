@@ -43,6 +43,8 @@ function DashboardLayout({ metrics, onStart, onStop, sessionActive }) {
   const energy = metrics?.energy_kwh ?? 0;
   const power = metrics?.power_watts ?? 0;
   const stroke = metrics?.stroke_rate ?? 0;
+  // Rolling 3 s average from the backend; the chart no longer needs to smooth it
+  const smoothedPower = metrics?.power_avg_3s;
   const distance = metrics?.distance_meters ?? 0;
   const time = metrics?.elapsed_time ?? 0;
   const status = metrics?.connected ? "Verbunden" : "Nicht verbunden";
@@ -381,7 +383,11 @@ function DashboardLayout({ metrics, onStart, onStop, sessionActive }) {
               minH={0}
               overflow="hidden"
             >
-              <LineChartLive power={power} stroke={stroke} />
+              <LineChartLive
+                power={smoothedPower ?? power}
+                stroke={stroke}
+                alpha={smoothedPower === undefined ? undefined : 1}
+              />
             </Flex>
 
             <Box
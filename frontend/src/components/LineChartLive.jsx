@@ -11,6 +11,7 @@ import {
   Filler,
 } from "chart.js";
 import { Line } from "react-chartjs-2";
+import useHistoryBackfill from "../hooks/useHistoryBackfill";
 
 ChartJS.register(
   LineElement,
@@ -24,6 +25,8 @@ ChartJS.register(
 
 /**
  * Live line chart with smoothing + clean reset on session end.
+ * On mount the curve is backfilled from the backend's /history, so a reload
+ * or remount keeps the current session's chart.
  *
  * Props:
  * - power: number (instant power W)
@@ -54,6 +57,30 @@ function LineChartLive({
   const targetP = useRef(power || 0);
   const targetS = useRef(stroke || 0);
 
+  // Seed the series with the latest history, one point per tickMs like the ticker
+  useHistoryBackfill(({ t, power: p, cadence: s, session }) => {
+    const n = t.length;
+    if (n === 0) return;
+    const current = session[n - 1];
+    const seedLabels = [];
+    const seedP = [];
+    const seedS = [];
+    let lastT = Infinity;
+    for (let i = n - 1; i >= 0 && seedLabels.length < maxPoints; i--) {
+      if (current && session[i] !== current) break;
+      if ((lastT - t[i]) * 1000 < tickMs) continue;
+      lastT = t[i];
+      seedLabels.unshift(new Date(t[i] * 1000).toLocaleTimeString());
+      seedP.unshift(Math.max(0, p[i]));
+      seedS.unshift(Math.max(0, s[i]));
+    }
+    smoothP.current = seedP[seedP.length - 1];
+    smoothS.current = seedS[seedS.length - 1];
+    setLabels((prev) => [...seedLabels, ...prev].slice(-maxPoints));
+    setPSeries((prev) => [...seedP, ...prev].slice(-maxPoints));
+    setSSeries((prev) => [...seedS, ...prev].slice(-maxPoints));
+  });
+
   // Update targets whenever props change
   useEffect(() => {
     targetP.current = Number.isFinite(power) ? power : 0;
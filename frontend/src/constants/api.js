@@ -0,0 +1,6 @@
+// src/constants/api.js
+
+// The production build is served by the backend itself (same origin);
+// the Vite dev server talks to the backend on :8080.
+export const API_BASE =
+  import.meta.env.VITE_API_BASE ?? (import.meta.env.DEV ? "http://127.0.0.1:8080" : "");
@@ -0,0 +1,62 @@
+import { useEffect, useRef } from "react";
+import axios from "axios";
+import { API_BASE } from "../constants/api";
+
+// /history binary layout (see src/api/live_history.py):
+// u64 first_seq, u64 next_seq, u32 count, u32 capacity, then the columns
+// f64 t, f64 energy_kwh, f32 power, f32 cadence, u32 session.
+const HEADER_BYTES = 24;
+
+export function parseHistory(buffer) {
+  const view = new DataView(buffer);
+  const firstSeq = Number(view.getBigUint64(0, true));
+  const nextSeq = Number(view.getBigUint64(8, true));
+  const count = view.getUint32(16, true);
+
+  let offset = HEADER_BYTES;
+  const column = (ArrayType) => {
+    const values = new ArrayType(buffer, offset, count);
+    offset += count * ArrayType.BYTES_PER_ELEMENT;
+    return values;
+  };
+
+  return {
+    firstSeq,
+    nextSeq,
+    t: column(Float64Array),
+    energy: column(Float64Array),
+    power: column(Float32Array),
+    cadence: column(Float32Array),
+    session: column(Uint32Array),
+  };
+}
+
+/** Samples with sequence numbers >= since (pass the previous nextSeq for a delta). */
+export async function fetchHistory(since = 0) {
+  const res = await axios.get(`${API_BASE}/history`, {
+    params: { since },
+    responseType: "arraybuffer",
+  });
+  return parseHistory(res.data);
+}
+
+/**
+ * Calls onHistory once with the backend's tick history when the component
+ * mounts, so charts survive reloads and screensaver wake-ups.
+ */
+export default function useHistoryBackfill(onHistory) {
+  const onHistoryRef = useRef(onHistory);
+  useEffect(() => { onHistoryRef.current = onHistory; }, [onHistory]);
+
+  useEffect(() => {
+    let cancelled = false;
+    fetchHistory(0)
+      .then((history) => {
+        if (!cancelled) onHistoryRef.current(history);
+      })
+      .catch((error) => console.error("History backfill failed:", error));
+    return () => {
+      cancelled = true;
+    };
+  }, []);
+}
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Shelly relay, for exercising src/api/shelly.py without
+hardware. Speaks the same Gen2 RPC endpoints over HTTP/1.1 keep-alive and
+models the relay's switching delay and the load draining after power-off.
+
+    python scripts/fake_shelly.py --port 8099
+    SHELLY_HOST=127.0.0.1 SHELLY_PORT=8099 python -m src.api.shelly cycle --no-ble
+
+    GET  /rpc/Switch.GetStatus?id=1
+    POST /rpc/Switch.Set            {"id": 1, "on": false}
+    GET  /rpc/Switch.Set?id=1&on=false
+    GET  /fake/stats                connections / requests seen, switch history
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeRelay:
+    def __init__(self, relay_id: int = 1, on: bool = True, load_watts: float = 4.5,
+                 switch_delay: float = 0.1, drain_sec: float = 1.0):
+        self.relay_id = relay_id
+        self.load_watts = load_watts
+        self.switch_delay = switch_delay
+        self.drain_sec = drain_sec
+        self._target = on
+        self._changed_at = time.monotonic() - 3600
+        self.connections = 0
+        self.requests = 0
+        self.history = []
+
+    @property
+    def output(self) -> bool:
+        if time.monotonic() - self._changed_at < self.switch_delay:
+            return not self._target
+        return self._target
+
+    def apower(self) -> float:
+        since = time.monotonic() - self._changed_at
+        if self._target:
+            return self.load_watts if since >= self.switch_delay else 0.0
+        # Power supply capacitors discharge linearly after the relay opens
+        return round(max(0.0, self.load_watts * (1.0 - since / self.drain_sec)), 2) if self.drain_sec > 0 else 0.0
+
+    def status(self):
+        return {
+            "id": self.relay_id,
+            "source": "http",
+            "output": self.output,
+            "apower": self.apower(),
+            "voltage": 230.1,
+        }
+
+    def set(self, on: bool):
+        was_on = self.output
+        if on != self._target:
+            self._target = on
+            self._changed_at = time.monotonic()
+            self.history.append({"on": on, "t": round(time.time(), 3)})
+        return {"was_on": was_on}
+
+
+def _truthy(value) -> bool:
+    return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "on")
+
+
+def handle_request(relay: FakeRelay, method: str, target: str, body: bytes):
+    url = urlsplit(target)
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    params = dict(query)
+    if method == "POST" and body:
+        params.update(json.loads(body))
+
+    if url.path in ("/rpc/Switch.GetStatus", "/rpc/Switch.Set"):
+        if int(params.get("id", -1)) != relay.relay_id:
+            return 404, {"code": -105, "message": f"Argument 'id', value {params.get('id')} not found!"}
+        if url.path == "/rpc/Switch.GetStatus":
+            return 200, relay.status()
+        if "on" not in params:
+            return 400, {"code": -103, "message": "Missing required argument 'on'!"}
+        return 200, relay.set(_truthy(params["on"]))
+    if url.path == "/fake/stats":
+        return 200, {"connections": relay.connections, "requests": relay.requests, "history": relay.history}
+    return 404, {"code": 404, "message": "Not Found"}
+
+
+async def serve_connection(relay: FakeRelay, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           idle_timeout: float):
+    relay.connections += 1
+    try:
+        while True:
+            try:
+                request_line = await asyncio.wait_for(reader.readline(), idle_timeout)
+            except asyncio.TimeoutError:
+                # Like the real device: idle keep-alive connections get dropped
+                return
+            if not request_line:
+                return
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+            relay.requests += 1
+            try:
+                status, payload = handle_request(relay, method, target, body)
+            except (ValueError, TypeError) as e:
+                status, payload = 400, {"code": 400, "message": str(e)}
+            data = json.dumps(payload).encode("utf-8")
+            close = headers.get("connection", "").lower() == "close"
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+            if close:
+                return
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_fake_shelly(relay: FakeRelay, host: str = "127.0.0.1", port: int = 0, idle_timeout: float = 30.0):
+    """Start serving `relay`; returns the asyncio server (port 0 picks a free port)."""
+    return await asyncio.start_server(
+        lambda r, w: serve_connection(relay, r, w, idle_timeout), host=host, port=port
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fake Shelly relay for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--relay", type=int, default=1)
+    parser.add_argument("--off", action="store_true", help="start with the relay off")
+    parser.add_argument("--load-watts", type=float, default=4.5)
+    parser.add_argument("--switch-delay", type=float, default=0.1)
+    parser.add_argument("--drain", type=float, default=1.0, help="seconds for the load to drain after power-off")
+    parser.add_argument("--idle-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    relay = FakeRelay(args.relay, not args.off, args.load_watts, args.switch_delay, args.drain)
+    server = await start_fake_shelly(relay, args.host, args.port, args.idle_timeout)
+    print(f"🔌 Fake Shelly relay {args.relay} on http://{args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
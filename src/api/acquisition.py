@@ -0,0 +1,429 @@
+# src/api/acquisition.py
+"""
+The measurement side of the backend: ble_runner's BLE (or simulation) loop,
+the trace recorder and the session flags, behind one small interface with two
+transports.
+
+    ACQUISITION=local   (default) runs in the API process, on its event loop
+    ACQUISITION=daemon  API workers attach to a separate acquisition process:
+
+        python -m src.api.acquisition
+        uvicorn src.api.main:app --workers 4
+
+In daemon mode the tick loop never shares a GIL or an event loop with HTTP
+traffic. State reaches the workers through a seqlock-protected shared memory
+segment (see shared_state.py); /start, /stop and the /test/* controls are
+sent as commands over a Unix socket.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from src.api.ble_runner import (
+    EMPTY_SNAPSHOT,
+    PRIMARY_DEVICE_ID,
+    SIM_MODE,
+    ErgSnapshot,
+    _notify_tick,
+    _now_mono,
+    add_notification_listener,
+    add_tick_listener,
+    ble_logger,
+    ble_state,
+    current_state,
+    devices,
+    get_primary_device,
+    get_simulation_status,
+    publish_state,
+    remove_notification_listener,
+    remove_tick_listener,
+    reset_session_metrics,
+    reset_test_state,
+    set_simulated_cadence,
+    set_simulated_distance,
+    set_simulated_energy,
+    set_simulated_power,
+    set_simulation_profile,
+    simulated_logger,
+)
+from src.api.analytics import EMPTY_VALUES, AnalyticsValues
+from src.api.http_cache import encode_json
+from src.api.live_history import HistorySlice, TickHistory
+from src.api.logs import set_context, setup_logging
+from src.api.recorder import SessionRecorder
+from src.api.session_lifecycle import SessionLifecycle
+from src.api.shared_state import DeviceRecord, SharedStateReader, SharedStateWriter
+
+ACQUISITION_MODE = os.getenv("ACQUISITION", "local")  # local | daemon
+SHM_NAME = os.getenv("ACQ_SHM_NAME", "bikeerg_state")
+ACQ_SOCKET = os.getenv("ACQ_SOCKET", os.path.join(tempfile.gettempdir(), "bikeerg-acquisition.sock"))
+# How often API workers look for a new state in shared memory
+ACQ_POLL_SEC = float(os.getenv("ACQ_POLL_SEC", "0.05"))
+ACQ_COMMAND_TIMEOUT = float(os.getenv("ACQ_COMMAND_TIMEOUT", "5.0"))
+
+LOG_DIR = "session_logs"
+# Full-resolution binary traces (every notification + every tick) per session
+RECORD_TRACES = os.getenv("RECORD_TRACES", "1") == "1"
+TRACE_DIR = os.getenv("TRACE_DIR", os.path.join(LOG_DIR, "traces"))
+# How long a finished session's summary stays on screen before metrics reset
+SESSION_COOLDOWN_SEC = float(os.getenv("SESSION_COOLDOWN_SEC", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class AcquisitionError(RuntimeError):
+    pass
+
+
+def device_records() -> List[DeviceRecord]:
+    """All machines, primary first (it exists before it ever connects)."""
+    primary = get_primary_device()
+    ordered = [primary] + [device for device in devices.values() if device is not primary]
+    return [DeviceRecord(d.device_id, d.name, d.snapshot, d.analytics.values()) for d in ordered]
+
+
+# =========================
+# Acquisition core (lives next to the measurement loop)
+# =========================
+
+class AcquisitionCore:
+    def __init__(self, history: TickHistory | None = None):
+        self.recorder = SessionRecorder(TRACE_DIR)
+        self.lifecycle = SessionLifecycle(SESSION_COOLDOWN_SEC, self._end_cooldown)
+        # Per-tick samples for /history; lives in shared memory in daemon mode
+        self.history = history if history is not None else TickHistory()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        # generation lets API workers reset their unlock tracking on every /start
+        return {
+            "generation": self.lifecycle.generation,
+            "session_state": self.lifecycle.state,
+            "last_session_snapshot": self.lifecycle.summary,
+        }
+
+    @property
+    def info_version(self) -> int:
+        return self.lifecycle.version
+
+    async def start(self):
+        os.makedirs(LOG_DIR, exist_ok=True)
+        add_notification_listener(self.recorder.record_notification)
+        add_tick_listener(self._record_tick)
+        if SIM_MODE:
+            logger.info("🧪 Starting acquisition in SIM_MODE=1")
+            self._task = asyncio.create_task(simulated_logger())
+        else:
+            logger.info("🚴 Starting acquisition in real BLE mode")
+            self._task = asyncio.create_task(ble_logger())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        remove_tick_listener(self._record_tick)
+        remove_notification_listener(self.recorder.record_notification)
+        self.lifecycle.close()
+        self.recorder.close()
+
+    def _record_tick(self, now: float):
+        state = current_state()
+        self.recorder.record_tick(now, state)
+        session = self.lifecycle.generation if self.lifecycle.active else 0
+        self.history.append(time.time(), state.energy_kwh, state.power, state.cadence, session)
+
+    def execute(self, name: str, args: Dict[str, Any]) -> Any:
+        handler = getattr(self, f"cmd_{name}", None)
+        if handler is None:
+            raise AcquisitionError(f"unknown command '{name}'")
+        result = handler(**args)
+        publish_state()
+        return result
+
+    def _end_cooldown(self):
+        reset_session_metrics()
+        # Readers (live view, shared memory) learn about it like about a tick
+        _notify_tick(_now_mono())
+
+    # ----- session control -----
+
+    def cmd_start(self, session_id: str):
+        reset_session_metrics()
+        if RECORD_TRACES:
+            self.recorder.start(session_id, _now_mono())
+        ble_state["session_active"] = True
+        self.lifecycle.start()
+        set_context(session=session_id)
+
+    def cmd_stop(self, snapshot: Dict[str, Any]) -> Dict[str, Any] | None:
+        """Ends the session; returns the cached summary (snapshot plus trace stats), None if none was active."""
+        def summarize():
+            summary = dict(snapshot)
+            if self.recorder.active:
+                summary["trace"] = self.recorder.stop()
+            return summary
+
+        summary = self.lifecycle.stop(summarize)
+        if summary is not None:
+            ble_state["session_active"] = False
+            set_context(session=None)
+        return summary
+
+    # ----- simulation controls (/test/*) -----
+
+    def cmd_test_reset(self):
+        ble_state["session_active"] = False
+        reset_session_metrics()
+        reset_test_state()
+        self.recorder.stop()
+        self.lifecycle.reset()
+        set_context(session=None)
+
+    def cmd_set_energy(self, value: float | None):
+        set_simulated_energy(value)
+        if value is not None:
+            ble_state["energy_kwh"] = float(value)
+
+    def cmd_set_power(self, value: float | None):
+        set_simulated_power(value)
+        if value is not None:
+            ble_state["power"] = int(round(value))
+
+    def cmd_set_cadence(self, value: float):
+        set_simulated_cadence(value)
+        ble_state["cadence"] = float(value)
+
+    def cmd_set_distance(self, value: float):
+        set_simulated_distance(value)
+        ble_state["distance"] = float(value)
+
+    def cmd_set_profile(self, name: str):
+        set_simulation_profile(name)
+
+    def cmd_simulation_status(self) -> Dict[str, Any]:
+        return get_simulation_status()
+
+
+# =========================
+# Transports used by the API
+# =========================
+
+class LocalAcquisition:
+    """Acquisition on the API's own event loop (single process, the default)."""
+
+    def __init__(self):
+        self.core = AcquisitionCore()
+        self._on_tick: Callable[[float], None] | None = None
+
+    async def start(self, on_tick: Callable[[float], None]):
+        await self.core.start()
+        add_tick_listener(on_tick)
+        self._on_tick = on_tick
+
+    async def stop(self):
+        if self._on_tick is not None:
+            remove_tick_listener(self._on_tick)
+        await self.core.stop()
+
+    def primary(self) -> ErgSnapshot:
+        return current_state()
+
+    def primary_analytics(self) -> AnalyticsValues:
+        return get_primary_device().analytics.values()
+
+    def devices(self) -> List[DeviceRecord]:
+        return device_records()
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self.core.info
+
+    def refresh(self):
+        publish_state()
+
+    def history_since(self, seq: int) -> HistorySlice:
+        return self.core.history.since(seq)
+
+    async def command(self, name: str, /, **args) -> Any:
+        return self.core.execute(name, args)
+
+
+class RemoteAcquisition:
+    """API worker side of daemon mode: reads shared memory, sends commands over the socket."""
+
+    def __init__(self, shm_name: str = SHM_NAME, socket_path: str = ACQ_SOCKET, poll: float = ACQ_POLL_SEC):
+        self.shm_name = shm_name
+        self.socket_path = socket_path
+        self.poll = poll
+        self._reader: SharedStateReader | None = None
+        self._state = None
+        self._task: asyncio.Task | None = None
+        self._conn: tuple | None = None
+        self._lock = asyncio.Lock()
+
+    async def start(self, on_tick: Callable[[float], None]):
+        self._task = asyncio.create_task(self._follow(on_tick))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._conn is not None:
+            self._conn[1].close()
+            self._conn = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    async def _follow(self, on_tick: Callable[[float], None]):
+        while self._reader is None:
+            try:
+                self._reader = SharedStateReader(self.shm_name)
+                logger.info("🔗 Attached to acquisition state '%s'", self.shm_name)
+            except FileNotFoundError:
+                logger.info("⏳ Waiting for the acquisition daemon...")
+                await asyncio.sleep(1.0)
+        while True:
+            previous = self._state
+            self.refresh()
+            if self._state is not previous:
+                try:
+                    on_tick(self.primary().t)
+                except Exception as e:
+                    logger.warning("⚠️ Tick listener failed: %s", e)
+            await asyncio.sleep(self.poll)
+
+    def primary(self) -> ErgSnapshot:
+        state = self._state
+        if state is None or not state.devices or state.devices[0].device_id != PRIMARY_DEVICE_ID:
+            return EMPTY_SNAPSHOT
+        return state.devices[0].state
+
+    def primary_analytics(self) -> AnalyticsValues:
+        state = self._state
+        if state is None or not state.devices or state.devices[0].device_id != PRIMARY_DEVICE_ID:
+            return EMPTY_VALUES
+        return state.devices[0].analytics
+
+    def devices(self) -> List[DeviceRecord]:
+        return list(self._state.devices) if self._state is not None else []
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self._state.info if self._state is not None else {}
+
+    def refresh(self):
+        if self._reader is not None:
+            state = self._reader.read()
+            if state is not None:
+                self._state = state
+
+    def history_since(self, seq: int) -> HistorySlice:
+        if self._reader is None:
+            raise AcquisitionError("acquisition daemon not attached yet")
+        return self._reader.history.since(seq)
+
+    async def command(self, name: str, /, **args) -> Any:
+        async with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = await asyncio.open_unix_connection(self.socket_path)
+                reader, writer = self._conn
+                writer.write(json.dumps({"cmd": name, "args": args}).encode("utf-8") + b"\n")
+                await writer.drain()
+                line = await asyncio.wait_for(reader.readline(), ACQ_COMMAND_TIMEOUT)
+                if not line:
+                    raise ConnectionResetError("acquisition daemon closed the connection")
+            except (OSError, asyncio.TimeoutError) as e:
+                if self._conn is not None:
+                    self._conn[1].close()
+                    self._conn = None
+                raise AcquisitionError(f"acquisition daemon unavailable: {e}") from e
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise AcquisitionError(reply.get("error", "command failed"))
+        # The daemon publishes before it replies
+        self.refresh()
+        return reply.get("result")
+
+
+def create_acquisition():
+    if ACQUISITION_MODE == "daemon":
+        return RemoteAcquisition()
+    return LocalAcquisition()
+
+
+# =========================
+# Daemon
+# =========================
+
+async def run_daemon():
+    shared = SharedStateWriter(SHM_NAME)
+    core = AcquisitionCore(history=shared.history)
+    written_info = -1
+
+    def publish(_now: float | None = None):
+        nonlocal written_info
+        info = None
+        if core.info_version != written_info:
+            info = encode_json(core.info)
+            written_info = core.info_version
+        shared.write(device_records(), info)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    result = core.execute(request["cmd"], request.get("args") or {})
+                    publish()
+                    reply = {"ok": True, "result": result}
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write(encode_json(reply) + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    if os.path.exists(ACQ_SOCKET):
+        os.unlink(ACQ_SOCKET)
+    add_tick_listener(publish)
+    await core.start()
+    publish_state()
+    publish()
+    server = await asyncio.start_unix_server(handle, path=ACQ_SOCKET)
+    logger.info("📡 Acquisition daemon: state in shared memory '%s', commands on %s", SHM_NAME, ACQ_SOCKET)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        remove_tick_listener(publish)
+        await core.stop()
+        shared.close()
+        if os.path.exists(ACQ_SOCKET):
+            os.unlink(ACQ_SOCKET)
+        logger.info("👋 Acquisition daemon stopped.")
+
+
+def main():
+    setup_logging("acquisition")
+    asyncio.run(run_daemon())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# src/api/analytics.py
+"""
+Streaming ride analytics on preallocated ring buffers, O(1) per sample.
+
+    PowerWindows    time-weighted rolling mean power over several windows that
+                    share one ring buffer
+    RideAnalytics   per-device bundle: 3/10/30 s averages, normalized power,
+                    peak power and projected time to an energy target
+
+Power is fed once per tick with the tick's dt, so the windows weight samples
+by time rather than by count and stay correct when ticks jitter.
+"""
+import math
+from array import array
+from typing import NamedTuple, Sequence
+
+from src.api.integration import J_PER_KWH
+
+POWER_WINDOWS = (3.0, 10.0, 30.0)
+# Coggan normalized power: 4th-power mean of the 30 s rolling average
+NP_WINDOW = 30.0
+
+
+class PowerWindows:
+    """
+    Rolling means of a piecewise-constant power signal. Each sample is
+    (end time, power * dt, dt); every window keeps a running sum and its own
+    tail into the shared ring, so an update touches each evicted sample once.
+    """
+
+    __slots__ = ("windows", "capacity", "_t", "_area", "_dt", "_head", "_tails", "_sum_area", "_sum_dt")
+
+    def __init__(self, windows: Sequence[float], min_dt: float):
+        self.windows = tuple(windows)
+        # Enough slots for the longest window at the fastest expected sample rate
+        self.capacity = int(math.ceil(max(self.windows) / max(min_dt, 1e-3))) * 2 + 1
+        self._t = array("d", [0.0] * self.capacity)
+        self._area = array("d", [0.0] * self.capacity)
+        self._dt = array("d", [0.0] * self.capacity)
+        self._head = 0
+        self._tails = [0] * len(self.windows)
+        self._sum_area = [0.0] * len(self.windows)
+        self._sum_dt = [0.0] * len(self.windows)
+
+    def clear(self):
+        self._head = 0
+        for i in range(len(self.windows)):
+            self._tails[i] = 0
+            self._sum_area[i] = 0.0
+            self._sum_dt[i] = 0.0
+
+    def add(self, now: float, power: float, dt: float):
+        if dt <= 0:
+            return
+        cap = self.capacity
+        head = self._head
+        for i in range(len(self.windows)):
+            # Ring full: the oldest slot is about to be overwritten
+            if head - self._tails[i] >= cap:
+                self._evict(i)
+        slot = head % cap
+        area = power * dt
+        self._t[slot] = now
+        self._area[slot] = area
+        self._dt[slot] = dt
+        self._head = head + 1
+
+        for i, window in enumerate(self.windows):
+            self._sum_area[i] += area
+            self._sum_dt[i] += dt
+            cutoff = now - window
+            while self._tails[i] < self._head - 1 and self._t[self._tails[i] % cap] <= cutoff:
+                self._evict(i)
+
+    def mean(self, index: int) -> float:
+        covered = self._sum_dt[index]
+        if covered <= 0:
+            return 0.0
+        return max(0.0, self._sum_area[index] / covered)
+
+    def _evict(self, i: int):
+        slot = self._tails[i] % self.capacity
+        self._sum_area[i] -= self._area[slot]
+        self._sum_dt[i] -= self._dt[slot]
+        self._tails[i] += 1
+
+
+class AnalyticsValues(NamedTuple):
+    """Plain numbers, so they can cross a process boundary; normalized is NaN until defined."""
+    power_avg_3s: float
+    power_avg_10s: float
+    power_avg_30s: float
+    normalized_power: float
+    peak_power: float
+
+
+EMPTY_VALUES = AnalyticsValues(0.0, 0.0, 0.0, math.nan, 0.0)
+
+
+def seconds_to_energy(watts: float, energy_kwh: float, target_kwh: float | None) -> float | None:
+    """Time to reach `target_kwh` at `watts`, or None if there's no target or no power."""
+    if target_kwh is None:
+        return None
+    remaining = target_kwh - energy_kwh
+    if remaining <= 0:
+        return 0.0
+    if watts < 1.0:
+        return None
+    return remaining * J_PER_KWH / watts
+
+
+def analytics_view(values: AnalyticsValues, energy_kwh: float, next_threshold: float | None) -> dict:
+    """Flat, rounded fields for the live view, so unchanged values don't produce deltas."""
+    eta = seconds_to_energy(values.power_avg_10s, energy_kwh, next_threshold)
+    normalized = values.normalized_power
+    return {
+        "power_avg_3s": int(round(values.power_avg_3s)),
+        "power_avg_10s": int(round(values.power_avg_10s)),
+        "power_avg_30s": int(round(values.power_avg_30s)),
+        "normalized_power": None if math.isnan(normalized) else int(round(normalized)),
+        "peak_power": int(round(values.peak_power)),
+        "time_to_next_level": int(math.ceil(eta)) if eta is not None else None,
+    }
+
+
+class RideAnalytics:
+    __slots__ = ("power", "_np_index", "start_t", "peak_power", "_np_sum", "_np_dt")
+
+    def __init__(self, min_dt: float, windows: Sequence[float] = POWER_WINDOWS):
+        if NP_WINDOW not in windows:
+            windows = tuple(windows) + (NP_WINDOW,)
+        self.power = PowerWindows(windows, min_dt)
+        self._np_index = self.power.windows.index(NP_WINDOW)
+        self.start_t: float | None = None
+        self.peak_power = 0.0
+        self._np_sum = 0.0
+        self._np_dt = 0.0
+
+    def reset(self, now: float):
+        self.power.clear()
+        self.start_t = now
+        self.peak_power = 0.0
+        self._np_sum = 0.0
+        self._np_dt = 0.0
+
+    def add_power(self, now: float, power: float, dt: float):
+        if dt <= 0:
+            return
+        if self.start_t is None:
+            self.start_t = now - dt
+        self.power.add(now, power, dt)
+        if power > self.peak_power:
+            self.peak_power = float(power)
+        # NP only counts once a full 30 s window exists
+        if now - self.start_t >= NP_WINDOW:
+            self._np_sum += self.power.mean(self._np_index) ** 4 * dt
+            self._np_dt += dt
+
+    def average(self, window: float) -> float:
+        return self.power.mean(self.power.windows.index(window))
+
+    @property
+    def normalized_power(self) -> float | None:
+        if self._np_dt <= 0:
+            return None
+        return (self._np_sum / self._np_dt) ** 0.25
+
+    def values(self) -> AnalyticsValues:
+        normalized = self.normalized_power
+        return AnalyticsValues(
+            self.average(3.0),
+            self.average(10.0),
+            self.average(30.0),
+            math.nan if normalized is None else normalized,
+            self.peak_power,
+        )
+
+
+EMPTY_ANALYTICS_VIEW = {
+    "power_avg_3s": 0,
+    "power_avg_10s": 0,
+    "power_avg_30s": 0,
+    "normalized_power": None,
+    "peak_power": 0,
+    "time_to_next_level": None,
+}
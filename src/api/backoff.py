@@ -0,0 +1,23 @@
+# src/api/backoff.py
+"""Exponential backoff with full jitter for retry loops."""
+import random
+
+
+class Backoff:
+    __slots__ = ("base", "cap", "factor", "attempts", "_rng")
+
+    def __init__(self, base: float = 0.5, cap: float = 30.0, factor: float = 2.0, rng: random.Random | None = None):
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+        self.attempts = 0
+        self._rng = rng or random.Random()
+
+    def next_delay(self) -> float:
+        """Random delay in [0, min(cap, base * factor**attempts)], then bump attempts."""
+        ceiling = min(self.cap, self.base * (self.factor ** self.attempts))
+        self.attempts += 1
+        return self._rng.uniform(0.0, ceiling)
+
+    def reset(self):
+        self.attempts = 0
@@ -2,61 +2,114 @@
 import os
 import time
 import asyncio
-import traceback
-from typing import Dict, Any
+import json
+import logging
+from typing import Callable, Dict, Any, List, NamedTuple, Tuple
+
+from src.api import metrics, pm5
+from src.api.analytics import RideAnalytics
+from src.api.backoff import Backoff
+from src.api.integration import PowerIntegrator
+from src.api.shelly import SHELLY_HOST, SHELLY_PORT, SHELLY_RELAY_ID, SHELLY_WAKE_ON_START, PowerCycle, ShellyClient
 
-# Only power-cycle bluetooth in real BLE mode
 SIM_MODE = os.getenv("SIM_MODE", "0") == "1"
-if not SIM_MODE:
-    os.system("bluetoothctl power off; sleep 1; bluetoothctl power on")
 
-from bleak import BleakScanner, BleakClient
+logger = logging.getLogger(__name__)
+
+# bleak (and the D-Bus stack behind it) is imported by ble_logger, off the event
+# loop, so sim mode, tools and tests never load it.
+BleakScanner = None
+BleakClient = None
 
 # ===== BLE Characteristic UUIDs =====
-UUID_0036 = "ce060036-43e5-11e4-916c-0800200c9a66"  # Notify characteristic
+UUID_MULTIPLEXED = pm5.characteristic_uuid(pm5.MULTIPLEXED)  # Notify: every rowing status/stroke characteristic
 UUID_WRITE = "ce060034-43e5-11e4-916c-0800200c9a66"  # Write characteristic
 
 # ===== Public state consumed by API/frontend =====
+# Mirrors the primary device's state; see ErgDevice below. Only the event loop
+# writes these dicts; readers use the ErgSnapshot published once per tick.
 ble_state = {
     "power": 0,
     "cadence": 0.0,
     "elapsed": 0.0,
     "distance": 0.0,
     "energy_kwh": 0.0,
+    "calories": 0.0,
+    "pace": 0.0,
+    "avg_cadence": 0.0,
     "session_active": False,
     "connected": False,
 }
 
-# ===== Internal tracking =====
-_last_stroke_t = None
-_stroke_intervals = []
-_last_notify_t = None
-_last_notified_power = 0
-_start_t = None
+
+class ErgSnapshot(NamedTuple):
+    """Immutable, consistent copy of one machine's metrics; replaced (never mutated) per tick."""
+    power: int
+    cadence: float
+    elapsed: float
+    distance: float
+    energy_kwh: float
+    calories: float
+    # Seconds per 500 m as shown on the PM5; 0 when not moving
+    pace: float
+    # PM5 stroke rate averaged over the session's elapsed time
+    avg_cadence: float
+    session_active: bool
+    connected: bool
+    t: float
+
+
+EMPTY_SNAPSHOT = ErgSnapshot(0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, False, False, 0.0)
+
+# Callbacks run at the end of every tick (e.g. live stream publisher)
+_tick_listeners: List[Callable[[float], None]] = []
+# Callbacks receiving every raw notification of the primary device (e.g. trace recorder)
+_notification_listeners: List[Callable[[float, bytes], None]] = []
 
 # ===== Real BLE tunables =====
-DISTANCE_PER_STROKE = float(os.getenv("DISTANCE_PER_STROKE", "6.0"))
 SCAN_INTERVAL = float(os.getenv("SCAN_INTERVAL", "5.0"))
 RETRY_TIMEOUT = float(os.getenv("RETRY_TIMEOUT", "300"))
-INITIAL_BOOT_DELAY = float(os.getenv("INITIAL_BOOT_DELAY", "20"))
+INITIAL_BOOT_DELAY = float(os.getenv("INITIAL_BOOT_DELAY", "2"))
+# Reconnect strategy: direct connect to the last known address first, then a
+# scan that stops at the first matching advertisement; retries back off
+# exponentially with jitter.
+DIRECT_CONNECT_TIMEOUT = float(os.getenv("DIRECT_CONNECT_TIMEOUT", "4.0"))
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "0.5"))
+RETRY_BACKOFF_CAP = float(os.getenv("RETRY_BACKOFF_CAP", "10.0"))
+KNOWN_DEVICES_FILE = os.getenv("KNOWN_DEVICES_FILE", os.path.join("session_logs", "known_devices.json"))
+# The adapter is power-cycled only on request at startup, or after this many
+# consecutive failed scan/connect attempts (0 disables it).
+BLE_RESET_ON_START = os.getenv("BLE_RESET_ON_START", "0") == "1"
+ADAPTER_RESET_AFTER_FAILURES = int(os.getenv("ADAPTER_RESET_AFTER_FAILURES", "5"))
+# Number of PM5s to connect concurrently (a room of BikeErgs on one host)
+MAX_DEVICES = int(os.getenv("MAX_DEVICES", "1"))
 
 TICK_SECONDS = float(os.getenv("TICK_SECONDS", "0.2"))
 POWER_HOLD_SEC = float(os.getenv("POWER_HOLD_SEC", "0.75"))
 POWER_DECAY_WINDOW = float(os.getenv("POWER_DECAY_WINDOW", "2.0"))
 CADENCE_IDLE_SEC = float(os.getenv("CADENCE_IDLE_SEC", "2.0"))
+# Ticks running later than this are logged (with the lateness as a field)
+TICK_LATE_WARN_SEC = float(os.getenv("TICK_LATE_WARN_SEC", "0.1"))
+# While idle (no session, no recent notifications) the tick loop sleeps until
+# woken by a notification or session start, re-checking at most this often.
+IDLE_CHECK_SEC = float(os.getenv("IDLE_CHECK_SEC", "5.0"))
 
-MAX_STROKE_HISTORY = 5
-MIN_STROKE_INTERVAL = 0.3
-MAX_STROKE_INTERVAL = 5.0
+# A jump in the PM5's own distance larger than this (m) between two packets is
+# a workout reset on the monitor, not rowing; the counter is re-based instead.
+MAX_DISTANCE_STEP = float(os.getenv("MAX_DISTANCE_STEP", "100"))
 
 # ===== Simulation tunables =====
 SIM_TICK_SECONDS = float(os.getenv("SIM_TICK_SECONDS", "0.2"))
 SIM_DEFAULT_POWER = float(os.getenv("SIM_DEFAULT_POWER", "160"))
 SIM_DEFAULT_CADENCE = float(os.getenv("SIM_DEFAULT_CADENCE", "90"))
+DISTANCE_PER_STROKE = float(os.getenv("DISTANCE_PER_STROKE", "6.0"))
 SIM_PROFILE = os.getenv("SIM_PROFILE", "constant")  # constant | ramp
 SIM_RAMP_MIN_POWER = float(os.getenv("SIM_RAMP_MIN_POWER", "60"))
 SIM_RAMP_MAX_POWER = float(os.getenv("SIM_RAMP_MAX_POWER", "220"))
 SIM_RAMP_PERIOD_SEC = float(os.getenv("SIM_RAMP_PERIOD_SEC", "30"))
+SIM_DEVICES = int(os.getenv("SIM_DEVICES", "1"))
+
+_wake_event = asyncio.Event()
 
 # Manual simulation controls
 _sim_controls: Dict[str, Any] = {
@@ -68,23 +121,76 @@ _sim_controls: Dict[str, Any] = {
 }
 
 
+_clock: Callable[[], float] = time.monotonic
+
+
 def _now_mono():
-    return time.monotonic()
+    return _clock()
+
+
+def set_clock(clock: Callable[[], float] | None):
+    """Swap the time source (e.g. a replay's virtual clock); None restores time.monotonic."""
+    global _clock
+    _clock = clock or time.monotonic
+
+
+def add_tick_listener(listener: Callable[[float], None]):
+    if listener not in _tick_listeners:
+        _tick_listeners.append(listener)
+
+
+def remove_tick_listener(listener: Callable[[float], None]):
+    if listener in _tick_listeners:
+        _tick_listeners.remove(listener)
+
+
+def add_notification_listener(listener: Callable[[float, bytes], None]):
+    if listener not in _notification_listeners:
+        _notification_listeners.append(listener)
+
+
+def remove_notification_listener(listener: Callable[[float, bytes], None]):
+    if listener in _notification_listeners:
+        _notification_listeners.remove(listener)
+
 
+def publish_state(now: float | None = None):
+    """Swap in fresh snapshots for every device; one reference assignment each, so readers never see a mix."""
+    now = _now_mono() if now is None else now
+    session_active = ble_state["session_active"]
+    for device in devices.values():
+        device.publish(now, session_active)
+    if PRIMARY_DEVICE_ID not in devices:
+        _primary.publish(now, session_active)
 
-def to_uint16_le(b: bytes) -> int:
-    return b[0] + (b[1] << 8)
+
+def current_state() -> ErgSnapshot:
+    """Latest published snapshot of the primary machine."""
+    return _primary.snapshot
+
+
+def _notify_tick(now: float):
+    publish_state(now)
+    for listener in _tick_listeners:
+        try:
+            listener(now)
+        except Exception as e:
+            logger.warning("⚠️ Tick listener failed: %s", e)
 
 
 def reset_session_metrics():
     """Reset session counters but keep connectivity/session_active as caller decides."""
-    ble_state.update({
-        "power": 0,
-        "cadence": 0.0,
-        "elapsed": 0.0,
-        "distance": 0.0,
-        "energy_kwh": 0.0,
-    })
+    now = _now_mono()
+    for device in devices.values():
+        device.reset_metrics(now)
+    if PRIMARY_DEVICE_ID not in devices:
+        _primary.reset_metrics(now)
+    wake_logger()
+
+
+def wake_logger():
+    """Resume the BLE tick loop if it is idling."""
+    _wake_event.set()
 
 
 def reset_test_state():
@@ -131,30 +237,204 @@ def get_simulation_status():
     }
 
 
-def notification_handler(_, data: bytes):
-    """Handle incoming PM5 notifications (UUID 0x0036)."""
-    global _last_stroke_t, _stroke_intervals, _last_notify_t, _last_notified_power, _start_t
-    now = _now_mono()
-    if not _start_t:
-        return
+class ErgDevice:
+    """Per-machine connection and metric state; one instance per PM5."""
+
+    __slots__ = (
+        "device_id", "name", "address", "state", "integrator", "start_t", "last_stroke_t",
+        "pm_distance", "pm_calories", "analytics", "snapshot", "disconnected", "metric_labels",
+    )
+
+    def __init__(self, device_id: str, name: str = "", address: str = "", state: Dict[str, Any] | None = None):
+        self.device_id = device_id
+        self.name = name
+        self.address = address
+        # The primary device shares the module-level ble_state dict
+        self.state = state if state is not None else {
+            "power": 0,
+            "cadence": 0.0,
+            "elapsed": 0.0,
+            "distance": 0.0,
+            "energy_kwh": 0.0,
+            "calories": 0.0,
+            "pace": 0.0,
+            "avg_cadence": 0.0,
+            "connected": False,
+        }
+        self.integrator = PowerIntegrator(POWER_HOLD_SEC, POWER_DECAY_WINDOW)
+        self.start_t: float | None = None
+        self.last_stroke_t: float | None = None
+        # Last raw PM5 counters; session totals accumulate their increments
+        self.pm_distance: float | None = None
+        self.pm_calories: float | None = None
+        self.analytics = RideAnalytics(min(TICK_SECONDS, SIM_TICK_SECONDS))
+        self.snapshot = EMPTY_SNAPSHOT
+        self.disconnected = asyncio.Event()
+        self.metric_labels = {"device": device_id}
+
+    @property
+    def is_primary(self) -> bool:
+        return self.device_id == PRIMARY_DEVICE_ID
+
+    def on_connect(self, now: float):
+        """
+        New link. Outside a session this starts from scratch; a reconnect during
+        an active session keeps the session's energy and totals and only rebases
+        the integrator onto the new link (PM5 counter deltas carry on as before).
+        """
+        self.start_t = now
+        self.last_stroke_t = None
+        self.disconnected.clear()
+        self.state["connected"] = True
+        if ble_state["session_active"]:
+            self.integrator.rebase(now)
+            self.state["power"] = 0
+            return
+        self.integrator = PowerIntegrator(POWER_HOLD_SEC, POWER_DECAY_WINDOW)
+        self.reset_metrics(now)
+
+    def reset_metrics(self, now: float):
+        self.state.update({
+            "power": 0,
+            "cadence": 0.0,
+            "elapsed": 0.0,
+            "distance": 0.0,
+            "energy_kwh": 0.0,
+            "calories": 0.0,
+            "pace": 0.0,
+            "avg_cadence": 0.0,
+        })
+        self.pm_distance = None
+        self.pm_calories = None
+        self.integrator.reset(now)
+        self.analytics.reset(now)
+
+    def notification_handler(self, _, data: bytes):
+        """Handle incoming PM5 multiplexed notifications (UUID 0x0080)."""
+        now = _now_mono()
+        if self.is_primary:
+            for listener in _notification_listeners:
+                try:
+                    listener(now, data)
+                except Exception as e:
+                    logger.warning("⚠️ Notification listener failed: %s", e, extra=self.metric_labels)
+
+        metrics.notifications_total.inc(labels=self.metric_labels)
+        if self.start_t is None:
+            return
+
+        char_id, fields = pm5.decode_multiplexed(data)
+        handler = _PACKET_HANDLERS.get(char_id)
+        if handler is not None:
+            handler(self, now, fields)
+
+    def _on_stroke_power(self, now: float, fields: Dict[str, Any]):
+        power = fields.get("stroke_power")
+        if power is None:
+            return
+        if self.integrator.last_t is not None:
+            metrics.notification_gap_seconds.observe(now - self.integrator.last_t, self.metric_labels)
+        self.integrator.add_sample(now, power)
+        if power > 0:
+            self.last_stroke_t = now
+        _wake_event.set()
+
+    def _on_status(self, now: float, fields: Dict[str, Any]):
+        if "stroke_rate" in fields:
+            self.state["cadence"] = float(fields["stroke_rate"])
+        if "pace" in fields:
+            self.state["pace"] = fields["pace"]
+
+    def _on_distance(self, now: float, fields: Dict[str, Any]):
+        distance = fields.get("distance")
+        if distance is None:
+            return
+        previous, self.pm_distance = self.pm_distance, distance
+        if previous is not None and ble_state["session_active"] and 0 < distance - previous <= MAX_DISTANCE_STEP:
+            self.state["distance"] += distance - previous
+
+    def _on_calories(self, now: float, fields: Dict[str, Any]):
+        calories = fields.get("total_calories")
+        if calories is None:
+            return
+        previous, self.pm_calories = self.pm_calories, calories
+        if previous is not None and ble_state["session_active"] and calories > previous:
+            self.state["calories"] += calories - previous
+
+    def tick(self, now: float, dt: float, session_active: bool):
+        state = self.state
+        if self.last_stroke_t is None or (now - self.last_stroke_t) > CADENCE_IDLE_SEC:
+            state["cadence"] = 0.0
+            state["pace"] = 0.0
+
+        state["power"] = int(round(self.integrator.power_at(now)))
+        self.analytics.add_power(now, state["power"], dt)
+
+        if session_active:
+            state["elapsed"] += dt
+            _average_cadence(state, dt)
+            state["energy_kwh"] = self.integrator.energy_kwh_at(now)
+
+    def publish(self, now: float, session_active: bool):
+        state = self.state
+        self.snapshot = ErgSnapshot(
+            state["power"], state["cadence"], state["elapsed"], state["distance"], state["energy_kwh"],
+            state["calories"], state["pace"], state["avg_cadence"], session_active, state["connected"], now,
+        )
+
+    def is_idle(self, now: float) -> bool:
+        return self.integrator.is_idle(now) and self.state["cadence"] == 0
+
+    def on_disconnect(self, _client=None):
+        self.state["connected"] = False
+        self.disconnected.set()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"id": self.device_id, "name": self.name, "address": self.address, **self.snapshot._asdict()}
+
+
+# What each multiplexed packet updates; other ids (splits, force curve, ...) are recorded but not decoded
+_PACKET_HANDLERS: Dict[int, Callable[[ErgDevice, float, Dict[str, Any]], None]] = {
+    pm5.GENERAL_STATUS: ErgDevice._on_distance,
+    pm5.ADDITIONAL_STATUS: ErgDevice._on_status,
+    pm5.ADDITIONAL_STATUS_2: ErgDevice._on_calories,
+    pm5.STROKE_DATA: ErgDevice._on_distance,
+    pm5.ADDITIONAL_STROKE_DATA: ErgDevice._on_stroke_power,
+}
+
+PRIMARY_DEVICE_ID = "erg-1"
+_primary = ErgDevice(PRIMARY_DEVICE_ID, state=ble_state)
+
+# Connected (or previously connected) machines by id; ids stay stable across reconnects
+devices: Dict[str, ErgDevice] = {}
+_device_ids_by_address: Dict[str, str] = {}
+
+
+def get_device(device_id: str) -> ErgDevice | None:
+    return devices.get(device_id)
+
+
+def get_primary_device() -> ErgDevice:
+    return _primary
 
-    power = to_uint16_le(data[3:5])
-    _last_notified_power = int(power)
-    _last_notify_t = now
 
-    if power > 0:
-        if _last_stroke_t:
-            interval = now - _last_stroke_t
-            if MIN_STROKE_INTERVAL < interval < MAX_STROKE_INTERVAL:
-                _stroke_intervals.append(interval)
-                if len(_stroke_intervals) > MAX_STROKE_HISTORY:
-                    _stroke_intervals.pop(0)
-        _last_stroke_t = now
+def _device_for(address: str, name: str) -> ErgDevice:
+    device_id = _device_ids_by_address.get(address)
+    if device_id is None:
+        device_id = f"erg-{len(_device_ids_by_address) + 1}"
+        _device_ids_by_address[address] = device_id
+    device = devices.get(device_id)
+    if device is None:
+        device = _primary if device_id == PRIMARY_DEVICE_ID else ErgDevice(device_id)
+        devices[device_id] = device
+    device.name = name
+    device.address = address
+    return device
 
-    if _stroke_intervals:
-        avg = sum(_stroke_intervals) / len(_stroke_intervals)
-        if avg > 0:
-            ble_state["cadence"] = round(60.0 / avg, 1)
+
+def notification_handler(sender, data: bytes):
+    """Handle incoming PM5 notifications (UUID 0x0080) for the primary device."""
+    _primary.notification_handler(sender, data)
 
 
 def build_sleep_command(doze_sec=0, sleep_sec=65535):
@@ -181,13 +461,61 @@ def _simulation_profile_power(elapsed_session: float) -> float:
     return SIM_DEFAULT_POWER
 
 
+def _average_cadence(state: Dict[str, Any], dt: float):
+    """Fold this tick's stroke rate into the session mean (after elapsed has advanced by dt)."""
+    if state["elapsed"] > 0:
+        state["avg_cadence"] += (state["cadence"] - state["avg_cadence"]) * dt / state["elapsed"]
+
+
+def _sim_power_scale(index: int) -> float:
+    # Spread extra simulated riders between 70% and 130% of the profile power
+    return 0.7 + 0.6 * ((index * 0.618) % 1.0)
+
+
+def _simulate_device_tick(device: ErgDevice, dt: float, index: int):
+    state = device.state
+    if not ble_state["session_active"]:
+        state["power"] = 0
+        state["cadence"] = 0.0
+        state["pace"] = 0.0
+        return
+
+    # Manual /test/* overrides only drive the primary device
+    manual = _sim_controls if index == 0 else {}
+    scale = 1.0 if index == 0 else _sim_power_scale(index)
+    base_power = _simulation_profile_power(state["elapsed"] + 3.0 * index) * scale
+    power = manual["manual_power"] if manual.get("manual_power") is not None else base_power
+    cadence = manual["manual_cadence"] if manual.get("manual_cadence") is not None else SIM_DEFAULT_CADENCE
+
+    state["power"] = int(round(power))
+    state["cadence"] = float(cadence)
+    state["pace"] = pm5.pace_for_power(state["power"])
+    state["calories"] += pm5.calories_per_hour(state["power"]) * dt / 3600.0
+    state["elapsed"] += dt
+    _average_cadence(state, dt)
+
+    if manual.get("manual_distance") is not None:
+        state["distance"] = float(manual["manual_distance"])
+    else:
+        strokes_per_sec = state["cadence"] / 60.0
+        state["distance"] += strokes_per_sec * DISTANCE_PER_STROKE * dt
+
+    if manual.get("manual_energy") is not None:
+        state["energy_kwh"] = float(manual["manual_energy"])
+    else:
+        state["energy_kwh"] += (state["power"] * dt) / 3_600_000.0
+
+
 async def simulated_logger():
     """
     Dev-only simulated metric source.
     Uses the same ble_state structure as real BLE so the frontend remains unchanged.
+    SIM_DEVICES > 1 adds extra simulated machines for multi-erg load testing.
     """
-    print("🧪 Simulation mode enabled.")
-    ble_state["connected"] = True
+    logger.info("🧪 Simulation mode enabled (%d device(s)).", SIM_DEVICES)
+    sim_devices = [_device_for(f"SIM:{i + 1}", f"Simulated PM5 {i + 1}") for i in range(max(SIM_DEVICES, 1))]
+    for device in sim_devices:
+        device.state["connected"] = True
     reset_test_state()
     reset_session_metrics()
 
@@ -201,117 +529,286 @@ async def simulated_logger():
             prev = now
             continue
 
-        if ble_state["session_active"]:
-            base_power = _simulation_profile_power(ble_state["elapsed"])
-            power = _sim_controls["manual_power"] if _sim_controls["manual_power"] is not None else base_power
-            cadence = _sim_controls["manual_cadence"] if _sim_controls["manual_cadence"] is not None else SIM_DEFAULT_CADENCE
-
-            ble_state["power"] = int(round(power))
-            ble_state["cadence"] = float(cadence)
-            ble_state["elapsed"] += dt
-
-            if _sim_controls["manual_distance"] is not None:
-                ble_state["distance"] = float(_sim_controls["manual_distance"])
-            else:
-                strokes_per_sec = ble_state["cadence"] / 60.0
-                ble_state["distance"] += strokes_per_sec * DISTANCE_PER_STROKE * dt
-
-            if _sim_controls["manual_energy"] is not None:
-                ble_state["energy_kwh"] = float(_sim_controls["manual_energy"])
-            else:
-                ble_state["energy_kwh"] += (ble_state["power"] * dt) / 3_600_000.0
-        else:
-            ble_state["power"] = 0
-            ble_state["cadence"] = 0.0
+        _observe_lateness(dt - SIM_TICK_SECONDS, _SIM_LOOP_LABELS)
+        for index, device in enumerate(sim_devices):
+            _simulate_device_tick(device, dt, index)
+            device.analytics.add_power(now, device.state["power"], dt)
 
         prev = now
+        _notify_tick(now)
 
 
-async def ble_logger():
-    """
-    Real PM5 logger.
-    """
-    global _start_t, _stroke_intervals, _last_notify_t, _last_notified_power, _last_stroke_t
+_BLE_LOOP_LABELS = {"loop": "ble"}
+_SIM_LOOP_LABELS = {"loop": "sim"}
 
-    retry_start = _now_mono()
-    print(f"⏳ Initial boot delay {int(INITIAL_BOOT_DELAY)}s before starting BLE scan...")
-    await asyncio.sleep(INITIAL_BOOT_DELAY)
 
-    while True:
-        try:
-            print("🔍 Scanning for PM5...")
-            devices = await BleakScanner.discover(timeout=SCAN_INTERVAL)
-            pm5 = next((d for d in devices if d.name and ("PM5" in d.name or "Concept2" in d.name)), None)
-
-            if not pm5:
-                if _now_mono() - retry_start > RETRY_TIMEOUT:
-                    print("❌ Timed out waiting for PM5 to advertise. Resetting retry timer.")
-                    retry_start = _now_mono()
-                print("⏳ PM5 not found. Retrying in 5s...")
-                await asyncio.sleep(5)
-                continue
-
-            print(f"✅ Found PM5: {pm5.name} [{pm5.address}]")
-            async with BleakClient(pm5.address) as client:
-                await client.start_notify(UUID_0036, notification_handler)
-                print("🔗 Connected to PM5 BLE")
-                ble_state["connected"] = True
-
-                try:
-                    await client.write_gatt_char(UUID_WRITE, build_sleep_command())
-                    print("🛌 PM5 sleep timeout extended.")
-                except Exception as e:
-                    print(f"⚠️ Sleep extension failed (non-fatal): {e}")
+def _observe_lateness(lateness: float, labels: Dict[str, str]):
+    lateness = max(0.0, lateness)
+    metrics.tick_lateness_seconds.observe(lateness, labels)
+    if lateness > TICK_LATE_WARN_SEC:
+        logger.warning("🐢 %s tick %.0f ms late", labels["loop"], lateness * 1000,
+                       extra={**labels, "lateness": round(lateness, 4), "fold": True})
 
-                _start_t = _now_mono()
-                _stroke_intervals.clear()
-                _last_stroke_t = None
-                _last_notify_t = None
-                _last_notified_power = 0
 
-                reset_session_metrics()
+def run_tick(now: float, dt: float):
+    """One tick for all connected machines: derive display power/cadence and integrate."""
+    session_active = ble_state["session_active"]
+    for device in devices.values():
+        device.tick(now, dt, session_active)
+    _notify_tick(now)
 
-                prev = _now_mono()
 
-                while True:
-                    await asyncio.sleep(TICK_SECONDS)
+async def _ble_tick_loop():
+    prev = _now_mono()
 
-                    now = _now_mono()
-                    dt = now - prev
-                    if dt <= 0:
-                        prev = now
-                        continue
+    while True:
+        await asyncio.sleep(TICK_SECONDS)
 
-                    if _last_stroke_t is None or (now - _last_stroke_t) > CADENCE_IDLE_SEC:
-                        ble_state["cadence"] = 0.0
-                        _stroke_intervals.clear()
+        now = _now_mono()
+        dt = now - prev
+        if dt <= 0:
+            prev = now
+            continue
 
-                    if _last_notify_t is None:
-                        ble_state["power"] = 0
-                    else:
-                        age = now - _last_notify_t
-                        if age <= POWER_HOLD_SEC:
-                            ble_state["power"] = _last_notified_power
-                        elif age < POWER_HOLD_SEC + POWER_DECAY_WINDOW:
-                            t = age - POWER_HOLD_SEC
-                            factor = max(0.0, 1.0 - (t / POWER_DECAY_WINDOW))
-                            ble_state["power"] = int(round(_last_notified_power * factor))
-                        else:
-                            ble_state["power"] = 0
+        _observe_lateness(dt - TICK_SECONDS, _BLE_LOOP_LABELS)
+        run_tick(now, dt)
+        prev = now
 
-                    if ble_state["session_active"]:
-                        ble_state["elapsed"] += dt
+        if not ble_state["session_active"] and all(device.is_idle(now) for device in devices.values()):
+            _wake_event.clear()
+            try:
+                await asyncio.wait_for(_wake_event.wait(), IDLE_CHECK_SEC)
+            except asyncio.TimeoutError:
+                pass
+            prev = _now_mono()
+
+
+def load_known_devices() -> Dict[str, str]:
+    """Last connected PM5 addresses (address -> name), most recent first."""
+    try:
+        with open(KNOWN_DEVICES_FILE, "r", encoding="utf-8") as f:
+            known = json.load(f)
+        return {str(address): str(name) for address, name in known.items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def save_known_devices(known: Dict[str, str]):
+    directory = os.path.dirname(KNOWN_DEVICES_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{KNOWN_DEVICES_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(known, f)
+    os.replace(tmp, KNOWN_DEVICES_FILE)
+
+
+async def reset_adapter():
+    """Power-cycle the local Bluetooth adapter via bluetoothctl without blocking the loop."""
+    logger.info("🔌 Power-cycling Bluetooth adapter...")
+    metrics.ble_adapter_resets_total.inc()
+    for state in ("off", "on"):
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "bluetoothctl", "power", state,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            await proc.wait()
+        except OSError as e:
+            logger.warning("⚠️ Adapter reset failed: %s", e)
+            return
+        if state == "off":
+            await asyncio.sleep(1)
+
+
+def _is_pm5(name: str | None) -> bool:
+    return bool(name) and ("PM5" in name or "Concept2" in name)
+
+
+async def _scan_for_pm5(needed: int, exclude, timeout: float | None = None) -> List[Tuple[Any, str]]:
+    """Scan until `needed` new PM5s have advertised or `timeout` (default SCAN_INTERVAL) elapses."""
+    found: Dict[str, Tuple[Any, str]] = {}
+    enough = asyncio.Event()
+
+    def on_detect(ble_device, advertisement):
+        name = ble_device.name or advertisement.local_name
+        if ble_device.address in exclude or not _is_pm5(name):
+            return
+        found[ble_device.address] = (ble_device, name)
+        if len(found) >= needed:
+            enough.set()
+
+    scan_start = _now_mono()
+    async with BleakScanner(detection_callback=on_detect):
+        try:
+            await asyncio.wait_for(enough.wait(), SCAN_INTERVAL if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            pass
+    metrics.ble_scan_seconds.observe(_now_mono() - scan_start)
+    return list(found.values())[:needed]
 
-                        if ble_state["cadence"] > 0:
-                            strokes_per_sec = ble_state["cadence"] / 60.0
-                            ble_state["distance"] += strokes_per_sec * DISTANCE_PER_STROKE * dt
 
-                        ble_state["energy_kwh"] += (ble_state["power"] * dt) / 3_600_000.0
+async def _run_device_connection(target, name: str, timeout: float) -> bool:
+    """
+    Hold one PM5 connection until it drops. `target` is a scanned BLEDevice or a
+    known address string (direct connect). Returns True if the link came up.
+    """
+    address = target if isinstance(target, str) else target.address
+    device = _device_for(address, name)
+    connect_start = _now_mono()
+    connected = False
+    try:
+        async with BleakClient(target, disconnected_callback=device.on_disconnect, timeout=timeout) as client:
+            await client.start_notify(UUID_MULTIPLEXED, device.notification_handler)
+            connected = True
+            logger.info("🔗 Connected to PM5 BLE (%s)", device.device_id, extra=device.metric_labels)
+
+            try:
+                await client.write_gatt_char(UUID_WRITE, build_sleep_command())
+                logger.info("🛌 PM5 sleep timeout extended.", extra=device.metric_labels)
+            except Exception as e:
+                logger.warning("⚠️ Sleep extension failed (non-fatal): %s", e, extra=device.metric_labels)
+
+            if device.start_t is not None:
+                metrics.ble_reconnects_total.inc(labels=device.metric_labels)
+            metrics.ble_connect_seconds.observe(_now_mono() - connect_start)
+            device.on_connect(_now_mono())
+            wake_logger()
+            await device.disconnected.wait()
+            logger.info("🔌 PM5 %s disconnected.", device.device_id, extra=device.metric_labels)
+    except Exception as e:
+        logger.warning("⚠️ BLE connection error (%s): %s", device.device_id, e, extra=device.metric_labels)
+        metrics.ble_errors_total.inc(labels=device.metric_labels)
+        device.on_disconnect()
+        _notify_tick(_now_mono())
+    return connected
+
+
+async def pm5_advertising(timeout: float) -> bool:
+    """True as soon as any PM5 advertises, False after `timeout` seconds."""
+    await asyncio.to_thread(_import_bleak)
+    return bool(await _scan_for_pm5(1, exclude=(), timeout=timeout))
+
+
+_shelly: ShellyClient | None = None
+
+
+async def wake_pm5(force: bool) -> bool:
+    """Power-cycle the PM5 through the Shelly relay (see shelly.py); False if disabled or failed."""
+    global _shelly
+    if not SHELLY_HOST:
+        return False
+    if _shelly is None:
+        _shelly = ShellyClient(SHELLY_HOST, SHELLY_PORT)
+    cycle = PowerCycle(_shelly, SHELLY_RELAY_ID, pm5_advertising)
+    ok = await cycle.run(force=force)
+    metrics.shelly_power_cycles_total.inc(labels={"result": cycle.state})
+    metrics.shelly_power_cycle_seconds.observe(cycle.elapsed)
+    return ok
+
+
+def _import_bleak():
+    global BleakScanner, BleakClient
+    if BleakScanner is None or BleakClient is None:
+        import bleak
+        BleakScanner, BleakClient = bleak.BleakScanner, bleak.BleakClient
 
-                    prev = now
 
-        except Exception as e:
-            print(f"⚠️ BLE logger error: {e}\n{traceback.format_exc()}")
-            ble_state["connected"] = False
-            print("🔄 Restarting BLE loop in 5s...")
-            await asyncio.sleep(5)
\ No newline at end of file
+async def ble_logger():
+    """
+    Real PM5 logger: a connection supervisor that keeps up to MAX_DEVICES machines
+    connected concurrently, plus one shared tick loop.
+    """
+    retry_start = _now_mono()
+    await asyncio.to_thread(_import_bleak)
+    if INITIAL_BOOT_DELAY > 0:
+        logger.info("⏳ Initial boot delay %gs before starting BLE scan...", INITIAL_BOOT_DELAY)
+        await asyncio.sleep(INITIAL_BOOT_DELAY)
+    if BLE_RESET_ON_START:
+        await reset_adapter()
+    if SHELLY_HOST and SHELLY_WAKE_ON_START:
+        # Only touches the relay if the PM5 is unpowered or not advertising
+        await wake_pm5(force=False)
+
+    tick_task = asyncio.create_task(_ble_tick_loop())
+    connections: Dict[str, asyncio.Task] = {}
+    known = load_known_devices()
+    # Addresses worth a direct connect: last known ones, and any link that just dropped
+    direct = set(known)
+    backoff = Backoff(RETRY_BACKOFF_BASE, RETRY_BACKOFF_CAP)
+    failures = 0
+
+    try:
+        while True:
+            try:
+                for address, task in list(connections.items()):
+                    if not task.done():
+                        continue
+                    del connections[address]
+                    if task.result():
+                        # The PM5 was reachable until now: RETRY_TIMEOUT counts from the drop
+                        retry_start = _now_mono()
+                        direct.add(address)
+                        backoff.reset()
+                        failures = 0
+                    else:
+                        direct.discard(address)
+                        failures += 1
+
+                missing = MAX_DEVICES - len(connections)
+                if missing <= 0:
+                    await asyncio.wait(set(connections.values()), return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                if ADAPTER_RESET_AFTER_FAILURES and failures >= ADAPTER_RESET_AFTER_FAILURES:
+                    await reset_adapter()
+                    failures = 0
+
+                if failures:
+                    await asyncio.sleep(backoff.next_delay())
+
+                targets = [(address, known.get(address, "PM5"), DIRECT_CONNECT_TIMEOUT)
+                           for address in direct if address not in connections][:missing]
+                if targets:
+                    logger.info("⚡ Direct connect to known PM5: %s", ", ".join(address for address, _, _ in targets))
+                else:
+                    logger.info("🔍 Scanning for PM5...")
+                    found = await _scan_for_pm5(missing, exclude=set(connections))
+                    targets = [(ble_device, name, SCAN_INTERVAL * 2) for ble_device, name in found]
+
+                if not targets:
+                    if _now_mono() - retry_start > RETRY_TIMEOUT:
+                        logger.error("❌ Timed out waiting for PM5 to advertise. Resetting retry timer.")
+                        # An asleep PM5 stops advertising; with no machine connected, power-cycle it
+                        woke = not connections and await wake_pm5(force=True)
+                        retry_start = _now_mono()
+                        if woke:
+                            backoff.reset()
+                            continue
+                    delay = backoff.next_delay()
+                    logger.info("⏳ PM5 not found. Retrying in %.1fs...", delay, extra={"fold": True})
+                    await asyncio.sleep(delay)
+                    continue
+
+                for target, name, timeout in targets:
+                    address = target if isinstance(target, str) else target.address
+                    if address not in known or known[address] != name:
+                        known = {address: name, **{k: v for k, v in known.items() if k != address}}
+                        await asyncio.to_thread(save_known_devices, known)
+                    if not isinstance(target, str):
+                        logger.info("✅ Found PM5: %s [%s]", name, address)
+                    connections[address] = asyncio.create_task(_run_device_connection(target, name, timeout))
+
+            except Exception as e:
+                logger.exception("⚠️ BLE supervisor error: %s", e)
+                failures += 1
+                delay = backoff.next_delay()
+                logger.info("🔄 Restarting BLE scan in %.1fs...", delay)
+                await asyncio.sleep(delay)
+    finally:
+        tick_task.cancel()
+        for task in connections.values():
+            task.cancel()
+        if _shelly is not None:
+            _shelly.close()
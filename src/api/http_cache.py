@@ -0,0 +1,72 @@
+# src/api/http_cache.py
+"""
+Pre-encoded JSON responses with ETag / conditional GET support.
+
+Payloads are encoded once per state version and reused as raw bytes until the
+version moves, so repeated polls cost a dict lookup instead of a rebuild.
+"""
+import hashlib
+import json
+import time
+from typing import Any, Callable
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Distinguishes ETags across restarts, when version counters start over.
+BOOT_ID = f"{time.time_ns():x}"
+
+
+def encode_json(obj: Any) -> bytes:
+    # Same encoding FastAPI's JSONResponse uses.
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def content_digest(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+
+class EncodedPayload:
+    __slots__ = ("version", "body", "etag")
+
+    def __init__(self, version, body: bytes, etag: str):
+        self.version = version
+        self.body = body
+        self.etag = etag
+
+
+class VersionedCache:
+    """Holds the encoded body for the latest version; rebuilds lazily on change."""
+
+    def __init__(self, name: str, build: Callable[[], bytes]):
+        self._name = name
+        self._build = build
+        self._entry: EncodedPayload | None = None
+
+    def get(self, version) -> EncodedPayload:
+        entry = self._entry
+        if entry is None or entry.version != version:
+            body = self._build()
+            entry = EncodedPayload(version, body, f'"{self._name}-{BOOT_ID}-{version}"')
+            self._entry = entry
+        return entry
+
+    def invalidate(self):
+        self._entry = None
+
+
+def cached_json_response(request: Request, payload: EncodedPayload, cache_control: str = "no-cache") -> Response:
+    headers = {"ETag": payload.etag, "Cache-Control": cache_control}
+    if etag_matches(request, payload.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
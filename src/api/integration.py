@@ -0,0 +1,114 @@
+# src/api/integration.py
+"""
+Event-driven power -> energy integration.
+
+Energy is integrated from PM5 notification timestamps rather than from the
+tick loop's dt, so totals don't depend on event-loop jitter. The power curve
+between notifications is modelled as:
+
+    gap <= hold               trapezoid from the previous to the new sample
+    gap >  hold               previous value held for `hold` seconds, then a
+                              linear decay to 0 over `decay` seconds, then 0
+
+The same shape (hold, then decay) extends past the last sample, so readers
+can ask for the energy "as of now" between notifications.
+"""
+from typing import Iterable, Tuple
+
+J_PER_KWH = 3_600_000.0
+
+
+def hold_decay_area(p0: float, x0: float, x1: float, hold: float, decay: float) -> float:
+    """Integral of the hold/decay curve started at x=0 with value p0, over [x0, x1]."""
+    def cumulative(x: float) -> float:
+        if x <= hold:
+            return p0 * x
+        if decay <= 0:
+            return p0 * hold
+        y = min(x - hold, decay)
+        return p0 * hold + p0 * (y - (y * y) / (2.0 * decay))
+
+    if x1 <= x0:
+        return 0.0
+    return cumulative(x1) - cumulative(x0)
+
+
+class PowerIntegrator:
+    __slots__ = ("hold", "decay", "origin", "energy_j", "last_t", "last_power")
+
+    def __init__(self, hold: float, decay: float):
+        self.hold = hold
+        self.decay = decay
+        self.origin = 0.0
+        self.energy_j = 0.0
+        self.last_t: float | None = None
+        self.last_power = 0.0
+
+    def reset(self, now: float):
+        """Start counting energy from `now`; the last sample is kept for display power."""
+        self.origin = now
+        self.energy_j = 0.0
+
+    def rebase(self, now: float):
+        """
+        Link re-established: commit the hold/decay tail up to `now` and restart
+        from a zero-power sample at `now`, keeping the accumulated energy.
+        """
+        if self.last_t is not None and now > self.last_t:
+            lo = max(self.origin, self.last_t)
+            self.energy_j += hold_decay_area(
+                self.last_power, lo - self.last_t, now - self.last_t, self.hold, self.decay
+            )
+        self.last_t = now
+        self.last_power = 0.0
+
+    def add_sample(self, t: float, power: float):
+        if self.last_t is not None and t > self.last_t:
+            self.energy_j += self._segment_area(self.last_t, self.last_power, t, power)
+        self.last_t = t
+        self.last_power = float(power)
+
+    def energy_kwh_at(self, now: float) -> float:
+        """Committed energy plus the provisional hold/decay tail up to `now`."""
+        energy = self.energy_j
+        if self.last_t is not None and now > self.last_t:
+            lo = max(self.origin, self.last_t)
+            energy += hold_decay_area(self.last_power, lo - self.last_t, now - self.last_t, self.hold, self.decay)
+        return energy / J_PER_KWH
+
+    def power_at(self, now: float) -> float:
+        if self.last_t is None:
+            return 0.0
+        age = now - self.last_t
+        if age <= self.hold:
+            return self.last_power
+        if age < self.hold + self.decay:
+            return self.last_power * max(0.0, 1.0 - (age - self.hold) / self.decay)
+        return 0.0
+
+    def is_idle(self, now: float) -> bool:
+        return self.last_t is None or (now - self.last_t) >= self.hold + self.decay
+
+    def _segment_area(self, t0: float, p0: float, t1: float, p1: float) -> float:
+        lo = max(self.origin, t0)
+        if lo >= t1:
+            return 0.0
+        gap = t1 - t0
+        if gap <= self.hold:
+            p_lo = p0 + (p1 - p0) * (lo - t0) / gap
+            return 0.5 * (p_lo + p1) * (t1 - lo)
+        return hold_decay_area(p0, lo - t0, gap, self.hold, self.decay)
+
+
+def integrate_samples(samples: Iterable[Tuple[float, float]], hold: float, decay: float) -> float:
+    """Energy in kWh of a (t, power) series, e.g. a recorded notification trace."""
+    integrator = PowerIntegrator(hold, decay)
+    started = False
+    for t, power in samples:
+        if not started:
+            integrator.reset(t)
+            started = True
+        integrator.add_sample(t, power)
+    if integrator.last_t is None:
+        return 0.0
+    return integrator.energy_kwh_at(integrator.last_t + hold + decay)
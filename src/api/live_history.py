@@ -0,0 +1,143 @@
+# src/api/live_history.py
+"""
+Fixed-capacity history of per-tick samples with sequence numbers, so clients
+can backfill the live chart after a reload and then fetch only new samples.
+
+The ring is a flat buffer of columns, written in place by the acquisition
+loop (no per-sample objects). In daemon mode the same buffer is a region of
+the shared memory segment and API workers read it directly:
+
+    0     u64 next_seq      sequence number of the next sample; published last
+    8     u64 capacity
+    16    f64 t[capacity]           unix time of the tick
+    ...   f64 energy_kwh[capacity]
+    ...   f32 power[capacity]
+    ...   f32 cadence[capacity]
+    ...   u32 session[capacity]     session generation, 0 outside a session
+
+Sample `seq` lives in slot seq % capacity. There is a single writer; a reader
+copies a range and then re-reads next_seq, and any slot the writer may have
+reached in the meantime is dropped from the front of the copy, so reads
+never block or retry the writer.
+
+/history responses (little endian; the f64 columns are 8-byte aligned and the
+rest 4-byte aligned, so each maps straight onto a typed array):
+
+    0     u64 first_seq, u64 next_seq, u32 count, u32 capacity
+    24    f64 t[count], f64 energy_kwh[count], f32 power[count],
+          f32 cadence[count], u32 session[count]
+"""
+import os
+import struct
+from typing import Dict, List, NamedTuple
+
+# 30 minutes at the default 0.2 s tick
+HISTORY_CAPACITY = int(os.getenv("HISTORY_CAPACITY", "9000"))
+
+REGION_HEADER = struct.Struct("<QQ")
+RESPONSE_HEADER = struct.Struct("<QQII")
+
+# (name, memoryview format, width); order is the layout order
+COLUMNS = (("t", "d", 8), ("energy_kwh", "d", 8), ("power", "f", 4), ("cadence", "f", 4), ("session", "I", 4))
+SAMPLE_BYTES = sum(width for _, _, width in COLUMNS)
+
+
+def region_size(capacity: int) -> int:
+    return REGION_HEADER.size + capacity * SAMPLE_BYTES
+
+
+class HistorySlice(NamedTuple):
+    first_seq: int
+    next_seq: int
+    capacity: int
+    # One bytes object per column, in COLUMNS order
+    columns: List[bytes]
+
+    @property
+    def count(self) -> int:
+        return self.next_seq - self.first_seq
+
+    def encode(self) -> bytes:
+        return b"".join((RESPONSE_HEADER.pack(self.first_seq, self.next_seq, self.count, self.capacity), *self.columns))
+
+    def as_dict(self) -> Dict[str, object]:
+        data: Dict[str, object] = {"first_seq": self.first_seq, "next_seq": self.next_seq}
+        for (name, fmt, _), raw in zip(COLUMNS, self.columns):
+            data[name] = memoryview(raw).cast(fmt).tolist()
+        return data
+
+
+class TickHistory:
+    """
+    Ring of samples over `buf` (a bytearray of its own by default). With
+    capacity=None the buffer is an existing region and its capacity is read
+    from the region header (the reader side in daemon mode).
+    """
+
+    __slots__ = ("capacity", "_buf", "_columns", "_next")
+
+    def __init__(self, buf=None, capacity: int | None = HISTORY_CAPACITY):
+        if buf is None:
+            buf = bytearray(region_size(capacity))
+        # Keep a caller's memoryview (a slice of a segment) so release() frees it too
+        self._buf = buf if isinstance(buf, memoryview) else memoryview(buf)
+        if capacity is None:
+            self._next, capacity = REGION_HEADER.unpack_from(self._buf, 0)
+        else:
+            self._next = 0
+            REGION_HEADER.pack_into(self._buf, 0, 0, capacity)
+        self.capacity = capacity
+
+        self._columns = []
+        offset = REGION_HEADER.size
+        for _, fmt, width in COLUMNS:
+            self._columns.append(self._buf[offset:offset + capacity * width].cast(fmt))
+            offset += capacity * width
+
+    @property
+    def next_seq(self) -> int:
+        return REGION_HEADER.unpack_from(self._buf, 0)[0]
+
+    def append(self, t: float, energy_kwh: float, power: float, cadence: float, session: int) -> int:
+        """Writer side only. Returns the sample's sequence number."""
+        seq = self._next
+        slot = seq % self.capacity
+        t_col, energy_col, power_col, cadence_col, session_col = self._columns
+        t_col[slot] = t
+        energy_col[slot] = energy_kwh
+        power_col[slot] = power
+        cadence_col[slot] = cadence
+        session_col[slot] = session
+        self._next = seq + 1
+        REGION_HEADER.pack_into(self._buf, 0, self._next, self.capacity)
+        return seq
+
+    def since(self, seq: int) -> HistorySlice:
+        """Samples with sequence numbers >= seq that are still in the ring (all of them for seq=0)."""
+        capacity = self.capacity
+        next_seq = self.next_seq
+        first = min(max(seq, next_seq - capacity, 0), next_seq)
+        columns = [self._copy(column, first, next_seq) for column in self._columns]
+
+        # The writer may have wrapped onto the oldest slots while they were copied
+        valid_from = self.next_seq + 1 - capacity
+        if valid_from > first:
+            drop = min(valid_from, next_seq) - first
+            columns = [raw[drop * width:] for raw, (_, _, width) in zip(columns, COLUMNS)]
+            first += drop
+        return HistorySlice(first, next_seq, capacity, columns)
+
+    def _copy(self, column: memoryview, start: int, stop: int) -> bytes:
+        if start >= stop:
+            return b""
+        a, b = start % self.capacity, stop % self.capacity
+        if a < b:
+            return column[a:b].tobytes()
+        return column[a:].tobytes() + column[:b].tobytes()
+
+    def release(self):
+        """Drop the views into the buffer (a shared memory segment cannot close while they exist)."""
+        for column in self._columns:
+            column.release()
+        self._columns = []
+        self._buf.release()
@@ -0,0 +1,74 @@
+# src/api/live_hub.py
+"""
+Publish/subscribe hub for live metrics.
+
+The tick loops publish the full live view once per tick; the hub diffs it
+against the previous view and fans out only the changed keys. Each subscriber
+owns a single pending dict that deltas are merged into, so a slow client only
+ever sees the latest values (conflation) and publishing never awaits.
+"""
+import asyncio
+from typing import Any, Dict, Set
+
+_MISSING = object()
+
+
+class LiveSubscriber:
+    __slots__ = ("pending", "event", "seq")
+
+    def __init__(self):
+        self.pending: Dict[str, Any] = {}
+        self.event = asyncio.Event()
+        self.seq = 0
+
+
+class LiveHub:
+    def __init__(self):
+        self._subscribers: Set[LiveSubscriber] = set()
+        self._last: Dict[str, Any] = {}
+        self.seq = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, view: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a new view and push the changed keys to all subscribers."""
+        last = self._last
+        changes = {k: v for k, v in view.items() if last.get(k, _MISSING) != v}
+        if not changes:
+            return changes
+
+        last.update(changes)
+        self.seq += 1
+        for sub in self._subscribers:
+            sub.pending.update(changes)
+            sub.seq = self.seq
+            sub.event.set()
+        return changes
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self._last)
+
+    def subscribe(self) -> LiveSubscriber:
+        sub = LiveSubscriber()
+        sub.seq = self.seq
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: LiveSubscriber):
+        self._subscribers.discard(sub)
+
+    async def next_delta(self, sub: LiveSubscriber, timeout: float | None = None) -> Dict[str, Any] | None:
+        """Wait for pending changes; returns None if the timeout elapses first."""
+        if not sub.pending:
+            try:
+                await asyncio.wait_for(sub.event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        sub.event.clear()
+        changes, sub.pending = sub.pending, {}
+        return changes
+
+
+live_hub = LiveHub()
@@ -0,0 +1,244 @@
+# src/api/logs.py
+"""
+Non-blocking logging for the API and the acquisition daemon.
+
+Callers (the event loop, the BLE callbacks) only build a LogRecord and put it
+on a bounded queue; a QueueListener thread formats and writes it. Nothing on
+the caller's side touches a file, a terminal or a lock that I/O can hold:
+
+    logger.info(...) -> RepeatFilter -> QueueHandler -> queue -> listener thread
+                                                                  +- console (text)
+                                                                  +- LOG_FILE (JSON lines,
+                                                                     rotated + gzipped)
+
+- Repeats: a record with the same logger, level, formatted message and device
+  as one emitted less than LOG_REPEAT_SEC ago is dropped and counted; the
+  next one after the window carries `suppressed=N`. Noisy call sites whose
+  numbers vary opt in with extra={"fold": True} to fold on the message
+  template instead, so the scan loop's "PM5 not found. Retrying in ..." every
+  few seconds becomes one line a minute.
+- Full queue: records are dropped and counted (bikeerg_log_records_dropped_total),
+  never waited for.
+- Structured fields: anything passed as `extra=` (device, lateness, ...) plus
+  the process-wide context from set_context() (session id) is written as JSON
+  keys in the file.
+- Rotation: LOG_FILE rolls over at LOG_MAX_BYTES or every LOG_ROTATE_SEC,
+  whichever comes first, keeping LOG_BACKUPS gzip-compressed files. The
+  compression runs on the listener thread.
+
+LOG_FILE may contain {process} (api, acquisition) and {pid}, so several
+worker processes never share one rotating file.
+"""
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from src.api import metrics
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "")
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "1") == "1"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_ROTATE_SEC = float(os.getenv("LOG_ROTATE_SEC", str(24 * 3600)))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_REPEAT_SEC = float(os.getenv("LOG_REPEAT_SEC", "60"))
+REPEAT_KEYS_MAX = 1024
+
+# Attributes every LogRecord has (plus RepeatFilter's fold flag); anything else came from extra= or the context
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "fold"}
+
+_context: Dict[str, Any] = {}
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: logging.Handler | None = None
+
+
+def set_context(**fields):
+    """Fields added to every record from now on (None removes one), e.g. set_context(session=...)."""
+    for name, value in fields.items():
+        if value is None:
+            _context.pop(name, None)
+        else:
+            _context[name] = value
+
+
+# =========================
+# Caller side (must stay cheap)
+# =========================
+
+class RepeatFilter(logging.Filter):
+    """Folds records repeating the same message (or template, with fold=True) within `window` seconds."""
+
+    def __init__(self, window: float = LOG_REPEAT_SEC):
+        super().__init__()
+        self.window = window
+        # key -> [first emission time, suppressed since then]
+        self._seen: Dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if _context:
+            record.__dict__.update(_context)
+        if self.window <= 0:
+            return True
+        if getattr(record, "fold", False):
+            text = record.msg if type(record.msg) is str else repr(record.msg)
+        else:
+            text = record.getMessage()
+        key = (record.name, record.levelno, text, getattr(record, "device", None))
+        now = time.monotonic()
+        entry = self._seen.get(key)
+        if entry is not None and now - entry[0] < self.window:
+            entry[1] += 1
+            metrics.log_records_suppressed_total.inc()
+            return False
+        if entry is not None and entry[1]:
+            record.suppressed = entry[1]
+        if entry is None and len(self._seen) >= REPEAT_KEYS_MAX:
+            self._seen.clear()
+        self._seen[key] = [now, 0]
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) instead of blocking or erroring when the queue is full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Records are not shared with other handlers, so skip the stock copy + full format:
+        # just merge the args and render a traceback (the only expensive part) if there is one.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.log_records_dropped_total.inc()
+
+
+# =========================
+# Listener side (background thread)
+# =========================
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for name, value in record.__dict__.items():
+            if name not in _STANDARD_ATTRS:
+                entry[name] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} similar suppressed)" if suppressed else text
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rolls over at max_bytes or every `interval` seconds; rotated files are gzipped."""
+
+    def __init__(self, filename: str, max_bytes: int, interval: float, backups: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self.interval = interval
+        self.rollover_at = self._next_rollover()
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._compress
+
+    def _next_rollover(self) -> float:
+        return time.time() + self.interval if self.interval > 0 else float("inf")
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at and os.path.exists(self.baseFilename):
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover()
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+# =========================
+# Setup
+# =========================
+
+def setup_logging(process: str) -> logging.handlers.QueueListener:
+    """Route the root logger through the queue; idempotent per process."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    handlers = []
+    if LOG_CONSOLE:
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(TextFormatter())
+        handlers.append(console)
+    if LOG_FILE:
+        path = LOG_FILE.format(process=process, pid=os.getpid())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        file_handler = CompressingRotatingFileHandler(path, LOG_MAX_BYTES, LOG_ROTATE_SEC, LOG_BACKUPS)
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    # Neither formatter prints the caller's file/line or thread, so skip collecting them on every
+    # record (the stack walk is most of a record's cost; see "Optimization" in the logging docs)
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logMultiprocessing = False
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(RepeatFilter())
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(LOG_LEVEL)
+    set_context(role=process)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Flush everything queued and stop the writer thread."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _queue_handler = None
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
@@ -1,169 +1,577 @@
 # src/api/main.py
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import APIRouter, FastAPI, HTTPException, Path as PathParam, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 import asyncio
 import json
+import logging
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 
-from src.api.ble_runner import (
-    ble_logger,
-    simulated_logger,
-    ble_state,
-    reset_session_metrics,
-    reset_test_state,
-    set_simulated_power,
-    set_simulated_cadence,
-    set_simulated_energy,
-    set_simulated_distance,
-    set_simulation_profile,
-    get_simulation_status,
-)
+from src.api.acquisition import AcquisitionError, create_acquisition
+from src.api.http_cache import VersionedCache, cached_json_response, encode_json
+from src.api import metrics
+from src.api.analytics import EMPTY_ANALYTICS_VIEW, analytics_view
+from src.api.live_hub import live_hub
+from src.api.logs import setup_logging, shutdown_logging
+from src.api import session_export
+from src.api.session_store import SessionStore
+from src.api.session_writer import SessionWriter
+from src.api.static_assets import StaticAssets
+from src.api.task_catalog import EMPTY_CATALOG, TaskCatalog, TaskCatalogWatcher, load_task_catalog
+from src.api.task_index import LevelTracker
+
+router = APIRouter()
+# Registered after `router`: serves the frontend build for any other GET path
+frontend_router = APIRouter()
 
-app = FastAPI()
-last_session_snapshot = {}
+logger = logging.getLogger(__name__)
+
+STREAM_KEEPALIVE_SEC = float(os.getenv("STREAM_KEEPALIVE_SEC", "15"))
 
 LOG_DIR = "session_logs"
-os.makedirs(LOG_DIR, exist_ok=True)
 
 SIM_MODE = os.getenv("SIM_MODE", "0") == "1"
 
-# --- Load shared AI task config ---
+# BLE/sim loop, trace recorder and session flags: in this process, or in the
+# acquisition daemon when ACQUISITION=daemon (see acquisition.py)
+acquisition = create_acquisition()
+_session_generation = 0
+
+SESSION_DB = os.getenv("SESSION_DB", os.path.join(LOG_DIR, "sessions.sqlite3"))
+session_store = SessionStore(SESSION_DB)
+session_writer = SessionWriter(LOG_DIR, session_store)
+
+# Per-day columnar rollups of the session files (see session_export.py)
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(LOG_DIR, "columnar"))
+
+# --- Shared AI task config (read at startup, hot-reloaded when the file changes) ---
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TASKS_FILE = BASE_DIR / "config" / "ai_tasks.json"
+TASKS_IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+TASKS_WATCH = os.getenv("TASKS_WATCH", "1") == "1"
+
+# Production frontend build (`npm run build`), served when present
+FRONTEND_DIST = os.getenv("FRONTEND_DIST", str(BASE_DIR / "frontend" / "dist"))
+frontend_assets = StaticAssets(FRONTEND_DIST)
+
+_task_catalog: TaskCatalog | None = None
+level_tracker = LevelTracker(EMPTY_CATALOG.index)
+
+
+def get_task_catalog() -> TaskCatalog:
+    """The task catalogue in use; loaded from TASKS_FILE on first call."""
+    if _task_catalog is None:
+        install_task_catalog(load_task_catalog(TASKS_FILE))
+    return _task_catalog
+
+
+def install_task_catalog(catalog: TaskCatalog):
+    # A single reference swap: readers hold either the old or the new catalogue.
+    global _task_catalog
+    _task_catalog = catalog
+    level_tracker.set_index(catalog.index)
+    _data_cache.invalidate()
+
+
+def apply_reloaded_tasks(catalog: TaskCatalog):
+    """Runs on the event loop; the new tasks_version reaches /data, /stream and /ws via publish."""
+    install_task_catalog(catalog)
+    publish_live()
+
 
-with open(TASKS_FILE, "r", encoding="utf-8") as f:
-    AI_TASKS = json.load(f)
+def current_state():
+    return acquisition.primary()
 
 
-def log_session_to_file(snapshot):
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = os.path.join(LOG_DIR, f"session_{timestamp}.json")
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(snapshot, f, indent=2, ensure_ascii=False)
-    print(f"📄 Session saved to {filename}")
+def get_last_session_snapshot():
+    return acquisition.info.get("last_session_snapshot") or {}
 
 
-def get_energy_values():
-    raw_energy = float(ble_state.get("energy_kwh", 0.0))
+def get_energy_values(state=None):
+    raw_energy = float((state or current_state()).energy_kwh)
     return raw_energy, round(raw_energy, 4)
 
 
+def get_live_energy_values(state=None):
+    """Energy as shown on the dashboard: zero while no session is running."""
+    state = state or current_state()
+    if not state.session_active:
+        return 0.0, 0.0
+    return get_energy_values(state)
+
+
 def get_unlocked_tasks(raw_energy: float):
-    return [task for task in AI_TASKS if raw_energy >= task["threshold"]]
+    return get_task_catalog().index.unlocked(raw_energy)
 
 
 def get_current_level(raw_energy: float):
-    return len(get_unlocked_tasks(raw_energy))
+    return get_task_catalog().index.level_for(raw_energy)
+
+
+def track_unlocks():
+    state = current_state()
+    raw_energy, _ = get_live_energy_values(state)
+    event = level_tracker.update(raw_energy, state.elapsed)
+    if event:
+        logger.info("🔓 Unlocked level %d (%s) at %.1fs", event.level, event.task_id, event.at)
+
+
+def build_live_view():
+    """Everything /data returns except the static task config."""
+    state = current_state()
+    session_active = state.session_active
+    raw_energy, display_energy = get_live_energy_values(state)
+    current_level = level_tracker.level
+    last_unlock = level_tracker.last_event
+    next_threshold = level_tracker.next_threshold
+    if session_active:
+        analytics = analytics_view(acquisition.primary_analytics(), raw_energy, next_threshold)
+    else:
+        analytics = EMPTY_ANALYTICS_VIEW
+
+    return {
+        "power_watts": state.power if session_active else 0,
+        "stroke_rate": int(state.cadence) if session_active else 0,
+        "distance_meters": int(state.distance) if session_active else 0,
+        "calories": int(state.calories) if session_active else 0,
+        "pace_sec_per_500m": round(state.pace, 1) if session_active else 0.0,
+        "elapsed_time": int(state.elapsed) if session_active else 0,
+        "energy_kwh": raw_energy,
+        "energy_kwh_display": display_energy,
+        "session_active": session_active,
+        "connected": state.connected,
+        "last_session_snapshot": get_last_session_snapshot(),
+        "sim_mode": SIM_MODE,
+        "unlocked_count": current_level,
+        "current_level": current_level,
+        "next_threshold": next_threshold,
+        "last_unlock": last_unlock.as_dict() if last_unlock else None,
+        "tasks_version": get_task_catalog().version,
+        **analytics,
+    }
 
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def _encode_data_body() -> bytes:
+    # Splice the pre-encoded task list into the live view instead of re-encoding it.
+    # tasks_version is taken from the same catalogue as the body, even mid-reload.
+    catalog = get_task_catalog()
+    live = encode_json({**live_hub.snapshot(), "tasks_version": catalog.version})
+    return live[:-1] + b',"ai_tasks":' + catalog.body + b"}"
 
 
-@app.on_event("startup")
-async def startup_event():
-    if SIM_MODE:
-        print("🧪 Starting backend in SIM_MODE=1")
-        asyncio.create_task(simulated_logger())
-    else:
-        print("🚴 Starting backend in real BLE mode")
-        asyncio.create_task(ble_logger())
+_data_cache = VersionedCache("data", _encode_data_body)
 
 
-@app.get("/")
-def read_root():
+def _publish_view():
+    track_unlocks()
+    live_hub.publish(build_live_view())
+
+
+def publish_live():
+    """After an endpoint changed state between ticks: take fresh snapshots, then publish the view."""
+    acquisition.refresh()
+    _publish_view()
+
+
+def on_tick(now: float):
+    # A /start handled anywhere (another worker, in daemon mode) restarts unlock tracking here too
+    global _session_generation
+    generation = acquisition.info.get("generation", 0)
+    if generation != _session_generation:
+        _session_generation = generation
+        level_tracker.reset()
+    _publish_view()
+
+
+def build_bootstrap():
+    catalog = get_task_catalog()
+    return {
+        "seq": live_hub.seq,
+        "data": {**live_hub.snapshot(), "tasks_version": catalog.version, "ai_tasks": catalog.tasks},
+    }
+
+
+live_subscribers = metrics.registry.gauge("bikeerg_live_subscribers", "Connected /stream and /ws clients")
+pending_session_writes = metrics.registry.gauge(
+    "bikeerg_pending_session_writes", "Session summaries queued but not yet durable"
+)
+
+
+# =========================
+# Application factory + lifespan
+# Importing this module has no side effects; files, threads, the SQLite store
+# and the BLE/sim loops are set up here and the app serves before they finish.
+# =========================
+
+async def import_session_history():
+    imported = await asyncio.to_thread(session_store.import_json_dir, LOG_DIR)
+    if imported:
+        logger.info("🗂️ Imported %d session files into %s", imported, SESSION_DB)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    setup_logging("api")
+    os.makedirs(LOG_DIR, exist_ok=True)
+    install_task_catalog(await asyncio.to_thread(load_task_catalog, TASKS_FILE))
+    loop = asyncio.get_running_loop()
+    task_watcher = TaskCatalogWatcher(
+        TASKS_FILE, lambda catalog: loop.call_soon_threadsafe(apply_reloaded_tasks, catalog)
+    )
+    if TASKS_WATCH:
+        task_watcher.start(get_task_catalog().version)
+    session_writer.start()
+    if os.path.isdir(FRONTEND_DIST):
+        count = await asyncio.to_thread(frontend_assets.scan)
+        logger.info("🖼️ Serving frontend build from %s (%d files)", FRONTEND_DIST, count)
+    await acquisition.start(on_tick)
+    publish_live()
+
+    background = [asyncio.create_task(import_session_history())]
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        task_watcher.stop()
+        await acquisition.stop()
+        session_writer.close()
+        shutdown_logging()
+
+
+def create_app() -> FastAPI:
+    application = FastAPI(lifespan=lifespan)
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    application.add_middleware(metrics.RequestMetricsMiddleware)
+    application.include_router(router)
+    application.include_router(frontend_router)
+    return application
+
+
+@router.get("/")
+def read_root(request: Request):
+    if frontend_assets.available:
+        return frontend_assets.response(request, "index.html")
     return {
         "message": "Welcome to the Concept2 BikeErg Real-Time API",
         "sim_mode": SIM_MODE,
     }
 
 
-@app.get("/tasks")
-def get_tasks():
-    return AI_TASKS
+@router.get("/tasks")
+def get_tasks(request: Request):
+    return cached_json_response(request, get_task_catalog().payload)
+
+
+@router.get("/tasks/{version}")
+def get_tasks_version(version: str, request: Request):
+    catalog = get_task_catalog()
+    if version != catalog.version:
+        raise HTTPException(status_code=404, detail="Unknown task config version.")
+    return cached_json_response(request, catalog.payload, cache_control=TASKS_IMMUTABLE_CACHE)
+
+
+@router.get("/data")
+def get_data(request: Request):
+    # live_hub.seq only moves when a tick (or endpoint) changed the view,
+    # so between ticks this serves the same bytes, or a 304 on If-None-Match.
+    return cached_json_response(request, _data_cache.get(live_hub.seq))
+
+
+@router.get("/history")
+def get_history(
+    since: int = Query(0, ge=0, description="First sequence number wanted (next_seq of the previous reply)"),
+    fmt: str = Query("binary", alias="format", pattern="^(binary|json)$"),
+):
+    """
+    Per-tick samples (time, energy, power, cadence, session) from the ring
+    buffer, oldest first, for backfilling the live chart. Binary columns by
+    default (layout in live_history.py); format=json returns them as arrays.
+    A next_seq below the client's `since` means the backend restarted.
+    """
+    try:
+        history = acquisition.history_since(since)
+    except AcquisitionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    headers = {"Cache-Control": "no-store"}
+    if fmt == "json":
+        return Response(encode_json(history.as_dict()), media_type="application/json", headers=headers)
+    return Response(history.encode(), media_type="application/octet-stream", headers=headers)
+
+
+# =========================
+# Live streaming (SSE + WebSocket)
+# One bootstrap message with the full view and task config,
+# then compact deltas whenever the tick loop changes something.
+# =========================
+
+def _sse_event(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'), ensure_ascii=False)}\n\n"
+
+
+@router.get("/stream")
+async def stream_data(request: Request):
+    async def event_source():
+        sub = live_hub.subscribe()
+        try:
+            yield _sse_event("bootstrap", build_bootstrap())
+            while not await request.is_disconnected():
+                changes = await live_hub.next_delta(sub, timeout=STREAM_KEEPALIVE_SEC)
+                if changes is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse_event("delta", {"seq": sub.seq, "changes": changes})
+        finally:
+            live_hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def websocket_data(websocket: WebSocket):
+    await websocket.accept()
+    sub = live_hub.subscribe()
+    try:
+        await websocket.send_json({"type": "bootstrap", **build_bootstrap()})
+        while True:
+            changes = await live_hub.next_delta(sub, timeout=STREAM_KEEPALIVE_SEC)
+            if changes is None:
+                await websocket.send_json({"type": "keepalive", "seq": sub.seq})
+                continue
+            await websocket.send_json({"type": "delta", "seq": sub.seq, "changes": changes})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.unsubscribe(sub)
+
+
+# =========================
+# Instrumentation
+# =========================
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    live_subscribers.set(live_hub.subscriber_count)
+    pending_session_writes.set(session_writer.pending_count())
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 
-@app.get("/data")
-def get_data():
-    session_active = ble_state.get("session_active", False)
-    raw_energy, display_energy = get_energy_values()
+@router.post("/debug/profiler/start")
+async def profiler_start(interval_ms: float = Query(10.0, gt=0, description="Sampling interval")):
+    # Runs on the event loop thread, which is the thread the profiler samples
+    metrics.profiler.start(interval_ms / 1000.0)
+    return {"running": True, "interval_ms": interval_ms}
 
-    if not session_active:
-        raw_energy = 0.0
-        display_energy = 0.0
 
-    unlocked_tasks = get_unlocked_tasks(raw_energy)
-    current_level = len(unlocked_tasks)
+@router.post("/debug/profiler/stop")
+async def profiler_stop():
+    metrics.profiler.stop()
+    return {"running": False, "samples": metrics.profiler.samples}
 
+
+@router.get("/debug/profiler", response_class=PlainTextResponse)
+def profiler_report(limit: int = Query(200, ge=1, le=5000)):
+    return PlainTextResponse(metrics.profiler.collapsed(limit))
+
+
+# =========================
+# Multi-erg views
+# =========================
+
+def build_device_view(device):
+    """`device` is an acquisition DeviceRecord (id, name, snapshot, analytics values)."""
+    index = get_task_catalog().index
+    state = device.state
+    session_active = state.session_active
+    energy = state.energy_kwh if session_active else 0.0
+    level = index.level_for(energy)
+    next_threshold = index.threshold_at(level)
+    if session_active:
+        analytics = analytics_view(device.analytics, energy, next_threshold)
+    else:
+        analytics = EMPTY_ANALYTICS_VIEW
     return {
-        "power_watts": ble_state.get("power", 0) if session_active else 0,
-        "stroke_rate": int(ble_state.get("cadence", 0)) if session_active else 0,
-        "distance_meters": int(ble_state.get("distance", 0)) if session_active else 0,
-        "elapsed_time": int(ble_state.get("elapsed", 0)) if session_active else 0,
-        "energy_kwh": raw_energy,
-        "energy_kwh_display": display_energy,
+        "id": device.device_id,
+        "name": device.name,
+        "connected": state.connected,
+        "power_watts": state.power if session_active else 0,
+        "stroke_rate": int(state.cadence) if session_active else 0,
+        "distance_meters": int(state.distance) if session_active else 0,
+        "calories": int(state.calories) if session_active else 0,
+        "pace_sec_per_500m": round(state.pace, 1) if session_active else 0.0,
+        "elapsed_time": int(state.elapsed) if session_active else 0,
+        "energy_kwh": energy,
+        "energy_kwh_display": round(energy, 4),
         "session_active": session_active,
-        "connected": ble_state.get("connected", False),
-        "last_session_snapshot": last_session_snapshot,
-        "sim_mode": SIM_MODE,
-        "unlocked_count": current_level,
-        "current_level": current_level,
-        "ai_tasks": AI_TASKS,
+        "current_level": level,
+        "next_threshold": next_threshold,
+        **analytics,
+    }
+
+
+@router.get("/devices")
+def list_devices():
+    return {"devices": [build_device_view(device) for device in acquisition.devices()]}
+
+
+@router.get("/devices/team")
+def team_data():
+    views = [build_device_view(device) for device in acquisition.devices()]
+    total_energy = sum(view["energy_kwh"] for view in views)
+    level = get_current_level(total_energy)
+    return {
+        "devices": len(views),
+        "connected": sum(1 for view in views if view["connected"]),
+        "power_watts": sum(view["power_watts"] for view in views),
+        "distance_meters": sum(view["distance_meters"] for view in views),
+        "calories": sum(view["calories"] for view in views),
+        "energy_kwh": total_energy,
+        "energy_kwh_display": round(total_energy, 4),
+        "current_level": level,
+        "next_threshold": get_task_catalog().index.threshold_at(level),
+        "per_device": [{"id": view["id"], "energy_kwh": view["energy_kwh"]} for view in views],
     }
 
 
-@app.post("/start")
+@router.get("/devices/{device_id}/data")
+def device_data(device_id: str):
+    device = next((record for record in acquisition.devices() if record.device_id == device_id), None)
+    if device is None:
+        raise HTTPException(status_code=404, detail=f"Unknown device '{device_id}'.")
+    return build_device_view(device)
+
+
+# =========================
+# Session history (indexed store)
+# =========================
+
+def _day_or_today(day: str | None) -> str:
+    return day or datetime.now().strftime("%Y-%m-%d")
+
+
+@router.get("/sessions/top")
+def sessions_top(
+    day: str | None = Query(None, description="YYYY-MM-DD, defaults to today"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    day = _day_or_today(day)
+    return {"day": day, "sessions": session_store.top_sessions(day, limit)}
+
+
+@router.get("/sessions/per-hour")
+def sessions_per_hour(day: str | None = Query(None, description="YYYY-MM-DD, defaults to today")):
+    day = _day_or_today(day)
+    return {"day": day, "hours": session_store.sessions_per_hour(day)}
+
+
+@router.get("/sessions/write-status")
+def sessions_write_status(file: str = Query(..., description="File name returned by /stop")):
+    status = session_writer.status(file)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session file.")
+    return {"file": file, "status": status, "pending": session_writer.pending_count()}
+
+
+@router.get("/sessions/stats")
+def sessions_stats(day: str | None = Query(None, description="YYYY-MM-DD, omit for all time")):
+    return {"day": day, **session_store.stats(day)}
+
+
+def _compact_and_list():
+    result = session_export.compact(LOG_DIR, EXPORT_DIR)
+    return {**result, "partitions": session_export.list_partitions(EXPORT_DIR)}
+
+
+@router.get("/sessions/export")
+async def sessions_export_index():
+    """List the per-day columnar partitions; read-only, see POST to compact."""
+    try:
+        return {"partitions": await asyncio.to_thread(session_export.list_partitions, EXPORT_DIR)}
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Columnar export requires numpy.")
+
+
+@router.post("/sessions/export")
+async def sessions_export_compact():
+    """Roll new session files into the per-day partitions and advance the watermark."""
+    try:
+        return await asyncio.to_thread(_compact_and_list)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Columnar export requires numpy.")
+
+
+@router.get("/sessions/export/{day}")
+def sessions_export_day(day: str = PathParam(..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="YYYY-MM-DD")):
+    path = session_export.partition_path(EXPORT_DIR, day)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"No compacted sessions for {day}.")
+    # Streamed from disk in chunks; load with numpy.load(..., mmap_mode="r")
+    return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+
+
+async def run_command(name: str, /, **args):
+    try:
+        return await acquisition.command(name, **args)
+    except AcquisitionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/start")
 async def start_session():
-    reset_session_metrics()
-    ble_state["session_active"] = True
+    await run_command("start", session_id=datetime.now().strftime("session_%Y-%m-%d_%H-%M-%S"))
+    level_tracker.reset()
+    publish_live()
     return {"message": "Session started.", "sim_mode": SIM_MODE}
 
 
-@app.post("/stop")
+@router.post("/stop")
 async def stop_session():
-    raw_energy, display_energy = get_energy_values()
-    unlocked_tasks = get_unlocked_tasks(raw_energy)
-
-    last_session_snapshot.clear()
-    last_session_snapshot.update({
-        "elapsed_time": int(ble_state.get("elapsed", 0)),
-        "distance_meters": int(ble_state.get("distance", 0)),
+    state = current_state()
+    raw_energy, display_energy = get_energy_values(state)
+    index = get_task_catalog().index
+    level = index.level_for(raw_energy)
+
+    snapshot = {
+        "elapsed_time": int(state.elapsed),
+        "distance_meters": int(state.distance),
+        "calories": int(state.calories),
+        "avg_stroke_rate": round(state.avg_cadence, 1),
         "energy_kwh": raw_energy,
         "energy_kwh_display": display_energy,
-        "tasks_unlocked": [task["shortLabel"] for task in unlocked_tasks],
-        "tasks_unlocked_details": [
-            {
-                "id": task["id"],
-                "shortLabel": task["shortLabel"],
-                "label": task["label"],
-                "threshold": task["threshold"],
-            }
-            for task in unlocked_tasks
-        ],
-        "unlocked_count": len(unlocked_tasks),
-        "current_level": len(unlocked_tasks),
-        "total_tasks": len(AI_TASKS),
+        "tasks_unlocked": list(index.short_labels[:level]),
+        "tasks_unlocked_details": list(index.details[:level]),
+        "unlocked_count": level,
+        "current_level": level,
+        "total_tasks": index.total,
         "sim_mode": SIM_MODE,
         "stopped_at": datetime.now().isoformat(),
-    })
-
-    log_session_to_file(last_session_snapshot)
-
-    ble_state["session_active"] = False
-    asyncio.create_task(reset_after_delay())
-    return {"message": "Session stopped.", "snapshot": last_session_snapshot}
+    }
+    # Acquisition adds the trace stats and keeps the summary for /data until the cooldown ends
+    summary = await run_command("stop", snapshot=snapshot)
+    if summary is None:
+        return {"message": "No session running.", "snapshot": get_last_session_snapshot(), "persistence": None}
 
+    filename = await session_writer.submit(summary)
 
-async def reset_after_delay():
-    await asyncio.sleep(30)
-    reset_session_metrics()
-    last_session_snapshot.clear()
+    publish_live()
+    return {
+        "message": "Session stopped.",
+        "snapshot": summary,
+        "persistence": {"file": filename, "status": session_writer.status(filename)},
+    }
 
 
 # =========================
@@ -179,88 +587,102 @@ def ensure_sim_mode():
         )
 
 
-@app.get("/test/status")
-def test_status():
+@router.get("/test/status")
+async def test_status():
     ensure_sim_mode()
-    raw_energy, display_energy = get_energy_values()
+    simulation = await run_command("simulation_status")
+    state = current_state()
+    raw_energy, display_energy = get_energy_values(state)
+    level = get_current_level(raw_energy)
 
     return {
         "sim_mode": SIM_MODE,
-        "session_active": ble_state.get("session_active", False),
-        "ble_state": ble_state,
+        "session_active": state.session_active,
+        "ble_state": state._asdict(),
         "energy_kwh": raw_energy,
         "energy_kwh_display": display_energy,
-        "unlocked_count": len(get_unlocked_tasks(raw_energy)),
-        "current_level": get_current_level(raw_energy),
-        "total_tasks": len(AI_TASKS),
-        "simulation": get_simulation_status(),
+        "unlocked_count": level,
+        "current_level": level,
+        "total_tasks": get_task_catalog().index.total,
+        "session_state": acquisition.info.get("session_state"),
+        "simulation": simulation,
     }
 
 
-@app.post("/test/reset")
+@router.post("/test/reset")
 async def test_reset():
     ensure_sim_mode()
-    ble_state["session_active"] = False
-    reset_session_metrics()
-    reset_test_state()
-    last_session_snapshot.clear()
+    await run_command("test_reset")
+    publish_live()
     return {"message": "Simulation/test state reset."}
 
 
-@app.post("/test/set-energy")
+@router.post("/test/set-energy")
 async def test_set_energy(value: float = Query(..., description="Energy in kWh")):
     ensure_sim_mode()
-    set_simulated_energy(value)
-    ble_state["energy_kwh"] = float(value)
+    await run_command("set_energy", value=value)
+    publish_live()
+    level = get_current_level(float(value))
     return {
         "message": "Simulated energy updated.",
-        "energy_kwh": ble_state["energy_kwh"],
-        "unlocked_count": len(get_unlocked_tasks(float(value))),
-        "current_level": get_current_level(float(value)),
-        "total_tasks": len(AI_TASKS),
+        "energy_kwh": current_state().energy_kwh,
+        "unlocked_count": level,
+        "current_level": level,
+        "total_tasks": get_task_catalog().index.total,
     }
 
 
-@app.post("/test/set-power")
+@router.post("/test/set-power")
 async def test_set_power(value: float = Query(..., description="Power in watts")):
     ensure_sim_mode()
-    set_simulated_power(value)
-    ble_state["power"] = int(round(value))
-    return {"message": "Simulated power updated.", "power": ble_state["power"]}
+    await run_command("set_power", value=value)
+    publish_live()
+    return {"message": "Simulated power updated.", "power": current_state().power}
 
 
-@app.post("/test/set-cadence")
+@router.post("/test/set-cadence")
 async def test_set_cadence(value: float = Query(..., description="Cadence/SPM")):
     ensure_sim_mode()
-    set_simulated_cadence(value)
-    ble_state["cadence"] = float(value)
-    return {"message": "Simulated cadence updated.", "cadence": ble_state["cadence"]}
+    await run_command("set_cadence", value=value)
+    publish_live()
+    return {"message": "Simulated cadence updated.", "cadence": current_state().cadence}
 
 
-@app.post("/test/set-distance")
+@router.post("/test/set-distance")
 async def test_set_distance(value: float = Query(..., description="Distance in meters")):
     ensure_sim_mode()
-    set_simulated_distance(value)
-    ble_state["distance"] = float(value)
-    return {"message": "Simulated distance updated.", "distance": ble_state["distance"]}
+    await run_command("set_distance", value=value)
+    publish_live()
+    return {"message": "Simulated distance updated.", "distance": current_state().distance}
 
 
-@app.post("/test/profile")
-async def test_set_profile(name: str = Query(..., description="constant or ramp")):
+@router.post("/test/profile")
+async def test_set_profile(name: str = Query(..., pattern="^(constant|ramp)$", description="constant or ramp")):
     ensure_sim_mode()
-    set_simulation_profile(name)
+    await run_command("set_profile", name=name)
     return {"message": "Simulation profile updated.", "profile": name}
 
 
-@app.post("/test/clear-manual-energy")
+@router.post("/test/clear-manual-energy")
 async def test_clear_manual_energy():
     ensure_sim_mode()
-    set_simulated_energy(None)
+    await run_command("set_energy", value=None)
     return {"message": "Manual energy override cleared."}
 
 
-@app.post("/test/clear-manual-power")
+@router.post("/test/clear-manual-power")
 async def test_clear_manual_power():
     ensure_sim_mode()
-    set_simulated_power(None)
-    return {"message": "Manual power override cleared."}
\ No newline at end of file
+    await run_command("set_power", value=None)
+    return {"message": "Manual power override cleared."}
+
+
+@frontend_router.api_route("/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def frontend_file(request: Request, path: str):
+    response = frontend_assets.response(request, path)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return response
+
+
+app = create_app()
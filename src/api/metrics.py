@@ -0,0 +1,280 @@
+# src/api/metrics.py
+"""
+Low-overhead counters/histograms for the BLE and API hot paths, rendered in
+the Prometheus text exposition format by GET /metrics.
+
+Observations are a bisect plus two integer increments, cheap enough to stay
+on permanently. Only the first observation of a new label set takes a lock:
+/metrics renders in the threadpool while the event loop (and the log
+listener) keep observing, so render() snapshots each dict under that lock
+instead of iterating it live. An optional sampling profiler (off by default) periodically
+captures the event-loop thread's stack and aggregates collapsed stacks.
+"""
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import Counter as _StackCounter
+from typing import Dict, List, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+GAP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+LATENESS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+BLE_DURATION_BUCKETS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0)
+SHELLY_CYCLE_BUCKETS = (1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0)
+
+
+# Guards structural changes (new metrics, new label sets) against render() snapshots
+_lock = threading.Lock()
+
+
+def _label_key(labels: Dict[str, str] | None) -> LabelKey:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: Dict[str, str] | None = None):
+        key = _label_key(labels)
+        try:
+            self._values[key] += amount
+        except KeyError:
+            with _lock:
+                self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with _lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, labels: Dict[str, str] | None = None):
+        key = _label_key(labels)
+        if key in self._values:
+            self._values[key] = value
+        else:
+            with _lock:
+                self._values[key] = value
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelKey, _HistogramSeries] = {}
+
+    def observe(self, value: float, labels: Dict[str, str] | None = None):
+        key = _label_key(labels)
+        series = self._series.get(key)
+        if series is None:
+            with _lock:
+                series = self._series.setdefault(key, _HistogramSeries(len(self.buckets) + 1))
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.total += value
+        series.count += 1
+
+    def render(self) -> List[str]:
+        with _lock:
+            items = list(self._series.items())
+        lines = []
+        for key, series in items:
+            # Observations may land mid-render: derive +Inf and _count from the same copy of the buckets
+            counts = list(series.counts)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _format_labels(key, 'le="%g"' % bound)
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            total = cumulative + counts[-1]
+            le = _format_labels(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {total}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series.total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {total}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float]) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def _register(self, metric):
+        with _lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with _lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ===== BLE pipeline =====
+notifications_total = registry.counter("bikeerg_notifications_total", "PM5 notifications received")
+notification_gap_seconds = registry.histogram(
+    "bikeerg_notification_gap_seconds", "Time between consecutive PM5 notifications", GAP_BUCKETS
+)
+tick_lateness_seconds = registry.histogram(
+    "bikeerg_tick_lateness_seconds", "Actual tick dt minus the nominal tick interval", LATENESS_BUCKETS
+)
+ble_scan_seconds = registry.histogram("bikeerg_ble_scan_seconds", "Duration of BLE scans", BLE_DURATION_BUCKETS)
+ble_connect_seconds = registry.histogram(
+    "bikeerg_ble_connect_seconds", "Time from connect attempt to notifications enabled", BLE_DURATION_BUCKETS
+)
+ble_reconnects_total = registry.counter("bikeerg_ble_reconnects_total", "BLE connections re-established after a drop")
+ble_errors_total = registry.counter("bikeerg_ble_errors_total", "BLE connection errors")
+ble_adapter_resets_total = registry.counter("bikeerg_ble_adapter_resets_total", "Bluetooth adapter power cycles")
+shelly_power_cycles_total = registry.counter(
+    "bikeerg_shelly_power_cycles_total", "PM5 wake sequences through the Shelly relay, by final state"
+)
+shelly_power_cycle_seconds = registry.histogram(
+    "bikeerg_shelly_power_cycle_seconds", "Duration of PM5 wake sequences", SHELLY_CYCLE_BUCKETS
+)
+
+# ===== Logging =====
+log_records_dropped_total = registry.counter(
+    "bikeerg_log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+log_records_suppressed_total = registry.counter(
+    "bikeerg_log_records_suppressed_total", "Repeated log records folded into a later one"
+)
+
+# ===== HTTP API =====
+http_request_seconds = registry.histogram(
+    "bikeerg_http_request_seconds", "Time until the response starts, per route", LATENCY_BUCKETS
+)
+
+
+class RequestMetricsMiddleware:
+    """Plain ASGI middleware: records time to response start per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                http_request_seconds.observe(
+                    time.perf_counter() - start,
+                    {
+                        "method": scope["method"],
+                        "route": getattr(route, "path", "unmatched"),
+                        "status": str(message["status"]),
+                    },
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# =========================
+# Sampling profiler (toggle at runtime)
+# =========================
+
+class SamplingProfiler:
+    def __init__(self):
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._target_thread_id: int | None = None
+        # The sampler thread adds stacks while /debug/profiler reads them from the threadpool
+        self._lock = threading.Lock()
+        self.interval = 0.01
+        self.samples = 0
+        self.stacks: _StackCounter = _StackCounter()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.01, thread_id: int | None = None):
+        """Sample `thread_id` (default: the calling thread, i.e. the event loop)."""
+        if self.running:
+            return
+        self.interval = max(interval, 0.001)
+        self._target_thread_id = thread_id or threading.get_ident()
+        self._stop.clear()
+        with self._lock:
+            self.samples = 0
+            self.stacks.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def collapsed(self, limit: int = 200) -> str:
+        """Stacks in the collapsed 'frame;frame;frame count' format used by flame graph tools."""
+        with self._lock:
+            top = self.stacks.most_common(limit)
+        return "\n".join(f"{stack} {count}" for stack, count in top) + "\n"
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is None:
+                continue
+            stack = ";".join(
+                f"{entry.name} ({entry.filename.rsplit('/', 1)[-1]}:{entry.lineno})"
+                for entry in traceback.extract_stack(frame)
+            )
+            with self._lock:
+                self.stacks[stack] += 1
+                self.samples += 1
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,230 @@
+# src/api/pm5.py
+"""
+Table-driven decoder for the PM5 rowing service notifications (Concept2 PM5
+Bluetooth Smart interface definition).
+
+Each characteristic is declared once as a table of little-endian unsigned
+fields (1, 2 or 3 bytes) with a unit scale, and compiled into a single
+struct.Struct. Decoding is one unpack_from at an offset into the received
+buffer (bytes, bytearray or memoryview), so nothing is sliced or copied; the
+24-bit fields are unpacked as a 16-bit low half plus an 8-bit high byte and
+combined afterwards.
+
+    0x0031  general status            elapsed, distance, workout/rowing state, drag
+    0x0032  additional status         speed, stroke rate, heart rate, pace
+    0x0033  additional status 2       average power, total calories, split stats
+    0x0035  stroke data               distance, drive/recovery, forces, stroke count
+    0x0036  additional stroke data    stroke power, stroke calories, stroke count
+    0x0080  multiplexed               one byte characteristic id, then that layout
+
+Subscribing to 0x0080 alone delivers all of the above on one notification
+stream. A multiplexed packet has at most 20 bytes, so layouts that do not fit
+after the id byte arrive truncated; the fields that are present are decoded
+and the rest are left out.
+"""
+import struct
+from typing import Any, Dict, NamedTuple, Tuple
+
+UUID_TEMPLATE = "ce06{:04x}-43e5-11e4-916c-0800200c9a66"
+
+GENERAL_STATUS = 0x31
+ADDITIONAL_STATUS = 0x32
+ADDITIONAL_STATUS_2 = 0x33
+STROKE_DATA = 0x35
+ADDITIONAL_STROKE_DATA = 0x36
+MULTIPLEXED = 0x80
+
+MULTIPLEXED_PAYLOAD_MAX = 20
+
+
+def characteristic_uuid(char_id: int) -> str:
+    return UUID_TEMPLATE.format(char_id)
+
+
+class Field(NamedTuple):
+    # None: skipped (padding in the compiled struct)
+    name: str | None
+    size: int
+    # None: raw integer; otherwise the float value is raw * scale
+    scale: float | None = None
+
+
+ELAPSED = Field("elapsed", 3, 0.01)
+
+# =========================
+# Field tables (spec units: 0.01 s, 0.1 m, 0.001 m/s, ...; decoded to s, m, m/s)
+# =========================
+
+LAYOUTS: Dict[int, Tuple[Field, ...]] = {
+    GENERAL_STATUS: (
+        ELAPSED,
+        Field("distance", 3, 0.1),
+        Field("workout_type", 1),
+        Field("interval_type", 1),
+        Field("workout_state", 1),
+        Field("rowing_state", 1),
+        Field("stroke_state", 1),
+        Field("total_work_distance", 3),
+        Field("workout_duration", 3),
+        Field("workout_duration_type", 1),
+        Field("drag_factor", 1),
+    ),
+    ADDITIONAL_STATUS: (
+        ELAPSED,
+        Field("speed", 2, 0.001),
+        Field("stroke_rate", 1),
+        Field("heart_rate", 1),
+        Field("pace", 2, 0.01),
+        Field("average_pace", 2, 0.01),
+        Field("rest_distance", 2),
+        Field("rest_time", 3, 0.01),
+        Field("machine_type", 1),
+    ),
+    ADDITIONAL_STATUS_2: (
+        ELAPSED,
+        Field("interval_count", 1),
+        Field("average_power", 2),
+        Field("total_calories", 2),
+        Field("split_average_pace", 2, 0.01),
+        Field("split_average_power", 2),
+        Field("split_average_calories", 2),
+        Field("last_split_time", 3, 0.1),
+        Field("last_split_distance", 3),
+    ),
+    STROKE_DATA: (
+        ELAPSED,
+        Field("distance", 3, 0.1),
+        Field("drive_length", 1, 0.01),
+        Field("drive_time", 1, 0.01),
+        Field("recovery_time", 2, 0.01),
+        Field("stroke_distance", 2, 0.01),
+        Field("peak_drive_force", 2, 0.1),
+        Field("average_drive_force", 2, 0.1),
+        Field("work_per_stroke", 2, 0.1),
+        Field("stroke_count", 2),
+    ),
+    ADDITIONAL_STROKE_DATA: (
+        ELAPSED,
+        Field("stroke_power", 2),
+        Field("stroke_calories", 2),
+        Field("stroke_count", 2),
+        Field("projected_work_time", 3),
+        Field("projected_work_distance", 3),
+    ),
+}
+
+# The multiplexed stroke data drops work per stroke to fit in one packet
+MULTIPLEXED_LAYOUTS: Dict[int, Tuple[Field, ...]] = {
+    **LAYOUTS,
+    STROKE_DATA: tuple(field for field in LAYOUTS[STROKE_DATA] if field.name != "work_per_stroke"),
+}
+
+_CODES = {1: "B", 2: "H", 3: "HB"}
+
+
+class Layout:
+    """One field table compiled to a struct and a list of (name, index, is_24bit, scale) steps."""
+
+    __slots__ = ("char_id", "fields", "struct", "_steps", "_prefixes")
+
+    def __init__(self, char_id: int, fields: Tuple[Field, ...]):
+        self.char_id = char_id
+        self.fields = fields
+        fmt = "<"
+        steps = []
+        index = 0
+        for field in fields:
+            if field.name is None:
+                fmt += f"{field.size}x"
+                continue
+            fmt += _CODES[field.size]
+            steps.append((field.name, index, field.size == 3, field.scale))
+            index += 2 if field.size == 3 else 1
+        self.struct = struct.Struct(fmt)
+        self._steps = tuple(steps)
+        # Truncated packets: layouts for the leading fields that fit, by available length
+        self._prefixes: Dict[int, Layout] = {}
+
+    @property
+    def size(self) -> int:
+        return self.struct.size
+
+    def decode(self, buf, offset: int = 0) -> Dict[str, Any]:
+        available = len(buf) - offset
+        if available < self.struct.size:
+            return self._prefix(available).decode(buf, offset)
+        raw = self.struct.unpack_from(buf, offset)
+        values = {}
+        for name, index, wide, scale in self._steps:
+            value = raw[index] | (raw[index + 1] << 16) if wide else raw[index]
+            values[name] = value if scale is None else value * scale
+        return values
+
+    def _prefix(self, available: int) -> "Layout":
+        layout = self._prefixes.get(available)
+        if layout is None:
+            fields = []
+            used = 0
+            for field in self.fields:
+                if used + field.size > available:
+                    break
+                fields.append(field)
+                used += field.size
+            layout = self._prefixes[available] = Layout(self.char_id, tuple(fields))
+        return layout
+
+    def encode(self, values: Dict[str, float]) -> bytes:
+        """Pack `values` (decoded units; missing fields are 0) in wire format."""
+        raw = []
+        for field in self.fields:
+            if field.name is None:
+                continue
+            value = values.get(field.name, 0)
+            value = int(round(value / field.scale)) if field.scale is not None else int(value)
+            value = max(0, min(value, (1 << (8 * field.size)) - 1))
+            if field.size == 3:
+                raw += (value & 0xFFFF, value >> 16)
+            else:
+                raw.append(value)
+        return self.struct.pack(*raw)
+
+
+STANDALONE = {char_id: Layout(char_id, fields) for char_id, fields in LAYOUTS.items()}
+MULTIPLEXED_BY_ID = {char_id: Layout(char_id, fields) for char_id, fields in MULTIPLEXED_LAYOUTS.items()}
+
+
+def decode(char_id: int, buf, offset: int = 0) -> Dict[str, Any] | None:
+    """Decode a notification from one of the individual characteristics; None if unknown."""
+    layout = STANDALONE.get(char_id)
+    return layout.decode(buf, offset) if layout is not None else None
+
+
+def decode_multiplexed(buf) -> Tuple[int, Dict[str, Any] | None]:
+    """(characteristic id, fields) of a 0x0080 packet; fields is None for ids without a table."""
+    if not buf:
+        return 0, None
+    char_id = buf[0]
+    layout = MULTIPLEXED_BY_ID.get(char_id)
+    return char_id, (layout.decode(buf, 1) if layout is not None else None)
+
+
+def encode_multiplexed(char_id: int, **values) -> bytes:
+    """A 0x0080 packet for `char_id` (used to synthesize traces and benchmarks)."""
+    packet = bytes((char_id,)) + MULTIPLEXED_BY_ID[char_id].encode(values)
+    return packet[:MULTIPLEXED_PAYLOAD_MAX]
+
+
+# =========================
+# Concept2 conversions
+# =========================
+
+def pace_for_power(watts: float) -> float:
+    """Seconds per 500 m at `watts` (Concept2: watts = 2.80 / (pace / 500)^3)."""
+    if watts <= 0:
+        return 0.0
+    return 500.0 * (2.80 / watts) ** (1.0 / 3.0)
+
+
+def calories_per_hour(watts: float) -> float:
+    """Concept2's displayed cal/hr for a power (assumes 25% efficiency plus a 300 cal/hr baseline)."""
+    return 4.0 * 0.8604 * watts + 300.0
@@ -0,0 +1,326 @@
+# src/api/recorder.py
+"""
+Append-only binary trace recorder for full-resolution session data.
+
+Every record in a trace file has the same fixed width, so a file is just a
+64-byte header followed by a packed array of records. The hot path packs
+values into a preallocated block with struct.pack_into (no allocation); full
+blocks are handed to a background thread that copies them into a
+memory-mapped file. If the writer falls behind and no free block is left,
+records are dropped and counted instead of blocking the event loop.
+
+Each session produces two files next to each other:
+    <session_id>.notify.bin   raw PM5 0x0080 multiplexed notifications (0x0036 payloads in version 1)
+    <session_id>.ticks.bin    one row per tick of ble_state
+Files are never overwritten: if a pair with that name exists (two sessions
+started within the same second), the next free <session_id>_<n> is used.
+"""
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+TRACE_MAGIC = b"BKTRACE1"
+TRACE_VERSION = 2
+
+# magic, version, record_size, record_count, created (unix time), padding to 64 bytes
+HEADER = struct.Struct("<8sHHQd36x")
+COUNT_OFFSET = 12
+
+# t (s since session start), payload length, payload (zero padded), padding to 32 bytes
+NOTIFY_RECORD = struct.Struct("<dB20s3x")
+NOTIFY_PAYLOAD_MAX = 20
+# t (s since session start), power W, cadence SPM, distance m, energy kWh
+TICK_RECORD = struct.Struct("<dffdd")
+
+NOTIFY_DTYPE = [("t", "<f8"), ("length", "u1"), ("payload", "V20"), ("_pad", "V3")]
+TICK_DTYPE = [("t", "<f8"), ("power", "<f4"), ("cadence", "<f4"), ("distance", "<f8"), ("energy_kwh", "<f8")]
+
+BLOCK_RECORDS = int(os.getenv("TRACE_BLOCK_RECORDS", "256"))
+BLOCK_POOL_SIZE = int(os.getenv("TRACE_BLOCK_POOL", "8"))
+FLUSH_INTERVAL_SEC = float(os.getenv("TRACE_FLUSH_INTERVAL", "2.0"))
+GROW_BYTES = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+class TraceFile:
+    """
+    Fixed-width record file backed by a growing mmap. Constructing one does no
+    I/O; open(), append() and close() only run on the writer thread.
+    """
+
+    def __init__(self, suffix: str, record_size: int):
+        self.suffix = suffix
+        self.record_size = record_size
+        self.path: str | None = None
+        self.count = 0
+        self._file = None
+        self._mm: mmap.mmap | None = None
+        self._capacity = 0
+
+    def open(self, stem: str):
+        """Create <stem><suffix>; raises FileExistsError rather than truncating an existing trace."""
+        path = f"{stem}{self.suffix}"
+        self._file = open(path, "x+b")
+        self.path = path
+        self._file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, self.record_size, 0, time.time()))
+        self._capacity = HEADER.size + GROW_BYTES
+        self._file.truncate(self._capacity)
+        self._mm = mmap.mmap(self._file.fileno(), self._capacity)
+
+    def append(self, block: bytearray, nbytes: int):
+        if self._mm is None:
+            # open() failed (already logged); the session is simply not recorded
+            return
+        end = HEADER.size + self.count * self.record_size
+        if end + nbytes > self._capacity:
+            self._grow(end + nbytes)
+        self._mm[end:end + nbytes] = memoryview(block)[:nbytes]
+        self.count += nbytes // self.record_size
+        struct.pack_into("<Q", self._mm, COUNT_OFFSET, self.count)
+
+    def close(self):
+        if self._file is None:
+            return
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+        self._file.truncate(HEADER.size + self.count * self.record_size)
+        self._file.close()
+        self._file = self._mm = None
+
+    def _grow(self, needed: int):
+        self._mm.flush()
+        self._mm.close()
+        while self._capacity < needed:
+            self._capacity += GROW_BYTES
+        self._file.truncate(self._capacity)
+        self._mm = mmap.mmap(self._file.fileno(), self._capacity)
+
+
+def _open_traces(base: str, files: Tuple[TraceFile, ...]):
+    """Open one session's files under the first free stem: base, base_1, base_2, ..."""
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    n = 0
+    while True:
+        stem = f"{base}_{n}" if n else base
+        n += 1
+        if any(os.path.exists(f"{stem}{trace.suffix}") for trace in files):
+            continue
+        opened = []
+        try:
+            for trace in files:
+                trace.open(stem)
+                opened.append(trace)
+            return
+        except FileExistsError:
+            # Lost a race with another writer: give back what we created and try the next stem
+            for trace in opened:
+                trace.close()
+                os.remove(trace.path)
+                trace.path = None
+
+
+class TraceWriter:
+    """Single background thread that drains filled blocks into trace files."""
+
+    def __init__(self):
+        self._jobs: "queue.SimpleQueue[Tuple[Callable[..., Any], tuple] | None]" = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args):
+        self._ensure_started()
+        self._jobs.put((fn, args))
+
+    def drain(self):
+        """Block until every job submitted so far has run (used on shutdown)."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._jobs.put((done.set, ()))
+        done.wait()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            fn, args = job
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.warning("⚠️ Trace writer error: %s", e)
+
+
+class RecordBuffer:
+    """Pool of preallocated blocks that records are packed into in place."""
+
+    def __init__(self, record: struct.Struct, trace: TraceFile, writer: TraceWriter):
+        self._record = record
+        self._trace = trace
+        self._writer = writer
+        self._block_bytes = record.size * BLOCK_RECORDS
+        self._free = deque(bytearray(self._block_bytes) for _ in range(BLOCK_POOL_SIZE))
+        self._block: bytearray | None = None
+        self._offset = 0
+        self.dropped = 0
+
+    def append(self, *values):
+        block = self._block
+        if block is None:
+            try:
+                block = self._block = self._free.popleft()
+            except IndexError:
+                self.dropped += 1
+                return
+        self._record.pack_into(block, self._offset, *values)
+        self._offset += self._record.size
+        if self._offset >= self._block_bytes:
+            self.flush()
+
+    def flush(self):
+        if self._block is None or not self._offset:
+            return
+        self._writer.submit(self._write_block, self._block, self._offset)
+        self._block = None
+        self._offset = 0
+
+    def _write_block(self, block: bytearray, nbytes: int):
+        try:
+            self._trace.append(block, nbytes)
+        finally:
+            self._free.append(block)
+
+
+class SessionRecorder:
+    """Records one session's notifications and ticks; start()/stop() bracket a session."""
+
+    def __init__(self, trace_dir: str, writer: TraceWriter | None = None):
+        self.trace_dir = trace_dir
+        self._writer = writer or TraceWriter()
+        self.session_id: str | None = None
+        self._t0 = 0.0
+        self._last_flush = 0.0
+        self._notify: RecordBuffer | None = None
+        self._ticks: RecordBuffer | None = None
+        self._files: Tuple[TraceFile, ...] = ()
+
+    @property
+    def active(self) -> bool:
+        return self.session_id is not None
+
+    def start(self, session_id: str, now: float):
+        if self.active:
+            self.stop()
+        notify_file = TraceFile(".notify.bin", NOTIFY_RECORD.size)
+        tick_file = TraceFile(".ticks.bin", TICK_RECORD.size)
+        self._files = (notify_file, tick_file)
+        # Created and mapped on the writer thread; its queue is FIFO, so this runs before any block
+        self._writer.submit(_open_traces, os.path.join(self.trace_dir, session_id), self._files)
+        self._notify = RecordBuffer(NOTIFY_RECORD, notify_file, self._writer)
+        self._ticks = RecordBuffer(TICK_RECORD, tick_file, self._writer)
+        self.session_id = session_id
+        self._t0 = now
+        self._last_flush = now
+
+    def stop(self) -> Dict[str, Any]:
+        """Close the session; file handles are closed asynchronously on the writer thread."""
+        if not self.active:
+            return {}
+        self._notify.flush()
+        self._ticks.flush()
+        stats = {
+            "session_id": self.session_id,
+            "dropped_notifications": self._notify.dropped,
+            "dropped_ticks": self._ticks.dropped,
+        }
+        for trace in self._files:
+            self._writer.submit(trace.close)
+        self.session_id = None
+        self._notify = self._ticks = None
+        self._files = ()
+        return stats
+
+    def record_notification(self, now: float, data: bytes):
+        if self._notify is None:
+            return
+        payload = bytes(data[:NOTIFY_PAYLOAD_MAX])
+        self._notify.append(now - self._t0, len(payload), payload)
+
+    def record_tick(self, now: float, state):
+        """`state` is the tick's ErgSnapshot."""
+        if self._ticks is None:
+            return
+        self._ticks.append(now - self._t0, state.power, state.cadence, state.distance, state.energy_kwh)
+        if now - self._last_flush >= FLUSH_INTERVAL_SEC:
+            self._notify.flush()
+            self._ticks.flush()
+            self._last_flush = now
+
+    def close(self):
+        self.stop()
+        self._writer.drain()
+
+
+# =========================
+# Reader API
+# =========================
+
+def read_header(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        magic, version, record_size, count, created = HEADER.unpack(f.read(HEADER.size))
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"{path} is not a trace file")
+    return {"version": version, "record_size": record_size, "count": count, "created": created}
+
+
+def load_trace(path: str, dtype):
+    """
+    Map a trace file as a NumPy structured array without copying.
+    Requires numpy (optional dependency, only needed for analysis).
+    """
+    import numpy as np
+
+    header = read_header(path)
+    dt = np.dtype(dtype)
+    if dt.itemsize != header["record_size"]:
+        raise ValueError(f"{path}: record size {header['record_size']} does not match dtype")
+    if header["count"] == 0:
+        return np.empty(0, dtype=dt)
+    return np.memmap(path, dtype=dt, mode="r", offset=HEADER.size, shape=(header["count"],))
+
+
+def load_session(trace_dir: str, session_id: str):
+    """Return (notifications, ticks) for a session as zero-copy NumPy views."""
+    base = os.path.join(trace_dir, session_id)
+    return load_trace(f"{base}.notify.bin", NOTIFY_DTYPE), load_trace(f"{base}.ticks.bin", TICK_DTYPE)
+
+
+def iter_records(path: str, record: struct.Struct) -> Iterator[tuple]:
+    """Dependency-free reader: yields unpacked records straight from the mmap."""
+    header = read_header(path)
+    with open(path, "rb") as f:
+        if header["count"] == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = HEADER.size + header["count"] * record.size
+            view = memoryview(mm)[HEADER.size:end]
+            try:
+                yield from record.iter_unpack(view)
+            finally:
+                view.release()
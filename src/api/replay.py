@@ -0,0 +1,235 @@
+# src/api/replay.py
+"""
+Replay engine: feeds recorded (or synthesized) PM5 notification traces through
+the real notification_handler and tick/integration code on a virtual clock.
+
+    python -m src.api.replay --trace session_logs/traces/<id>.notify.bin --speed 100
+    python -m src.api.replay --synthetic 3600 --power 150 --cadence 80 --speed 0
+
+--speed 1 is real time, 10..1000 is accelerated, 0 runs as fast as possible.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from src.api import ble_runner, pm5
+from src.api.integration import J_PER_KWH
+from src.api.recorder import NOTIFY_RECORD, iter_records, read_header
+
+Sample = Tuple[float, bytes]
+
+REPLAY_ADDRESS = "REPLAY"
+
+
+class VirtualClock:
+    __slots__ = ("t",)
+
+    def __init__(self, start: float = 0.0):
+        self.t = start
+
+    def now(self) -> float:
+        return self.t
+
+    def advance_to(self, t: float):
+        if t > self.t:
+            self.t = t
+
+
+def load_notify_trace(path: str) -> List[Sample]:
+    """Read a recorder .notify.bin file as (t, multiplexed payload) pairs."""
+    # Version 1 traces hold bare 0x0036 payloads: give them their multiplexed id byte
+    prefix = bytes((pm5.ADDITIONAL_STROKE_DATA,)) if read_header(path)["version"] == 1 else b""
+    return [(t, prefix + payload[:length]) for t, length, payload in iter_records(path, NOTIFY_RECORD)]
+
+
+def build_power_packet(power: int, elapsed: float = 0.0, stroke_count: int = 0) -> bytes:
+    return pm5.encode_multiplexed(
+        pm5.ADDITIONAL_STROKE_DATA, elapsed=elapsed, stroke_power=power, stroke_count=stroke_count,
+    )
+
+
+def stroke_power(payload: bytes) -> int | None:
+    char_id, fields = pm5.decode_multiplexed(payload)
+    return fields.get("stroke_power") if char_id == pm5.ADDITIONAL_STROKE_DATA else None
+
+
+def trapezoid_kwh(power_samples: Iterable[Tuple[float, float]]) -> float:
+    """
+    Plain trapezoid sum over (t, watts) stroke samples: an estimate that shares
+    nothing with the hold/decay integrator (pauses are interpolated, and there
+    is no tail after the last stroke).
+    """
+    joules = 0.0
+    previous = None
+    for t, watts in power_samples:
+        if previous is not None:
+            joules += 0.5 * (previous[1] + watts) * (t - previous[0])
+        previous = (t, watts)
+    return joules / J_PER_KWH
+
+
+def profile_kwh(duration: float, power: float, ramp_period: float = 0.0) -> float:
+    """Exact energy of the synthesized profile without noise: P·t, or the integral of the sinusoidal ramp."""
+    joules = power * duration
+    if ramp_period > 0:
+        omega = 2 * math.pi / ramp_period
+        joules += power * 0.5 * (1.0 - math.cos(omega * duration)) / omega
+    return joules / J_PER_KWH
+
+
+def synthesize_trace(
+    duration: float,
+    power: float = 150.0,
+    cadence: float = 80.0,
+    jitter: float = 0.05,
+    profile: Callable[[float], float] | None = None,
+    seed: int = 0,
+) -> Iterator[Sample]:
+    """
+    What the PM5 sends per stroke on the multiplexed stream: stroke power, then
+    status with stroke rate and pace, the calorie total and the distance.
+    Power follows `profile(t)` (default constant) with noise; distance advances
+    at the Concept2 speed for that power.
+    """
+    rng = random.Random(seed)
+    t = 0.0
+    distance = 0.0
+    calories = 0.0
+    strokes = 0
+    while t < duration:
+        base = profile(t) if profile else power
+        watts = int(round(max(0.0, rng.gauss(base, base * jitter))))
+        interval = 60.0 / max(cadence, 1.0)
+        pace = pm5.pace_for_power(watts)
+        strokes += 1
+        yield t, build_power_packet(watts, t, strokes)
+        yield t, pm5.encode_multiplexed(
+            pm5.ADDITIONAL_STATUS, elapsed=t, stroke_rate=round(cadence), pace=pace,
+            speed=500.0 / pace if pace else 0.0,
+        )
+        yield t, pm5.encode_multiplexed(pm5.ADDITIONAL_STATUS_2, elapsed=t, total_calories=int(calories))
+        yield t, pm5.encode_multiplexed(pm5.GENERAL_STATUS, elapsed=t, distance=distance)
+        if pace:
+            distance += 500.0 / pace * interval
+        calories += pm5.calories_per_hour(watts) * interval / 3600.0
+        t += max(0.05, rng.gauss(interval, interval * jitter))
+
+
+async def replay(
+    samples: Iterable[Sample],
+    speed: float = 0.0,
+    tick_seconds: float | None = None,
+    reference_kwh: float | None = None,
+) -> dict:
+    """
+    Run one session from the samples through the real pipeline.
+    Ticks fire every tick_seconds of virtual time, interleaved with notifications in
+    time order. With speed > 0 the loop sleeps virtual_dt / speed between steps.
+
+    energy_error compares the pipeline's energy with `reference_kwh` (e.g.
+    profile_kwh() for a synthesized ride), or with trapezoid_kwh() over the
+    samples' stroke power when none is given.
+    """
+    tick_seconds = tick_seconds or ble_runner.TICK_SECONDS
+    samples = list(samples)
+    clock = VirtualClock()
+    ble_runner.set_clock(clock.now)
+    added = REPLAY_ADDRESS not in ble_runner._device_ids_by_address
+    device = None
+    try:
+        device = ble_runner._device_for(REPLAY_ADDRESS, "Replay PM5")
+        device.on_connect(clock.now())
+        ble_runner.reset_session_metrics()
+        ble_runner.ble_state["session_active"] = True
+
+        end_t = (samples[-1][0] if samples else 0.0) + ble_runner.POWER_HOLD_SEC + ble_runner.POWER_DECAY_WINDOW
+        next_tick = tick_seconds
+        prev_tick = 0.0
+        ticks = 0
+        i = 0
+
+        while next_tick <= end_t or i < len(samples):
+            if i < len(samples) and samples[i][0] <= next_tick:
+                t, payload = samples[i]
+                i += 1
+                step_to = t
+            else:
+                t, payload = next_tick, None
+                step_to = next_tick
+
+            if speed > 0:
+                await asyncio.sleep((step_to - clock.now()) / speed)
+            clock.advance_to(step_to)
+
+            if payload is not None:
+                device.notification_handler(None, payload)
+            else:
+                ble_runner.run_tick(t, t - prev_tick)
+                prev_tick = t
+                next_tick += tick_seconds
+                ticks += 1
+                if speed <= 0 and ticks % 1000 == 0:
+                    await asyncio.sleep(0)
+
+        # Close out the decay tail exactly rather than at the last tick boundary
+        if prev_tick < end_t:
+            clock.advance_to(end_t)
+            ble_runner.run_tick(end_t, end_t - prev_tick)
+            ticks += 1
+
+        state = dict(device.state)
+        if reference_kwh is None:
+            reference_kwh = trapezoid_kwh(
+                (t, watts) for t, payload in samples if (watts := stroke_power(payload)) is not None
+            )
+        return {
+            "notifications": len(samples),
+            "ticks": ticks,
+            "virtual_seconds": round(clock.now(), 3),
+            "elapsed": state["elapsed"],
+            "distance": state["distance"],
+            "calories": state["calories"],
+            "energy_kwh": state["energy_kwh"],
+            "reference_energy_kwh": reference_kwh,
+            "energy_error": abs(state["energy_kwh"] - reference_kwh),
+        }
+    finally:
+        ble_runner.ble_state["session_active"] = False
+        ble_runner.set_clock(None)
+        if added and device is not None:
+            ble_runner.devices.pop(device.device_id, None)
+            ble_runner._device_ids_by_address.pop(REPLAY_ADDRESS, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay PM5 traces through the BLE pipeline")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--trace", help="recorder .notify.bin file")
+    source.add_argument("--synthetic", type=float, metavar="SECONDS", help="synthesize a ride of this length")
+    parser.add_argument("--power", type=float, default=150.0)
+    parser.add_argument("--cadence", type=float, default=80.0)
+    parser.add_argument("--ramp-period", type=float, default=0.0, help="sinusoidal power swing period (s)")
+    parser.add_argument("--speed", type=float, default=0.0, help="1=real time, N=N x, 0=unthrottled")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    reference = None
+    if args.trace:
+        samples = load_notify_trace(args.trace)
+    else:
+        def ramp(t):
+            return args.power * (1.0 + 0.5 * math.sin(2 * math.pi * t / args.ramp_period))
+
+        profile = ramp if args.ramp_period > 0 else None
+        samples = synthesize_trace(args.synthetic, args.power, args.cadence, profile=profile, seed=args.seed)
+        reference = profile_kwh(args.synthetic, args.power, args.ramp_period)
+
+    result = asyncio.run(replay(samples, speed=args.speed, reference_kwh=reference))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# src/api/session_export.py
+"""
+Columnar compaction of session summaries for offline analysis.
+
+Every run reads only the session_*.json files that are new since the last run
+(an mtime watermark) and merges their summary fields into one structured NumPy
+array per day:
+
+    session_logs/columnar/sessions_<YYYY-MM-DD>.npy
+    session_logs/columnar/_watermark.json
+
+.npy rather than .npz so partitions can be memory-mapped; a season is one
+np.load(mmap_mode="r") per day instead of thousands of JSON parses:
+
+    python -m src.api.session_export                 # incremental
+    python -m src.api.session_export --full          # rebuild every partition
+    python -m src.api.session_export --load 2026-05  # summary of matching days
+
+Requires numpy (optional dependency, only needed for analysis).
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List
+
+from src.api.session_store import _row_from_snapshot
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "sessions_"
+WATERMARK_FILE = "_watermark.json"
+
+SESSION_DTYPE = [
+    ("source", "U40"),
+    ("stopped_at", "datetime64[ms]"),
+    ("hour", "u1"),
+    ("elapsed_time", "i4"),
+    ("distance_meters", "i4"),
+    ("energy_kwh", "f8"),
+    ("unlocked_count", "i2"),
+    ("total_tasks", "i2"),
+    ("sim_mode", "?"),
+    # Mean PM5 stroke rate; 0 for sessions recorded before it was stored
+    ("avg_stroke_rate", "f4"),
+]
+
+# One compaction at a time per process (API endpoint and CLI share the code path)
+_compact_lock = threading.Lock()
+
+
+def partition_path(export_dir: str, day: str) -> str:
+    return os.path.join(export_dir, f"{PARTITION_PREFIX}{day}.npy")
+
+
+def _read_watermark(export_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(export_dir, WATERMARK_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"mtime_ns": 0, "sources": []}
+
+
+def _write_atomic(path: str, write):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _new_files(log_dir: str, watermark: Dict[str, Any]):
+    mark = watermark.get("mtime_ns", 0)
+    seen_at_mark = set(watermark.get("sources", []))
+    found = []
+    for path in glob.glob(os.path.join(log_dir, "session_*.json")):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        name = os.path.basename(path)
+        if mtime > mark or (mtime == mark and name not in seen_at_mark):
+            found.append((mtime, name, path))
+    found.sort()
+    return found
+
+
+def _rows_by_day(files) -> tuple:
+    rows: Dict[str, List[tuple]] = {}
+    failed_mtimes = []
+    for mtime, name, path in files:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            source, stopped_at, day, hour, elapsed, distance, energy, unlocked, total, sim, _ = (
+                _row_from_snapshot(name, snapshot)
+            )
+        except (OSError, ValueError) as e:
+            # Possibly still being written; picked up again next run
+            logger.warning("⚠️ Skipping unreadable session file %s: %s", name, e)
+            failed_mtimes.append(mtime)
+            continue
+        stroke_rate = float(snapshot.get("avg_stroke_rate") or 0.0)
+        rows.setdefault(day, []).append(
+            (source, stopped_at[:23], hour, elapsed, distance, energy, unlocked, total, bool(sim), stroke_rate)
+        )
+    return rows, failed_mtimes
+
+
+def _conform(sessions):
+    """Partitions written with an older SESSION_DTYPE, copied into the current one (new columns zeroed)."""
+    import numpy as np
+
+    dtype = np.dtype(SESSION_DTYPE)
+    if sessions.dtype == dtype:
+        return sessions
+    upgraded = np.zeros(len(sessions), dtype=dtype)
+    for name in sessions.dtype.names:
+        if name in dtype.names:
+            upgraded[name] = sessions[name]
+    return upgraded
+
+
+def _merge_partition(export_dir: str, day: str, rows: List[tuple]) -> int:
+    import numpy as np
+
+    path = partition_path(export_dir, day)
+    new = np.array(rows, dtype=SESSION_DTYPE)
+    if os.path.exists(path):
+        existing = _conform(np.load(path))
+        new = new[~np.isin(new["source"], existing["source"])]
+        if len(new) == 0:
+            return 0
+        merged = np.concatenate([existing, new])
+    else:
+        merged = new
+    merged = merged[np.argsort(merged["stopped_at"], kind="stable")]
+    _write_atomic(path, lambda f: np.save(f, merged, allow_pickle=False))
+    return len(new)
+
+
+def compact(log_dir: str, export_dir: str, full: bool = False) -> Dict[str, Any]:
+    """Roll session files newer than the watermark into the day partitions."""
+    with _compact_lock:
+        os.makedirs(export_dir, exist_ok=True)
+        if full:
+            for path in glob.glob(os.path.join(export_dir, f"{PARTITION_PREFIX}*.npy")):
+                os.remove(path)
+            watermark = {"mtime_ns": 0, "sources": []}
+        else:
+            watermark = _read_watermark(export_dir)
+
+        files = _new_files(log_dir, watermark)
+        rows, failed_mtimes = _rows_by_day(files)
+        added = {day: _merge_partition(export_dir, day, day_rows) for day, day_rows in sorted(rows.items())}
+
+        # Advance past everything read, but not past a file that failed to parse.
+        # Re-reading a file later is harmless: merges skip sources already present.
+        done = [(mtime, name) for mtime, name, _ in files if not failed_mtimes or mtime < min(failed_mtimes)]
+        if done:
+            mark = max(mtime for mtime, _ in done)
+            sources = [name for mtime, name in done if mtime == mark]
+            if mark == watermark.get("mtime_ns"):
+                sources = sorted(set(sources) | set(watermark.get("sources", [])))
+            watermark = {"mtime_ns": mark, "sources": sources}
+            payload = json.dumps(watermark).encode("utf-8")
+            _write_atomic(os.path.join(export_dir, WATERMARK_FILE), lambda f: f.write(payload))
+
+        return {
+            "files_read": len(files) - len(failed_mtimes),
+            "files_failed": len(failed_mtimes),
+            "rows_added": sum(added.values()),
+            "days": {day: count for day, count in added.items() if count},
+        }
+
+
+def list_partitions(export_dir: str) -> List[Dict[str, Any]]:
+    import numpy as np
+
+    partitions = []
+    for path in sorted(glob.glob(os.path.join(export_dir, f"{PARTITION_PREFIX}*.npy"))):
+        day = os.path.basename(path)[len(PARTITION_PREFIX):-len(".npy")]
+        partitions.append({
+            "day": day,
+            "rows": len(np.load(path, mmap_mode="r")),
+            "bytes": os.path.getsize(path),
+        })
+    return partitions
+
+
+def load_sessions(export_dir: str, day_prefix: str = ""):
+    """Memory-mapped sessions for all days starting with `day_prefix` (e.g. "2026-05")."""
+    import numpy as np
+
+    paths = sorted(glob.glob(os.path.join(export_dir, f"{PARTITION_PREFIX}{day_prefix}*.npy")))
+    if not paths:
+        return np.zeros(0, dtype=SESSION_DTYPE)
+    parts = [_conform(np.load(path, mmap_mode="r")) for path in paths]
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact session summaries into per-day columnar files")
+    parser.add_argument("--log-dir", default="session_logs")
+    parser.add_argument("--export-dir", default=None, help="default: <log-dir>/columnar")
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and rebuild all partitions")
+    parser.add_argument("--load", metavar="DAY_PREFIX", help="print a summary of the compacted sessions instead")
+    args = parser.parse_args()
+    export_dir = args.export_dir or os.path.join(args.log_dir, "columnar")
+
+    if args.load is not None:
+        sessions = load_sessions(export_dir, args.load)
+        print(json.dumps({
+            "sessions": len(sessions),
+            "total_energy_kwh": float(sessions["energy_kwh"].sum()) if len(sessions) else 0.0,
+            "average_level": float(sessions["unlocked_count"].mean()) if len(sessions) else None,
+        }, indent=2))
+        return
+
+    print(json.dumps(compact(args.log_dir, export_dir, full=args.full), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# src/api/session_lifecycle.py
+"""
+The session as an explicit state machine with a single cancellable timer:
+
+    idle --start--> active --stop--> summarizing --> cooldown --(timer)--> idle
+      ^               ^                                 |
+      |               +-------------start---------------+
+      +---------------------------reset-----------------+ (from any state)
+
+The summary is built once, on the active -> summarizing edge, and cached
+until cooldown ends. The cooldown is one loop.call_later handle that every
+transition cancels, so a stale timer from an earlier /stop can never clear a
+newer session, however fast sessions start and stop.
+"""
+import asyncio
+from typing import Any, Callable, Dict
+
+IDLE = "idle"
+ACTIVE = "active"
+SUMMARIZING = "summarizing"
+COOLDOWN = "cooldown"
+
+
+class SessionLifecycle:
+    __slots__ = ("cooldown", "on_cooldown_end", "state", "generation", "version", "summary", "_timer")
+
+    def __init__(self, cooldown: float, on_cooldown_end: Callable[[], None]):
+        self.cooldown = cooldown
+        self.on_cooldown_end = on_cooldown_end
+        self.state = IDLE
+        # Bumped on every start: lets readers restart per-session tracking
+        self.generation = 0
+        # Bumped on every transition: lets readers skip re-encoding an unchanged summary
+        self.version = 0
+        self.summary: Dict[str, Any] = {}
+        self._timer: asyncio.TimerHandle | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.state == ACTIVE
+
+    def _enter(self, state: str):
+        self.state = state
+        self.version += 1
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def start(self) -> int:
+        self._cancel_timer()
+        self.summary = {}
+        self.generation += 1
+        self._enter(ACTIVE)
+        return self.generation
+
+    def stop(self, summarize: Callable[[], Dict[str, Any]]) -> Dict[str, Any] | None:
+        """End the active session; returns the cached summary, or None if no session was active."""
+        if self.state != ACTIVE:
+            return None
+        self._enter(SUMMARIZING)
+        try:
+            self.summary = summarize()
+        finally:
+            self._enter(COOLDOWN)
+            self._timer = asyncio.get_running_loop().call_later(self.cooldown, self._end_cooldown)
+        return self.summary
+
+    def reset(self):
+        self._cancel_timer()
+        self.summary = {}
+        self._enter(IDLE)
+
+    def _end_cooldown(self):
+        self._timer = None
+        if self.state != COOLDOWN:
+            return
+        self.summary = {}
+        self._enter(IDLE)
+        self.on_cooldown_end()
+
+    def close(self):
+        self._cancel_timer()
@@ -0,0 +1,136 @@
+# src/api/session_store.py
+"""
+Indexed session history backed by SQLite (WAL mode).
+
+The per-session JSON files in session_logs/ stay the source of truth; this
+store mirrors their summary fields into an indexed table so history and
+leaderboard queries don't have to glob and parse every file.
+"""
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    stopped_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    elapsed_time INTEGER NOT NULL,
+    distance_meters INTEGER NOT NULL,
+    energy_kwh REAL NOT NULL,
+    unlocked_count INTEGER NOT NULL,
+    total_tasks INTEGER NOT NULL,
+    sim_mode INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_day_energy ON sessions (day, energy_kwh DESC);
+CREATE INDEX IF NOT EXISTS idx_sessions_day_hour ON sessions (day, hour);
+"""
+
+INSERT_SQL = """
+INSERT OR IGNORE INTO sessions (
+    source, stopped_at, day, hour, elapsed_time, distance_meters,
+    energy_kwh, unlocked_count, total_tasks, sim_mode, payload
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SUMMARY_COLUMNS = "source, stopped_at, elapsed_time, distance_meters, energy_kwh, unlocked_count, total_tasks, sim_mode"
+
+
+def _row_from_snapshot(source: str, snapshot: Dict[str, Any]) -> Tuple:
+    stopped_at = snapshot.get("stopped_at") or datetime.now().isoformat()
+    return (
+        source,
+        stopped_at,
+        stopped_at[:10],
+        int(stopped_at[11:13] or 0),
+        int(snapshot.get("elapsed_time", 0)),
+        int(snapshot.get("distance_meters", 0)),
+        float(snapshot.get("energy_kwh", 0.0)),
+        int(snapshot.get("unlocked_count", len(snapshot.get("tasks_unlocked", [])))),
+        int(snapshot.get("total_tasks", 0)),
+        1 if snapshot.get("sim_mode") else 0,
+        json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")),
+    )
+
+
+class SessionStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; FastAPI runs sync endpoints in a threadpool.
+        # Opened on first use so constructing the store never touches the disk.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def add(self, source: str, snapshot: Dict[str, Any]):
+        self.add_many([(source, snapshot)])
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        rows = [_row_from_snapshot(source, snapshot) for source, snapshot in items]
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(INSERT_SQL, rows)
+            return conn.total_changes - before
+
+    def import_json_dir(self, log_dir: str) -> int:
+        """Batch-import session_*.json files that aren't in the store yet."""
+        known = {row[0] for row in self._connect().execute("SELECT source FROM sessions")}
+        items = []
+        for path in sorted(glob.glob(os.path.join(log_dir, "session_*.json"))):
+            source = os.path.basename(path)
+            if source in known:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    items.append((source, json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.warning("⚠️ Skipping unreadable session file %s: %s", source, e)
+        return self.add_many(items)
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def top_sessions(self, day: str, limit: int = 10) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM sessions WHERE day = ? ORDER BY energy_kwh DESC LIMIT ?",
+            (day, limit),
+        )
+        return [dict(row) for row in rows]
+
+    def sessions_per_hour(self, day: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT hour, COUNT(*) AS sessions FROM sessions WHERE day = ? GROUP BY hour ORDER BY hour",
+            (day,),
+        )
+        return [dict(row) for row in rows]
+
+    def stats(self, day: str | None = None) -> Dict[str, Any]:
+        where, params = ("WHERE day = ?", (day,)) if day else ("", ())
+        row = self._connect().execute(
+            "SELECT COUNT(*) AS sessions, AVG(unlocked_count) AS average_level, "
+            "AVG(energy_kwh) AS average_energy_kwh, MAX(energy_kwh) AS max_energy_kwh, "
+            f"SUM(energy_kwh) AS total_energy_kwh FROM sessions {where}",
+            params,
+        ).fetchone()
+        return dict(row)
@@ -0,0 +1,171 @@
+# src/api/session_writer.py
+"""
+Write-behind persistence for session summaries.
+
+/stop hands the snapshot to a bounded queue and returns immediately; a
+background thread writes the JSON files, fsyncs each one plus the directory
+once per batch and mirrors them into the session store. Each file moves pending -> durable (or failed),
+which callers can query by filename.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from src.api.session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING = int(os.getenv("SESSION_WRITE_MAX_PENDING", "64"))
+BATCH_SIZE = int(os.getenv("SESSION_WRITE_BATCH", "16"))
+STATUS_HISTORY = 256
+
+PENDING = "pending"
+DURABLE = "durable"
+FAILED = "failed"
+
+
+class SessionWriter:
+    def __init__(self, log_dir: str, store: SessionStore | None = None):
+        self.log_dir = log_dir
+        self.store = store
+        self._queue: "queue.Queue[Tuple[str, Dict[str, Any]] | None]" = queue.Queue(maxsize=MAX_PENDING)
+        self._status: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stem = ""
+        self._suffix = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+            self._thread.start()
+
+    def next_filename(self) -> str:
+        stem = f"session_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+        with self._lock:
+            # Sessions ending within the same second continue after the last suffix handed out
+            if stem != self._stem:
+                self._stem, self._suffix = stem, 0
+            while True:
+                name = f"{stem}_{self._suffix}.json" if self._suffix else f"{stem}.json"
+                filename = os.path.join(self.log_dir, name)
+                self._suffix += 1
+                if filename not in self._status and not os.path.exists(filename):
+                    break
+            self._set_status(filename, PENDING)
+        return filename
+
+    async def submit(self, snapshot: Dict[str, Any]) -> str:
+        """Queue a snapshot for writing; only waits (off-loop) if the queue is full."""
+        self.start()
+        filename = self.next_filename()
+        job = (filename, dict(snapshot))
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            logger.warning("⚠️ Session write queue full, waiting for writer...")
+            await asyncio.to_thread(self._queue.put, job)
+        return filename
+
+    def status(self, filename: str) -> str | None:
+        with self._lock:
+            return self._status.get(filename)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(1 for status in self._status.values() if status == PENDING)
+
+    def close(self, timeout: float = 10.0):
+        """Flush everything queued so far and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _set_status(self, filename: str, status: str):
+        self._status[filename] = status
+        self._status.move_to_end(filename)
+        while len(self._status) > STATUS_HISTORY:
+            self._status.popitem(last=False)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            batch: List[Tuple[str, Dict[str, Any]]] = []
+            stop = job is None
+            if job is not None:
+                batch.append(job)
+            while not stop and len(batch) < BATCH_SIZE:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                else:
+                    batch.append(job)
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    # Never let one bad batch kill the thread: /stop would block on the full queue forever
+                    logger.exception("❌ Session write batch failed: %s", e)
+                    with self._lock:
+                        for filename, _ in batch:
+                            if self._status.get(filename) == PENDING:
+                                self._set_status(filename, FAILED)
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        written = []
+        for filename, snapshot in batch:
+            try:
+                # Serialize first so an unencodable snapshot leaves no partial file behind
+                text = json.dumps(snapshot, indent=2, ensure_ascii=False)
+                with open(filename, "w", encoding="utf-8") as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                written.append((filename, snapshot))
+            except Exception as e:
+                logger.error("❌ Failed to save session %s: %s", filename, e)
+                with self._lock:
+                    self._set_status(filename, FAILED)
+
+        if written:
+            # One directory fsync makes the whole batch's new entries durable
+            self._fsync_dir()
+
+        if self.store is not None and written:
+            try:
+                self.store.add_many((os.path.basename(filename), snapshot) for filename, snapshot in written)
+            except Exception as e:
+                logger.warning("⚠️ Session store update failed: %s", e)
+
+        with self._lock:
+            for filename, _ in written:
+                self._set_status(filename, DURABLE)
+        for filename, _ in written:
+            logger.info("📄 Session saved to %s", filename)
+
+    def _fsync_dir(self):
+        # Only this batch's files and directory: a device-wide sync would also flush traces,
+        # logs and exports and stall the SD card
+        try:
+            fd = os.open(self.log_dir, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
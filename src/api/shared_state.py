@@ -0,0 +1,174 @@
+# src/api/shared_state.py
+"""
+Acquisition state in a multiprocessing.shared_memory segment, guarded by a
+seqlock: one writer (the acquisition daemon), any number of lock-free readers
+(API worker processes).
+
+Layout (little endian):
+
+    0     u64 seq              odd while the writer is mid-update
+    8     u32 device_count
+    12    u32 info_len
+    16    u64 info_version     bumped when the JSON info blob changes
+    64    RECORD x MAX_SLOTS   one fixed-size record per machine, primary first
+    ...   info blob            small JSON (session generation, last snapshot)
+    ...   tick history         ring of per-tick samples (see live_history.py)
+
+A reader copies what it needs and re-checks seq; a changed or odd seq means
+the copy may be torn and the read is retried. The info blob is only decoded
+when its version moves, so steady-state reads parse nothing. The tick
+history has its own sequence counter and is read independently of the seqlock.
+"""
+import json
+import logging
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from src.api.analytics import AnalyticsValues
+from src.api.ble_runner import ErgSnapshot
+from src.api.live_history import HISTORY_CAPACITY, TickHistory, region_size
+
+logger = logging.getLogger(__name__)
+
+SEQ = struct.Struct("<Q")
+HEADER = struct.Struct("<IIQ")  # after seq: device_count, info_len, info_version
+RECORD = struct.Struct("<16s32si7d2?d5d")
+RECORDS_OFFSET = 64
+MAX_SLOTS = 16
+INFO_OFFSET = RECORDS_OFFSET + MAX_SLOTS * RECORD.size
+INFO_CAPACITY = 64 * 1024
+HISTORY_OFFSET = INFO_OFFSET + INFO_CAPACITY
+SEGMENT_SIZE = HISTORY_OFFSET + region_size(HISTORY_CAPACITY)
+
+READ_RETRIES = 1000
+
+
+class DeviceRecord(NamedTuple):
+    device_id: str
+    name: str
+    state: ErgSnapshot
+    analytics: AnalyticsValues
+
+
+class SharedState(NamedTuple):
+    seq: int
+    devices: Tuple[DeviceRecord, ...]
+    info: Dict[str, Any]
+
+
+def _text(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", "replace")
+
+
+def _encode_record(buf, offset: int, record: DeviceRecord):
+    s, a = record.state, record.analytics
+    RECORD.pack_into(
+        buf, offset,
+        record.device_id.encode("utf-8")[:16], record.name.encode("utf-8")[:32],
+        int(s.power), s.cadence, s.elapsed, s.distance, s.energy_kwh, s.calories, s.pace, s.avg_cadence,
+        s.session_active, s.connected, s.t,
+        *a,
+    )
+
+
+def _decode_record(raw: tuple) -> DeviceRecord:
+    device_id, name, *state = raw[:13]
+    return DeviceRecord(_text(device_id), _text(name), ErgSnapshot(*state), AnalyticsValues(*raw[13:]))
+
+
+class SharedStateWriter:
+    def __init__(self, name: str):
+        try:
+            # A segment left behind by a crashed daemon
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=SEGMENT_SIZE)
+        self._seq = 0
+        self._info_len = 0
+        self._info_version = 0
+        SEQ.pack_into(self.shm.buf, 0, 0)
+        HEADER.pack_into(self.shm.buf, SEQ.size, 0, 0, 0)
+        self.history = TickHistory(self.shm.buf[HISTORY_OFFSET:SEGMENT_SIZE], HISTORY_CAPACITY)
+
+    def write(self, records: List[DeviceRecord], info: bytes | None = None):
+        """Publish all records (and the info blob, if given) as one consistent update."""
+        buf = self.shm.buf
+        if info is not None and len(info) > INFO_CAPACITY:
+            logger.warning("⚠️ Shared state info blob too large (%d bytes); dropping it", len(info))
+            info = b"{}"
+        records = records[:MAX_SLOTS]
+
+        self._seq += 1
+        SEQ.pack_into(buf, 0, self._seq)
+        for slot, record in enumerate(records):
+            _encode_record(buf, RECORDS_OFFSET + slot * RECORD.size, record)
+        if info is not None:
+            buf[INFO_OFFSET:INFO_OFFSET + len(info)] = info
+            self._info_len = len(info)
+            self._info_version += 1
+        HEADER.pack_into(buf, SEQ.size, len(records), self._info_len, self._info_version)
+        self._seq += 1
+        SEQ.pack_into(buf, 0, self._seq)
+
+    def close(self):
+        self.history.release()
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_segment(name: str) -> shared_memory.SharedMemory:
+    """Open an existing segment without letting this process's resource tracker unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track=False
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedStateReader:
+    def __init__(self, name: str):
+        self.shm = attach_segment(name)
+        self._last: SharedState | None = None
+        self._info_version = -1
+        self._info: Dict[str, Any] = {}
+        # The writer sets the capacity in the region header
+        self.history = TickHistory(self.shm.buf[HISTORY_OFFSET:], capacity=None)
+
+    def read(self) -> SharedState | None:
+        """Latest consistent state; the cached object if nothing changed; None while the writer never finished."""
+        buf = self.shm.buf
+        for attempt in range(READ_RETRIES):
+            seq = SEQ.unpack_from(buf, 0)[0]
+            if seq & 1:
+                if attempt % 50 == 49:
+                    time.sleep(0)
+                continue
+            if self._last is not None and seq == self._last.seq:
+                return self._last
+            count, info_len, info_version = HEADER.unpack_from(buf, SEQ.size)
+            raws = [
+                RECORD.unpack_from(buf, RECORDS_OFFSET + slot * RECORD.size) for slot in range(min(count, MAX_SLOTS))
+            ]
+            info_raw = bytes(buf[INFO_OFFSET:INFO_OFFSET + info_len]) if info_version != self._info_version else None
+            if SEQ.unpack_from(buf, 0)[0] != seq:
+                continue
+
+            if info_raw is not None:
+                self._info = json.loads(info_raw) if info_raw else {}
+                self._info_version = info_version
+            if seq == 0:
+                return None
+            self._last = SharedState(seq, tuple(_decode_record(raw) for raw in raws), self._info)
+            return self._last
+        return self._last
+
+    def close(self):
+        self.history.release()
+        self.shm.close()
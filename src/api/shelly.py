@@ -0,0 +1,312 @@
+# src/api/shelly.py
+"""
+Async control of the Shelly relay that powers the PM5, and the wake sequence
+built on it.
+
+ShellyClient speaks the relay's Gen2 RPC API over pooled HTTP/1.1 keep-alive
+connections (plain asyncio streams, no extra dependency):
+
+    GET  /rpc/Switch.GetStatus?id=<relay>
+    POST /rpc/Switch.Set        {"id": <relay>, "on": true|false}
+
+PowerCycle is the wake sequence as a state machine. Each step ends as soon as
+the hardware reports the next state, not after a fixed sleep:
+
+    checking -> powering_off -> off -> powering_on -> waiting_advertisement -> done
+        |                                                        (any step) -> failed
+        +-> done (PM5 already advertising, unless forced)
+
+"off" lasts until the relay reports the load drained (apower below
+SHELLY_OFF_WATTS) and SHELLY_MIN_OFF_SEC passed, capped at SHELLY_MAX_OFF_SEC.
+ble_runner runs it at startup and whenever no PM5 shows up for RETRY_TIMEOUT,
+only when SHELLY_HOST is set.
+
+    python -m src.api.shelly status
+    python -m src.api.shelly cycle [--force] [--no-ble]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import urlencode
+
+from src.api.logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Unset by default: without a relay there is nothing to wake, and startup must not
+# wait on a connect timeout to a host that isn't there
+SHELLY_HOST = os.getenv("SHELLY_HOST", "")
+SHELLY_PORT = int(os.getenv("SHELLY_PORT", "80"))
+SHELLY_RELAY_ID = int(os.getenv("SHELLY_RELAY_ID", "1"))
+SHELLY_TIMEOUT = float(os.getenv("SHELLY_TIMEOUT", "5.0"))
+SHELLY_POLL_SEC = float(os.getenv("SHELLY_POLL_SEC", "0.25"))
+# How long the relay may take to report a commanded output state
+SHELLY_SWITCH_TIMEOUT = float(os.getenv("SHELLY_SWITCH_TIMEOUT", "5.0"))
+SHELLY_OFF_WATTS = float(os.getenv("SHELLY_OFF_WATTS", "0.5"))
+SHELLY_MIN_OFF_SEC = float(os.getenv("SHELLY_MIN_OFF_SEC", "3.0"))
+SHELLY_MAX_OFF_SEC = float(os.getenv("SHELLY_MAX_OFF_SEC", "30.0"))
+# Time allowed for a freshly powered PM5 to boot and advertise
+SHELLY_ADVERTISE_TIMEOUT = float(os.getenv("SHELLY_ADVERTISE_TIMEOUT", "45.0"))
+SHELLY_WAKE_ON_START = os.getenv("SHELLY_WAKE_ON_START", "1") == "1"
+
+IDLE = "idle"
+CHECKING = "checking"
+POWERING_OFF = "powering_off"
+OFF = "off"
+POWERING_ON = "powering_on"
+WAITING_ADVERTISEMENT = "waiting_advertisement"
+DONE = "done"
+FAILED = "failed"
+
+# Awaitable probe: True once a PM5 advertises within `timeout` seconds
+AdvertisingProbe = Callable[[float], Awaitable[bool]]
+
+
+class ShellyError(RuntimeError):
+    pass
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+    status_line = await reader.readuntil(b"\r\n")
+    status = int(status_line.split(None, 2)[1])
+    headers: Dict[str, str] = {}
+    while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while size := int((await reader.readuntil(b"\r\n")).split(b";")[0], 16):
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        while await reader.readuntil(b"\r\n") != b"\r\n":
+            pass
+        body = b"".join(chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()
+        headers["connection"] = "close"
+    return status, headers, body
+
+
+class ShellyClient:
+    """Shelly RPC over a small pool of keep-alive connections."""
+
+    def __init__(self, host: str, port: int = 80, timeout: float = SHELLY_TIMEOUT, pool_size: int = 2):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.connections_opened = 0
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _acquire(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ShellyError(f"cannot reach {self.host}:{self.port}: {e!r}") from e
+        self.connections_opened += 1
+        return reader, writer, False
+
+    def _release(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if len(self._idle) < self.pool_size:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    async def request(self, method: str, path: str, body: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            "Connection: keep-alive\r\n"
+            "Accept: application/json\r\n"
+            + ("Content-Type: application/json\r\n" if body is not None else "")
+            + f"Content-Length: {len(payload)}\r\n\r\n"
+        ).encode("latin-1") + payload
+
+        for attempt in range(2):
+            reader, writer, reused = await self._acquire()
+            try:
+                writer.write(head)
+                await writer.drain()
+                status, headers, data = await asyncio.wait_for(_read_response(reader), self.timeout)
+            except (OSError, EOFError, ValueError, asyncio.LimitOverrunError, asyncio.TimeoutError) as e:
+                writer.close()
+                # The relay may have dropped an idle keep-alive connection: retry once on a fresh one
+                if reused and attempt == 0 and not isinstance(e, asyncio.TimeoutError):
+                    continue
+                raise ShellyError(f"{method} {path} failed: {e!r}") from e
+
+            if headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                self._release(reader, writer)
+            if status != 200:
+                raise ShellyError(f"{method} {path} returned HTTP {status}: {data[:200]!r}")
+            try:
+                return json.loads(data) if data else {}
+            except ValueError as e:
+                raise ShellyError(f"{method} {path} returned invalid JSON: {e}") from e
+        raise ShellyError(f"{method} {path} failed")
+
+    async def get_status(self, relay_id: int) -> Dict[str, Any]:
+        return await self.request("GET", f"/rpc/Switch.GetStatus?{urlencode({'id': relay_id})}")
+
+    async def set_output(self, relay_id: int, on: bool) -> Dict[str, Any]:
+        return await self.request("POST", "/rpc/Switch.Set", {"id": relay_id, "on": on})
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class PowerCycle:
+    """One run of the wake sequence; `state` and `history` show how far it got."""
+
+    def __init__(
+        self,
+        client: ShellyClient,
+        relay_id: int,
+        advertising: AdvertisingProbe,
+        poll: float = SHELLY_POLL_SEC,
+        switch_timeout: float = SHELLY_SWITCH_TIMEOUT,
+        off_watts: float = SHELLY_OFF_WATTS,
+        min_off: float = SHELLY_MIN_OFF_SEC,
+        max_off: float = SHELLY_MAX_OFF_SEC,
+        advertise_timeout: float = SHELLY_ADVERTISE_TIMEOUT,
+        probe_timeout: float = 5.0,
+    ):
+        self.client = client
+        self.relay_id = relay_id
+        self.advertising = advertising
+        self.poll = poll
+        self.switch_timeout = switch_timeout
+        self.off_watts = off_watts
+        self.min_off = min_off
+        self.max_off = max_off
+        self.advertise_timeout = advertise_timeout
+        self.probe_timeout = probe_timeout
+        self.state = IDLE
+        self.error: str | None = None
+        # (state, seconds since the run started)
+        self.history: List[Tuple[str, float]] = []
+        self._start = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def _enter(self, state: str):
+        self.state = state
+        self.history.append((state, round(self.elapsed, 3)))
+        logger.info("⚡ Shelly power cycle: %s (%.1fs)", state, self.elapsed)
+
+    async def run(self, force: bool = False) -> bool:
+        """
+        Power-cycle the PM5 and wait for it to advertise. Unless `force`, a PM5
+        that is powered and already advertising is left alone.
+        """
+        self._start = time.monotonic()
+        try:
+            self._enter(CHECKING)
+            status = await self.client.get_status(self.relay_id)
+            if status.get("output"):
+                if not force and await self.advertising(self.probe_timeout):
+                    self._enter(DONE)
+                    return True
+                self._enter(POWERING_OFF)
+                await self.client.set_output(self.relay_id, False)
+                status = await self._wait_output(False)
+
+                self._enter(OFF)
+                await self._wait_drained(status)
+
+            self._enter(POWERING_ON)
+            await self.client.set_output(self.relay_id, True)
+            await self._wait_output(True)
+
+            self._enter(WAITING_ADVERTISEMENT)
+            if not await self.advertising(self.advertise_timeout):
+                raise ShellyError(f"PM5 did not advertise within {self.advertise_timeout:g}s of power-on")
+            self._enter(DONE)
+            return True
+        except ShellyError as e:
+            self.error = str(e)
+            self._enter(FAILED)
+            logger.error("❌ Shelly power cycle failed: %s", e)
+            return False
+
+    async def _wait_output(self, on: bool) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.switch_timeout
+        while True:
+            status = await self.client.get_status(self.relay_id)
+            if bool(status.get("output")) == on:
+                return status
+            if time.monotonic() >= deadline:
+                raise ShellyError(f"relay did not report output={on} within {self.switch_timeout:g}s")
+            await asyncio.sleep(self.poll)
+
+    async def _wait_drained(self, status: Dict[str, Any]):
+        off_since = time.monotonic()
+        while True:
+            off_for = time.monotonic() - off_since
+            # Relays without power metering report no apower; then only min_off applies
+            drained = float(status.get("apower") or 0.0) <= self.off_watts
+            if off_for >= self.max_off or (drained and off_for >= self.min_off):
+                return
+            await asyncio.sleep(self.poll)
+            status = await self.client.get_status(self.relay_id)
+
+
+# =========================
+# CLI (manual checks against the relay)
+# =========================
+
+async def _cli(args):
+    client = ShellyClient(args.host, args.port)
+    try:
+        if args.command == "status":
+            print(json.dumps(await client.get_status(args.relay), indent=2))
+            return True
+        if args.no_ble:
+            async def advertising(timeout: float) -> bool:
+                return True
+        else:
+            from src.api.ble_runner import pm5_advertising as advertising
+        cycle = PowerCycle(client, args.relay, advertising)
+        ok = await cycle.run(force=args.force)
+        print(json.dumps({"state": cycle.state, "error": cycle.error, "history": cycle.history}, indent=2))
+        return ok
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shelly relay control for the PM5")
+    parser.add_argument("command", choices=("status", "cycle"))
+    parser.add_argument("--host", default=SHELLY_HOST)
+    parser.add_argument("--port", type=int, default=SHELLY_PORT)
+    parser.add_argument("--relay", type=int, default=SHELLY_RELAY_ID)
+    parser.add_argument("--force", action="store_true", help="power-cycle even if the PM5 is advertising")
+    parser.add_argument("--no-ble", action="store_true", help="don't wait for a BLE advertisement")
+    args = parser.parse_args()
+    if not args.host:
+        parser.error("no Shelly host (set SHELLY_HOST or --host)")
+    setup_logging("shelly")
+    raise SystemExit(0 if asyncio.run(_cli(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# src/api/static_assets.py
+"""
+The built frontend (frontend/dist) served by the API process itself, so the
+kiosk needs no Vite dev server.
+
+At startup the dist directory is indexed once: media type, ETag and cache
+policy per file, plus any precompressed siblings (`app-3f2a9c1d.js.br`,
+`.gz`). Requests pick the best encoding the client accepts and never touch
+the filesystem for small files, which are held in memory (bounded by
+STATIC_MEMORY_BUDGET); larger ones stream from disk.
+
+    assets/<name>-<hash>.<ext>   Cache-Control: public, max-age=31536000, immutable
+    everything else              Cache-Control: no-cache (revalidated by ETag)
+
+Precompress after `npm run build` (brotli only if the `brotli` package is
+installed; gzip always):
+
+    python -m src.api.static_assets frontend/dist
+"""
+import argparse
+import gzip
+import mimetypes
+import os
+import re
+from typing import Dict, List, NamedTuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from src.api.http_cache import content_digest, etag_matches
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+# Vite's default output name for bundled files: assets/[name]-[hash].[ext]
+HASHED_ASSET = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+STATIC_MEMORY_FILE_MAX = int(os.getenv("STATIC_MEMORY_FILE_MAX", str(512 * 1024)))
+STATIC_MEMORY_BUDGET = int(os.getenv("STATIC_MEMORY_BUDGET", str(32 * 1024 * 1024)))
+
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = {".js", ".mjs", ".css", ".html", ".json", ".svg", ".txt", ".map", ".xml", ".wasm", ".ico"}
+MIN_COMPRESS_BYTES = 1024
+
+mimetypes.add_type("text/javascript", ".mjs")
+mimetypes.add_type("application/wasm", ".wasm")
+
+
+class Variant(NamedTuple):
+    path: str
+    size: int
+    # None: too large for the memory cache, streamed from disk
+    body: bytes | None
+
+
+class Asset(NamedTuple):
+    media_type: str
+    etag: str
+    cache_control: str
+    # "identity" plus whichever precompressed encodings exist
+    variants: Dict[str, Variant]
+
+
+def _accepted_encodings(header: str | None) -> set:
+    accepted = set()
+    for part in (header or "").split(","):
+        name, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticAssets:
+    def __init__(self, root: str):
+        self.root = root
+        self.assets: Dict[str, Asset] = {}
+        self.memory_bytes = 0
+
+    @property
+    def available(self) -> bool:
+        return "index.html" in self.assets
+
+    def scan(self) -> int:
+        """(Re)build the index from disk; returns the number of files served."""
+        assets: Dict[str, Asset] = {}
+        budget = STATIC_MEMORY_BUDGET
+        for dirpath, _, filenames in os.walk(self.root):
+            names = set(filenames)
+            for filename in filenames:
+                if any(filename.endswith(suffix) and filename[:-len(suffix)] in names for _, suffix in ENCODINGS):
+                    continue
+                path = os.path.join(dirpath, filename)
+                rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+                variants: Dict[str, Variant] = {}
+                for encoding, suffix in (("identity", ""),) + ENCODINGS:
+                    if encoding != "identity" and filename + suffix not in names:
+                        continue
+                    variant_path = path + suffix
+                    size = os.path.getsize(variant_path)
+                    body = None
+                    if size <= STATIC_MEMORY_FILE_MAX and size <= budget:
+                        with open(variant_path, "rb") as f:
+                            body = f.read()
+                        budget -= size
+                    variants[encoding] = Variant(variant_path, size, body)
+
+                identity = variants["identity"]
+                if identity.body is not None:
+                    etag = f'"{content_digest(identity.body)}"'
+                else:
+                    stat = os.stat(path)
+                    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+                media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+                    media_type += "; charset=utf-8"
+                cache_control = IMMUTABLE_CACHE if HASHED_ASSET.match(rel) else REVALIDATE_CACHE
+                assets[rel] = Asset(media_type, etag, cache_control, variants)
+
+        self.assets = assets
+        self.memory_bytes = STATIC_MEMORY_BUDGET - budget
+        return len(assets)
+
+    def response(self, request: Request, path: str) -> Response | None:
+        """The response for `path` (relative to dist), or None if there is no such file."""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control}
+        if len(asset.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if etag_matches(request, asset.etag):
+            return Response(status_code=304, headers=headers)
+
+        accepted = _accepted_encodings(request.headers.get("accept-encoding"))
+        encoding = next((name for name, _ in ENCODINGS if name in accepted and name in asset.variants), "identity")
+        variant = asset.variants[encoding]
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if variant.body is not None:
+            return Response(content=variant.body, media_type=asset.media_type, headers=headers)
+        return FileResponse(variant.path, media_type=asset.media_type, headers=headers)
+
+
+# =========================
+# Build step: precompress dist/
+# =========================
+
+def _write_if_smaller(path: str, source_size: int, data: bytes) -> bool:
+    if len(data) >= source_size:
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def precompress(root: str) -> List[str]:
+    """Write .gz (and .br, if brotli is installed) next to every compressible file that gets smaller."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("ℹ️ brotli not installed; writing gzip variants only")
+
+    written = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE:
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < MIN_COMPRESS_BYTES:
+                continue
+            # mtime=0 keeps the output reproducible across builds
+            if _write_if_smaller(f"{path}.gz", len(data), gzip.compress(data, compresslevel=9, mtime=0)):
+                written.append(f"{path}.gz")
+            if brotli is not None and _write_if_smaller(f"{path}.br", len(data), brotli.compress(data, quality=11)):
+                written.append(f"{path}.br")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompress a frontend build for the API's static file server")
+    parser.add_argument("dist", nargs="?", default=os.path.join("frontend", "dist"))
+    args = parser.parse_args()
+    written = precompress(args.dist)
+    print(f"🗜️ Wrote {len(written)} precompressed files in {args.dist}")
+
+
+if __name__ == "__main__":
+    main()
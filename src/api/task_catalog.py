@@ -0,0 +1,147 @@
+# src/api/task_catalog.py
+"""
+The AI task catalogue as one immutable value: the parsed tasks, the threshold
+index, and the pre-encoded JSON body addressed by its content digest.
+
+It is read from disk when the app starts (or on first use from tools), never
+at import time. TaskCatalogWatcher polls the file's mtime on a background
+thread; an edited file is validated and compiled off the event loop and handed
+over as a complete new catalogue, so requests only ever see the old or the new
+one and never parse anything themselves.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+
+from src.api.http_cache import EncodedPayload, content_digest, encode_json
+from src.api.task_index import TaskIndex
+
+logger = logging.getLogger(__name__)
+
+TASKS_POLL_SEC = float(os.getenv("TASKS_POLL_SEC", "1.0"))
+
+
+class TaskModel(BaseModel):
+    # Extra keys are passed through to the frontend untouched
+    model_config = ConfigDict(extra="allow")
+
+    id: str = Field(min_length=1)
+    shortLabel: str
+    label: str
+    threshold: float = Field(ge=0)
+    lockedImg: str | None = None
+    unlockedImg: str | None = None
+    warningOnly: bool = False
+
+
+_TASKS_ADAPTER = TypeAdapter(List[TaskModel])
+
+
+class TaskCatalogError(ValueError):
+    pass
+
+
+class TaskCatalog(NamedTuple):
+    tasks: Tuple[Dict[str, Any], ...]
+    index: TaskIndex
+    body: bytes
+    version: str
+    payload: EncodedPayload
+
+
+def validate_tasks(raw) -> List[Dict[str, Any]]:
+    """Check the task list shape; returns the original dicts so the encoded body stays byte-identical."""
+    try:
+        models = _TASKS_ADAPTER.validate_python(raw)
+    except ValidationError as e:
+        raise TaskCatalogError(f"invalid task config: {e}") from e
+    ids = [model.id for model in models]
+    if len(set(ids)) != len(ids):
+        raise TaskCatalogError("invalid task config: duplicate task ids")
+    return list(raw)
+
+
+def build_task_catalog(tasks) -> TaskCatalog:
+    tasks = tuple(tasks)
+    body = encode_json(tasks)
+    version = content_digest(body)
+    return TaskCatalog(tasks, TaskIndex(tasks), body, version, EncodedPayload(version, body, f'"tasks-{version}"'))
+
+
+def load_task_catalog(path) -> TaskCatalog:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise TaskCatalogError(f"cannot read {path}: {e}") from e
+    return build_task_catalog(validate_tasks(raw))
+
+
+EMPTY_CATALOG = build_task_catalog(())
+
+
+class TaskCatalogWatcher:
+    """
+    Polls `path` and calls on_change(catalog) from the watcher thread whenever a
+    changed file validates. Invalid edits are reported and the current catalogue stays.
+    """
+
+    def __init__(self, path, on_change: Callable[[TaskCatalog], None], interval: float = TASKS_POLL_SEC):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.version: str | None = None
+        self._stamp = self._file_stamp()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, version: str | None = None):
+        """`version` is the catalogue already installed, so an unchanged file is never re-announced."""
+        self.version = version
+        self._stamp = self._file_stamp()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="task-catalog-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1.0)
+        self._thread = None
+
+    def check(self) -> bool:
+        """One poll; True if a new catalogue was handed to on_change."""
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            catalog = load_task_catalog(self.path)
+        except TaskCatalogError as e:
+            logger.warning("⚠️ Task config not reloaded, keeping version %s: %s", self.version, e)
+            return False
+        if catalog.version == self.version:
+            return False
+        self.version = catalog.version
+        logger.info("🔁 Task config reloaded: version %s (%d tasks)", catalog.version, len(catalog.tasks))
+        self.on_change(catalog)
+        return True
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning("⚠️ Task config watcher error: %s", e)
@@ -0,0 +1,103 @@
+# src/api/task_index.py
+"""
+Precomputed threshold index over the AI task catalogue.
+
+Tasks are sorted by threshold once; the level for an energy value is the
+number of thresholds <= energy, found by bisection. LevelTracker caches the
+current level and the next boundary so the tick loop only does real work when
+energy actually crosses a threshold.
+"""
+from bisect import bisect_right
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+class TaskIndex:
+    __slots__ = ("tasks", "thresholds", "short_labels", "details", "total")
+
+    def __init__(self, tasks: Sequence[Dict[str, Any]]):
+        ordered = sorted(tasks, key=lambda task: float(task["threshold"]))
+        self.tasks: Tuple[Dict[str, Any], ...] = tuple(ordered)
+        self.thresholds: Tuple[float, ...] = tuple(float(task["threshold"]) for task in ordered)
+        self.short_labels: Tuple[str, ...] = tuple(task["shortLabel"] for task in ordered)
+        self.details: Tuple[Dict[str, Any], ...] = tuple(
+            {
+                "id": task["id"],
+                "shortLabel": task["shortLabel"],
+                "label": task["label"],
+                "threshold": task["threshold"],
+            }
+            for task in ordered
+        )
+        self.total = len(ordered)
+
+    def level_for(self, energy: float) -> int:
+        return bisect_right(self.thresholds, energy)
+
+    def unlocked(self, energy: float) -> List[Dict[str, Any]]:
+        return list(self.tasks[:self.level_for(energy)])
+
+    def threshold_at(self, level: int) -> float | None:
+        """Threshold needed to reach `level + 1`, or None when everything is unlocked."""
+        if 0 <= level < self.total:
+            return self.thresholds[level]
+        return None
+
+
+class UnlockEvent:
+    __slots__ = ("level", "task_id", "at")
+
+    def __init__(self, level: int, task_id: str, at: float):
+        self.level = level
+        self.task_id = task_id
+        self.at = at
+
+    def as_dict(self):
+        return {"level": self.level, "task_id": self.task_id, "at": round(self.at, 2)}
+
+
+class LevelTracker:
+    """Follows energy across ticks and emits an event only on upward crossings."""
+
+    def __init__(self, index: TaskIndex):
+        self.index = index
+        self.level = 0
+        self.events: List[UnlockEvent] = []
+        self._lower = float("-inf")
+        self._upper = index.threshold_at(0)
+
+    @property
+    def next_threshold(self) -> float | None:
+        return self._upper
+
+    @property
+    def last_event(self) -> UnlockEvent | None:
+        return self.events[-1] if self.events else None
+
+    def reset(self):
+        self.events.clear()
+        self._move_to(0)
+
+    def set_index(self, index: TaskIndex):
+        """Switch catalogues; the next update() re-derives the level without replaying events."""
+        self.index = index
+        self._move_to(min(self.level, index.total))
+
+    def update(self, energy: float, at: float) -> UnlockEvent | None:
+        upper = self._upper
+        if energy >= self._lower and (upper is None or energy < upper):
+            return None
+
+        previous = self.level
+        self._move_to(self.index.level_for(energy))
+        if self.level <= previous:
+            return None
+
+        task = self.index.tasks[self.level - 1]
+        event = UnlockEvent(self.level, task["id"], at)
+        self.events.append(event)
+        return event
+
+    def _move_to(self, level: int):
+        self.level = level
+        self._lower = self.index.thresholds[level - 1] if level > 0 else float("-inf")
+        self._upper = self.index.threshold_at(level)
@@ -0,0 +1,286 @@
+# src/simulation/simulate_data.py
+"""
+Offline batch simulator: thousands of synthetic riders as NumPy arrays, to see
+when each AI task unlocks and to tune thresholds without riding the bike.
+
+Rider model (fitted from the session summaries in session_logs):
+
+    per rider      mean power, mean cadence and visit length are drawn from a
+                   trivariate log-normal fitted to the real sessions
+    within a ride  cadence wanders as an Ornstein-Uhlenbeck process around the
+                   rider's mean, with a spin-up from standstill; power follows
+                   cadence cubed, as on a fan bike, rescaled to the rider's mean
+
+Energy is the cumulative power integral (same J_PER_KWH as the live pipeline).
+Threshold crossings for all riders and all levels come from one broadcast
+comparison per chunk of riders, interpolated within the tick.
+
+    python -m src.simulation.simulate_data                     # 60 s visit, current thresholds
+    python -m src.simulation.simulate_data --visit fitted      # visit lengths drawn from the fit
+    python -m src.simulation.simulate_data --scale 0.8         # what if every threshold were 20% lower?
+    python -m src.simulation.simulate_data --suggest 0.95,0.85,0.7,0.5,0.3,0.05
+
+Requires numpy.
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+from src.api.ble_runner import DISTANCE_PER_STROKE, SIM_TICK_SECONDS
+from src.api.integration import J_PER_KWH
+from src.api.session_export import compact, load_sessions
+from src.api.task_catalog import load_task_catalog
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+TASKS_FILE = BASE_DIR / "config" / "ai_tasks.json"
+
+# Sessions shorter than this are mostly mis-taps on the start button
+MIN_SESSION_SEC = 10
+MIN_FIT_SESSIONS = 5
+CHUNK_RIDERS = 4096
+PERCENTILES = (10, 50, 90)
+
+
+class RiderModel(NamedTuple):
+    # log(mean power W), log(mean cadence rpm), log(visit length s)
+    log_mean: np.ndarray
+    log_cov: np.ndarray
+    sessions: int
+    # Within-ride cadence fluctuation (std of log cadence) and its correlation time
+    cadence_sigma: float = 0.08
+    correlation_sec: float = 8.0
+    # Time constant of the spin-up from standstill
+    spin_up_sec: float = 3.0
+
+    def describe(self) -> Dict[str, Any]:
+        median = np.exp(self.log_mean)
+        std = np.sqrt(np.diag(self.log_cov))
+        return {
+            "sessions": self.sessions,
+            "median_power_w": round(float(median[0]), 1),
+            "median_cadence_rpm": round(float(median[1]), 1),
+            "median_visit_s": round(float(median[2]), 1),
+            "log_std": [round(float(s), 3) for s in std],
+            "power_cadence_corr": round(float(self.log_cov[0, 1] / (std[0] * std[1])), 3),
+        }
+
+
+# Used when there are too few real sessions to fit
+DEFAULT_MODEL = RiderModel(
+    log_mean=np.log([90.0, 70.0, 90.0]),
+    log_cov=np.array([[0.45, 0.15, 0.10], [0.15, 0.15, 0.05], [0.10, 0.05, 0.80]]),
+    sessions=0,
+)
+
+
+# =========================
+# Fitting
+# =========================
+
+def session_samples(export_dir: str) -> np.ndarray:
+    """
+    (n, 3) mean power, mean stroke rate and length of the real (non-sim)
+    sessions already compacted into `export_dir` (see session_export.compact).
+    Sessions saved before the PM5 stroke rate was stored have none; their
+    cadence is estimated from distance at DISTANCE_PER_STROKE metres a stroke.
+    """
+    sessions = load_sessions(export_dir)
+    keep = (
+        ~sessions["sim_mode"]
+        & (sessions["elapsed_time"] >= MIN_SESSION_SEC)
+        & (sessions["energy_kwh"] > 0)
+        & ((sessions["avg_stroke_rate"] > 0) | (sessions["distance_meters"] > 0))
+    )
+    sessions = sessions[keep]
+    elapsed = sessions["elapsed_time"].astype(np.float64)
+    power = sessions["energy_kwh"] * J_PER_KWH / elapsed
+    stroke_rate = sessions["avg_stroke_rate"].astype(np.float64)
+    legacy = sessions["distance_meters"] / DISTANCE_PER_STROKE / elapsed * 60.0
+    cadence = np.where(stroke_rate > 0, stroke_rate, legacy)
+    return np.column_stack([power, cadence, elapsed])
+
+
+def fit_rider_model(samples: np.ndarray) -> RiderModel:
+    if len(samples) < MIN_FIT_SESSIONS:
+        print(f"⚠️ Only {len(samples)} usable sessions; using the default rider model")
+        return DEFAULT_MODEL
+    logs = np.log(samples)
+    return RiderModel(logs.mean(axis=0), np.cov(logs, rowvar=False), len(samples))
+
+
+# =========================
+# Simulation
+# =========================
+
+def sample_riders(model: RiderModel, riders: int, rng: np.random.Generator) -> np.ndarray:
+    """(riders, 3) mean power, mean cadence, visit length."""
+    return np.exp(rng.multivariate_normal(model.log_mean, model.log_cov, size=riders))
+
+
+def ride_profiles(model: RiderModel, means: np.ndarray, steps: int, dt: float, rng: np.random.Generator):
+    """Power and cadence, shape (riders, steps): sample k covers [k*dt, (k+1)*dt)."""
+    riders = len(means)
+    # Exact OU discretisation; the stationary std is cadence_sigma
+    a = np.exp(-dt / model.correlation_sec)
+    noise = rng.standard_normal((steps, riders)) * (model.cadence_sigma * np.sqrt(1.0 - a * a))
+    x = np.empty((steps, riders))
+    x[0] = rng.standard_normal(riders) * model.cadence_sigma
+    for k in range(1, steps):
+        x[k] = a * x[k - 1] + noise[k]
+    x = x.T
+
+    t = (np.arange(steps) + 0.5) * dt
+    spin_up = 1.0 - np.exp(-t / model.spin_up_sec)
+    cadence = means[:, 1:2] * np.exp(x) * spin_up
+    # Fan load: power ~ cadence^3; exp(3x - 4.5 sigma^2) has mean 1
+    power = means[:, 0:1] * np.exp(3.0 * x - 4.5 * model.cadence_sigma ** 2) * spin_up ** 3
+    return power, cadence
+
+
+def crossing_times(power: np.ndarray, dt: float, thresholds: Sequence[float]) -> np.ndarray:
+    """
+    Seconds until cumulative energy reaches each threshold, shape (riders, levels);
+    NaN where the simulated horizon ends first. Energy is non-decreasing, so the
+    crossing index is just the number of samples still below the threshold.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    riders, steps = power.shape
+    energy = np.zeros((riders, steps + 1))
+    np.cumsum(power * (dt / J_PER_KWH), axis=1, out=energy[:, 1:])
+
+    index = (energy[:, :, None] < thresholds[None, None, :]).sum(axis=1)
+    reached = index <= steps
+    hi = np.minimum(index, steps)
+    lo = np.maximum(hi - 1, 0)
+    e_hi = np.take_along_axis(energy, hi, axis=1)
+    e_lo = np.take_along_axis(energy, lo, axis=1)
+    span = e_hi - e_lo
+    frac = np.divide(thresholds - e_lo, span, out=np.zeros_like(span), where=span > 0)
+    times = np.where(index == 0, 0.0, (lo + frac) * dt)
+    return np.where(reached, times, np.nan)
+
+
+def simulate(
+    model: RiderModel,
+    thresholds: Sequence[float],
+    riders: int,
+    visit: float | None,
+    dt: float = SIM_TICK_SECONDS,
+    horizon: float = 600.0,
+    seed: int | None = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Unlock times (riders, levels) and energy at the end of each visit. `visit`
+    None draws every rider's visit length from the model (capped at `horizon`).
+    """
+    rng = np.random.default_rng(seed)
+    means = sample_riders(model, riders, rng)
+    visits = np.full(riders, float(visit)) if visit is not None else np.minimum(means[:, 2], horizon)
+    steps = int(np.ceil(visits.max() / dt))
+
+    times = np.empty((riders, len(thresholds)))
+    visit_energy = np.empty(riders)
+    for start in range(0, riders, CHUNK_RIDERS):
+        chunk = slice(start, start + CHUNK_RIDERS)
+        power, _ = ride_profiles(model, means[chunk], steps, dt, rng)
+        # Samples after a rider's visit don't count
+        power[np.arange(steps)[None, :] * dt >= visits[chunk, None]] = 0.0
+        times[chunk] = crossing_times(power, dt, thresholds)
+        visit_energy[chunk] = power.sum(axis=1) * dt / J_PER_KWH
+    return {"unlock_s": times, "visit_s": visits, "visit_energy_kwh": visit_energy, "means": means}
+
+
+# =========================
+# Reporting
+# =========================
+
+def unlock_distribution(unlock_s: np.ndarray, tasks: Sequence[Dict[str, Any]], thresholds: Sequence[float],
+                        bins: int = 12, bin_width: float = 5.0) -> List[Dict[str, Any]]:
+    riders = len(unlock_s)
+    report = []
+    edges = np.arange(bins + 1) * bin_width
+    for level, (task, threshold) in enumerate(zip(tasks, thresholds)):
+        times = unlock_s[:, level]
+        reached = times[~np.isnan(times)]
+        entry = {
+            "id": task["id"],
+            "threshold_kwh": round(float(threshold), 6),
+            "reached_pct": round(100.0 * len(reached) / riders, 1),
+        }
+        if len(reached):
+            for p, value in zip(PERCENTILES, np.percentile(reached, PERCENTILES)):
+                entry[f"p{p}_s"] = round(float(value), 1)
+            entry["histogram_pct"] = [round(100.0 * c / riders, 1) for c in np.histogram(reached, edges)[0]]
+        report.append(entry)
+    return report
+
+
+def suggest_thresholds(visit_energy: np.ndarray, reached_fractions: Sequence[float]) -> List[float]:
+    """Thresholds such that level k is reached within the visit by reached_fractions[k] of riders."""
+    return [round(float(np.quantile(visit_energy, 1.0 - f)), 5) for f in reached_fractions]
+
+
+def _print_table(report: List[Dict[str, Any]]):
+    print(f"{'level':8} {'kWh':>9} {'reached':>8} {'p10 s':>7} {'p50 s':>7} {'p90 s':>7}")
+    for entry in report:
+        cells = [f"{entry.get(f'p{p}_s', float('nan')):7.1f}" for p in PERCENTILES]
+        print(f"{entry['id']:8} {entry['threshold_kwh']:9.4f} {entry['reached_pct']:7.1f}% {' '.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-simulate riders and AI task unlock times")
+    parser.add_argument("--riders", type=int, default=10000)
+    parser.add_argument("--visit", default="60", help="visit length in seconds, or 'fitted' to draw it per rider")
+    parser.add_argument("--dt", type=float, default=SIM_TICK_SECONDS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--log-dir", default="session_logs")
+    parser.add_argument("--no-compact", action="store_true",
+                        help="fit on <log-dir>/columnar as it is, without compacting new session files first")
+    parser.add_argument("--tasks", default=str(TASKS_FILE))
+    parser.add_argument("--thresholds", help="comma-separated kWh thresholds to try instead of the task config")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every threshold")
+    parser.add_argument("--suggest", metavar="FRACTIONS",
+                        help="comma-separated share of riders that should reach each level within the visit")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    tasks = list(load_task_catalog(args.tasks).index.tasks)
+    if args.thresholds:
+        thresholds = [float(v) for v in args.thresholds.split(",")]
+        tasks = tasks[:len(thresholds)] + [{"id": f"level{i + 1}"} for i in range(len(tasks), len(thresholds))]
+    else:
+        thresholds = [float(task["threshold"]) for task in tasks]
+    thresholds = [t * args.scale for t in thresholds]
+
+    export_dir = os.path.join(args.log_dir, "columnar")
+    if not args.no_compact:
+        # Incremental: only session files newer than the last compaction are parsed
+        compact(args.log_dir, export_dir)
+    model = fit_rider_model(session_samples(export_dir))
+    visit = None if args.visit == "fitted" else float(args.visit)
+    result = simulate(model, thresholds, args.riders, visit, dt=args.dt, seed=args.seed)
+    report = {
+        "model": model.describe(),
+        "riders": args.riders,
+        "visit_s": args.visit,
+        "levels": unlock_distribution(result["unlock_s"], tasks, thresholds),
+    }
+    if args.suggest:
+        fractions = [float(v) for v in args.suggest.split(",")]
+        report["suggested_thresholds"] = suggest_thresholds(result["visit_energy_kwh"], fractions)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(json.dumps(report["model"]))
+    _print_table(report["levels"])
+    if args.suggest:
+        print(f"Suggested thresholds (kWh): {report['suggested_thresholds']}")
+
+
+if __name__ == "__main__":
+    main()
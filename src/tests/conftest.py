@@ -0,0 +1,8 @@
+# src/tests/conftest.py
+"""CI runs `pytest src/tests/` from the repository root: make `src.api` importable."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,30 @@
+# src/tests/test_api.py
+"""
+Drives the simulation endpoints through FastAPI's TestClient against the local
+acquisition core. The client is not used as a context manager, so the lifespan
+(BLE loop, session writer, log listener) never starts.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import ble_runner, main
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "SIM_MODE", True)
+    yield TestClient(main.app)
+    ble_runner.set_simulation_profile("constant")
+
+
+def test_set_profile(client):
+    response = client.post("/test/profile", params={"name": "ramp"})
+    assert response.status_code == 200
+    assert response.json()["profile"] == "ramp"
+    assert ble_runner.get_simulation_status()["profile"] == "ramp"
+
+
+def test_set_profile_rejects_unknown_profile(client):
+    response = client.post("/test/profile", params={"name": "sprint"})
+    assert response.status_code == 422
+    assert ble_runner.get_simulation_status()["profile"] == "constant"
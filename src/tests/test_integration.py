@@ -0,0 +1,123 @@
+# src/tests/test_integration.py
+"""
+Replays synthesized PM5 traces through the real notification handler and tick
+loop (src/api/replay.py) and checks the session energy against the kWh worked
+out by hand from the hold/decay model in src/api/integration.py.
+"""
+import asyncio
+
+import pytest
+
+from src.api import ble_runner
+from src.api.integration import J_PER_KWH
+from src.api.replay import REPLAY_ADDRESS, VirtualClock, build_power_packet, replay, synthesize_trace
+
+HOLD = ble_runner.POWER_HOLD_SEC
+DECAY = ble_runner.POWER_DECAY_WINDOW
+
+
+def constant_ride(start: float, duration: float, watts: float, cadence: float = 100.0):
+    """
+    Strokes every 60/cadence s from `start`, exactly `watts` each (no jitter).
+    At 100 SPM the strokes are 0.6 s apart, inside the hold, so power is flat
+    between them.
+    """
+    return [(start + t, payload) for t, payload in synthesize_trace(duration, watts, cadence, jitter=0.0)]
+
+
+def riding_seconds(samples) -> float:
+    return samples[-1][0] - samples[0][0]
+
+
+def tail_joules(watts: float) -> float:
+    # After the last stroke: held for HOLD seconds, then a linear ramp to 0 over DECAY
+    return watts * (HOLD + DECAY / 2.0)
+
+
+def run(samples) -> dict:
+    return asyncio.run(replay(samples))
+
+
+def test_constant_power():
+    samples = constant_ride(0.0, 600.0, 200.0)
+    result = run(samples)
+    expected = (200.0 * riding_seconds(samples) + tail_joules(200.0)) / J_PER_KWH
+    assert result["energy_kwh"] == pytest.approx(expected, rel=1e-6)
+
+
+def test_gap_then_resume():
+    # Two 120 s bouts 60 s apart: the gap is far longer than hold + decay, so each bout
+    # ends in a full hold/decay tail and nothing accrues in between.
+    first = constant_ride(0.0, 120.0, 150.0)
+    second = constant_ride(180.0, 120.0, 250.0)
+    result = run(first + second)
+    expected = (
+        150.0 * riding_seconds(first) + tail_joules(150.0) + 250.0 * riding_seconds(second) + tail_joules(250.0)
+    ) / J_PER_KWH
+    assert result["energy_kwh"] == pytest.approx(expected, rel=1e-6)
+
+
+def test_short_pause_is_held_then_decayed():
+    # A pause shorter than hold + decay: the previous stroke's power is held, decays
+    # part-way, and drops to the new stroke's value when it arrives.
+    pause = HOLD + DECAY / 2.0
+    first = constant_ride(0.0, 10.0, 100.0)
+    second = constant_ride(first[-1][0] + pause, 10.0, 100.0)
+    result = run(first + second)
+
+    y = pause - HOLD
+    pause_joules = 100.0 * HOLD + 100.0 * (y - y * y / (2.0 * DECAY))
+    expected = (
+        100.0 * riding_seconds(first) + pause_joules + 100.0 * riding_seconds(second) + tail_joules(100.0)
+    ) / J_PER_KWH
+    assert result["energy_kwh"] == pytest.approx(expected, rel=1e-6)
+
+
+def test_replay_removes_its_device():
+    devices_before = dict(ble_runner.devices)
+    run(constant_ride(0.0, 5.0, 100.0))
+    assert ble_runner.devices == devices_before
+    assert REPLAY_ADDRESS not in ble_runner._device_ids_by_address
+
+
+def test_reference_is_independent_of_the_integrator():
+    samples = constant_ride(0.0, 60.0, 200.0)
+    result = run(samples)
+    # The trapezoid reference has no hold/decay tail, so the error is exactly that tail
+    assert result["reference_energy_kwh"] == pytest.approx(200.0 * riding_seconds(samples) / J_PER_KWH)
+    assert result["energy_error"] == pytest.approx(tail_joules(200.0) / J_PER_KWH, rel=1e-6)
+
+
+def test_reconnect_mid_session_keeps_totals():
+    clock = VirtualClock()
+    ble_runner.set_clock(clock.now)
+    device = ble_runner.ErgDevice("erg-test")
+    try:
+        device.on_connect(0.0)
+        ble_runner.ble_state["session_active"] = True
+        for i in range(120):
+            clock.advance_to(i * 0.5)
+            device.notification_handler(None, build_power_packet(200, clock.now()))
+            device.tick(clock.now(), 0.5, True)
+        before = device.state["energy_kwh"]
+        distance = device.state["distance"] = 250.0
+
+        device.on_disconnect()
+        device.on_connect(65.0)
+        device.tick(65.0, 5.5, True)
+        assert device.state["energy_kwh"] >= before > 0
+        assert device.state["distance"] == distance
+    finally:
+        ble_runner.ble_state["session_active"] = False
+        ble_runner.set_clock(None)
+
+
+def test_truncated_stroke_power_packet_is_ignored():
+    device = ble_runner.ErgDevice("erg-test")
+    device.on_connect(0.0)
+    packet = build_power_packet(150, 1.0)
+    # Cut inside the elapsed field: the stroke power is missing entirely
+    device.notification_handler(None, packet[:3])
+    assert device.integrator.last_t is None
+    device.notification_handler(None, packet)
+    assert device.integrator.last_power == 150.0
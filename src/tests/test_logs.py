@@ -0,0 +1,40 @@
+# src/tests/test_logs.py
+"""RepeatFilter (src/api/logs.py) on hand-built records, without the queue listener."""
+import logging
+import time
+
+from src.api.logs import RepeatFilter
+
+
+def record(msg: str, *args, **extra) -> logging.LogRecord:
+    rec = logging.LogRecord("src.api.test", logging.INFO, __file__, 1, msg, args, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def test_distinct_messages_from_one_template_pass():
+    repeats = RepeatFilter(window=60.0)
+    assert repeats.filter(record("🔗 Connected to PM5 BLE (%s)", "pm5-a"))
+    assert repeats.filter(record("🔗 Connected to PM5 BLE (%s)", "pm5-b"))
+
+
+def test_identical_message_is_folded():
+    repeats = RepeatFilter(window=60.0)
+    assert repeats.filter(record("🔍 Scanning for PM5..."))
+    assert not repeats.filter(record("🔍 Scanning for PM5..."))
+
+
+def test_fold_opt_in_keys_on_template():
+    repeats = RepeatFilter(window=60.0)
+    assert repeats.filter(record("⏳ PM5 not found. Retrying in %.1fs...", 2.0, fold=True))
+    assert not repeats.filter(record("⏳ PM5 not found. Retrying in %.1fs...", 4.0, fold=True))
+
+
+def test_suppressed_count_after_window():
+    repeats = RepeatFilter(window=0.05)
+    assert repeats.filter(record("🔍 Scanning for PM5..."))
+    assert not repeats.filter(record("🔍 Scanning for PM5..."))
+    time.sleep(0.06)
+    rec = record("🔍 Scanning for PM5...")
+    assert repeats.filter(rec)
+    assert rec.suppressed == 1
@@ -0,0 +1,19 @@
+# src/tests/test_session_stress.py
+"""
+The session start/stop stress test (benchmarks/session_stress.py) at a size
+CI can afford. It runs in a child process with its own cooldown setting.
+"""
+from benchmarks.session_stress import run_session_stress
+
+CYCLES = 200
+
+
+def test_session_start_stop_storm():
+    results = run_session_stress(cycles=CYCLES, cooldown=0.3)
+
+    assert results["failures"] == []
+    assert results["ok"]
+    assert results["persisted"] == CYCLES
+    assert results["max_pending_cooldowns"] <= 1
+    assert results["tasks_after"] <= results["tasks_before"]
+    assert results["trace_pairs"] == CYCLES + 1
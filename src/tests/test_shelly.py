@@ -0,0 +1,125 @@
+# src/tests/test_shelly.py
+"""
+ShellyClient and PowerCycle against scripts/fake_shelly.py, a local relay that
+models switching delay and the load draining after power-off.
+"""
+import asyncio
+
+from scripts.fake_shelly import FakeRelay, start_fake_shelly
+from src.api import ble_runner, shelly
+from src.api.shelly import PowerCycle, ShellyClient
+
+# Fast timings so each cycle takes well under a second
+FAST = {"poll": 0.01, "switch_timeout": 0.5, "min_off": 0.1, "max_off": 2.0, "probe_timeout": 0.0}
+
+
+def probe(*answers: bool):
+    """Advertising probe returning `answers` in turn (the last one repeats)."""
+    calls = []
+
+    async def advertising(timeout: float) -> bool:
+        calls.append(timeout)
+        return answers[min(len(calls), len(answers)) - 1]
+
+    advertising.calls = calls
+    return advertising
+
+
+async def run_cycle(relay: FakeRelay, advertising, force: bool = False, **timings):
+    server = await start_fake_shelly(relay)
+    port = server.sockets[0].getsockname()[1]
+    client = ShellyClient("127.0.0.1", port, timeout=1.0)
+    try:
+        cycle = PowerCycle(client, relay.relay_id, advertising, **{**FAST, **timings})
+        ok = await cycle.run(force=force)
+        return ok, cycle, client
+    finally:
+        client.close()
+        server.close()
+        await server.wait_closed()
+
+
+def states(cycle: PowerCycle):
+    return [state for state, _ in cycle.history]
+
+
+def test_power_cycle_success_reuses_one_connection():
+    relay = FakeRelay(switch_delay=0.05, drain_sec=0.2)
+    ok, cycle, client = asyncio.run(run_cycle(relay, probe(False, True)))
+
+    assert ok and cycle.state == shelly.DONE and cycle.error is None
+    assert states(cycle) == [
+        shelly.CHECKING, shelly.POWERING_OFF, shelly.OFF, shelly.POWERING_ON, shelly.WAITING_ADVERTISEMENT, shelly.DONE,
+    ]
+    assert [change["on"] for change in relay.history] == [False, True]
+    # Every status poll and switch command went over the same keep-alive connection
+    assert client.connections_opened == 1
+    assert relay.connections == 1
+    assert relay.requests > 4
+
+
+def test_relay_that_never_switches_fails():
+    relay = FakeRelay(switch_delay=60.0)
+    ok, cycle, _ = asyncio.run(run_cycle(relay, probe(False), switch_timeout=0.2))
+
+    assert not ok and cycle.state == shelly.FAILED
+    assert states(cycle) == [shelly.CHECKING, shelly.POWERING_OFF, shelly.FAILED]
+    assert "output=False" in cycle.error
+
+
+def test_already_advertising_is_left_alone():
+    relay = FakeRelay()
+    advertising = probe(True)
+    ok, cycle, _ = asyncio.run(run_cycle(relay, advertising))
+
+    assert ok and states(cycle) == [shelly.CHECKING, shelly.DONE]
+    assert relay.history == []
+    assert len(advertising.calls) == 1
+
+
+def test_dropped_keepalive_connection_is_retried():
+    async def scenario():
+        relay = FakeRelay()
+        server = await start_fake_shelly(relay, idle_timeout=0.05)
+        client = ShellyClient("127.0.0.1", server.sockets[0].getsockname()[1], timeout=1.0)
+        try:
+            await client.get_status(1)
+            # The relay closes the idle connection; the next request reconnects transparently
+            await asyncio.sleep(0.2)
+            status = await client.get_status(1)
+            return status, client.connections_opened
+        finally:
+            client.close()
+            server.close()
+            await server.wait_closed()
+
+    status, opened = asyncio.run(scenario())
+    assert status["output"] is True
+    assert opened == 2
+
+
+def test_read_response_chunked():
+    async def parse(raw: bytes):
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await shelly._read_response(reader)
+
+    raw = (
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\nContent-Type: application/json\r\n\r\n"
+        b"7\r\n{\"id\": \r\n3;ext=1\r\n1, \r\n" b"c\r\n\"output\": 1}\r\n0\r\nX-Trailer: y\r\n\r\n"
+    )
+    status, headers, body = asyncio.run(parse(raw))
+    assert status == 200
+    assert headers["transfer-encoding"] == "chunked"
+    assert body == b'{"id": 1, "output": 1}'
+
+    status, headers, body = asyncio.run(parse(b"HTTP/1.1 404 Not Found\r\nContent-Length: 2\r\n\r\n{}"))
+    assert (status, body) == (404, b"{}")
+
+
+def test_wake_without_host_skips_power_cycle(monkeypatch):
+    monkeypatch.setattr(ble_runner, "SHELLY_HOST", "")
+    monkeypatch.setattr(ble_runner, "_shelly", None)
+    assert asyncio.run(ble_runner.wake_pm5(force=True)) is False
+    assert ble_runner._shelly is None
@@ -0,0 +1,52 @@
+# src/tests/test_simulate_data.py
+"""
+Fits the offline simulator's rider model on session logs compacted through
+src/api/session_export.py, including logs saved before the PM5 stroke rate was
+stored.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from src.api.integration import J_PER_KWH
+from src.api.session_export import compact
+from src.simulation.simulate_data import DISTANCE_PER_STROKE, fit_rider_model, session_samples
+
+
+def write_session(log_dir, index: int, elapsed: int, distance: int, energy_kwh: float, **extra):
+    snapshot = {
+        "elapsed_time": elapsed,
+        "distance_meters": distance,
+        "energy_kwh": energy_kwh,
+        "unlocked_count": 1,
+        "total_tasks": 6,
+        "sim_mode": False,
+        "stopped_at": f"2026-05-05T17:{index:02d}:00.000000",
+        **extra,
+    }
+    path = log_dir / f"session_2026-05-05_17-{index:02d}-00.json"
+    path.write_text(json.dumps(snapshot), encoding="utf-8")
+
+
+def test_fit_on_legacy_logs(tmp_path):
+    log_dir, export_dir = tmp_path / "logs", tmp_path / "export"
+    log_dir.mkdir()
+    rides = [(60 + 30 * i, 300 + 90 * i, 0.002 + 0.001 * i) for i in range(6)]
+    for i, (elapsed, distance, energy) in enumerate(rides):
+        write_session(log_dir, i, elapsed, distance, energy)
+    # One current-format log: its stored stroke rate wins over the distance estimate
+    write_session(log_dir, 10, 120, 600, 0.004, avg_stroke_rate=42.0)
+    compact(str(log_dir), str(export_dir))
+
+    samples = session_samples(str(export_dir))
+    assert len(samples) == len(rides) + 1
+    for (elapsed, distance, energy), (power, cadence, length) in zip(rides, samples):
+        assert length == elapsed
+        assert power == pytest.approx(energy * J_PER_KWH / elapsed)
+        assert cadence == pytest.approx(distance / DISTANCE_PER_STROKE / elapsed * 60.0)
+    assert samples[-1][1] == pytest.approx(42.0)
+
+    model = fit_rider_model(samples)
+    assert model.sessions == len(samples)
+    assert np.all(np.isfinite(model.log_cov))
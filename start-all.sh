@@ -12,6 +12,7 @@ cd /home/pranish/ai-academia-bikeerg
 
 # Clean up old processes
 pkill -f "uvicorn src.api.main:app" 2>/dev/null
+pkill -f "src.api.acquisition" 2>/dev/null
 pkill -f "vite" 2>/dev/null
 pkill -f "npm run dev" 2>/dev/null
 sleep 2
@@ -19,40 +20,57 @@ sleep 2
 echo "🐍 Activating Python virtual environment..."
 source venv/bin/activate
 
-echo "🚀 Starting FastAPI backend..."
+# API_WORKERS>1: BLE acquisition runs in its own process, the API workers read its shared state
+API_WORKERS=${API_WORKERS:-1}
+
+# Application logs: JSON lines in logs/, rotated at 5 MB or daily and gzipped (see src/api/logs.py).
+# nohup output below only catches what bypasses logging (crashes, uvicorn startup).
+LOG_NAME='{process}.log'
+[[ "$API_WORKERS" -gt 1 ]] && LOG_NAME='{process}-{pid}.log'
+export LOG_FILE=${LOG_FILE:-/home/pranish/ai-academia-bikeerg/logs/$LOG_NAME}
+export LOG_CONSOLE=${LOG_CONSOLE:-0}
+# Shelly relay powering the PM5; set SHELLY_HOST= (empty) on a kiosk without one
+export SHELLY_HOST=${SHELLY_HOST-192.168.0.188}
+if [[ "$API_WORKERS" -gt 1 ]]; then
+  echo "📡 Starting acquisition daemon..."
+  nohup /home/pranish/ai-academia-bikeerg/venv/bin/python -m src.api.acquisition \
+    > /home/pranish/ai-academia-bikeerg/acquisition.log 2>&1 &
+  export ACQUISITION=daemon
+fi
+
+# Production: the backend serves frontend/dist itself; rebuild only when sources changed
+if [[ "$FRONTEND_DEV" != "1" ]]; then
+  DIST_INDEX=/home/pranish/ai-academia-bikeerg/frontend/dist/index.html
+  if [[ ! -f "$DIST_INDEX" ]] || [[ -n "$(find frontend/src frontend/public frontend/index.html \
+      frontend/package.json frontend/vite.config.js -newer "$DIST_INDEX" -print -quit)" ]]; then
+    echo "🏗️ Building frontend..."
+    (cd frontend && npm run build) && python -m src.api.static_assets frontend/dist
+  fi
+fi
+
+echo "🚀 Starting FastAPI backend ($API_WORKERS worker(s))..."
 nohup /home/pranish/ai-academia-bikeerg/venv/bin/uvicorn \
-  src.api.main:app --host 0.0.0.0 --port 8080 \
+  src.api.main:app --host 0.0.0.0 --port 8080 --workers "$API_WORKERS" \
   > /home/pranish/ai-academia-bikeerg/backend.log 2>&1 &
 
-echo "🌐 Starting Vite frontend..."
-cd /home/pranish/ai-academia-bikeerg/frontend
-nohup npm run dev \
-  > /home/pranish/ai-academia-bikeerg/frontend/frontend.log 2>&1 &
+if [[ "$FRONTEND_DEV" == "1" ]]; then
+  echo "🌐 Starting Vite dev server (FRONTEND_DEV=1)..."
+  cd /home/pranish/ai-academia-bikeerg/frontend
+  nohup npm run dev \
+    > /home/pranish/ai-academia-bikeerg/frontend/frontend.log 2>&1 &
+  cd /home/pranish/ai-academia-bikeerg
+  KIOSK_URL=http://localhost:5173
+else
+  KIOSK_URL=http://localhost:8080
+fi
 
-# Wait for frontend first time
-echo "⏳ Waiting for frontend to become available at http://localhost:5173 ..."
-until curl -s http://localhost:5173 > /dev/null; do
-  echo "… frontend not up yet, retrying..."
-  sleep 1
+echo "⏳ Waiting for $KIOSK_URL ..."
+until curl -s "$KIOSK_URL" > /dev/null; do
+  sleep 0.2
 done
 echo "✅ Frontend is now reachable."
 
-# Wake PM5
-echo "⚡ Triggering PM5 wake via Shelly..."
-/home/pranish/ai-academia-bikeerg/venv/bin/python \
-  /home/pranish/ai-academia-bikeerg/scripts/shelly_wake_pm5.py
-
-echo "⏳ Waiting 6 seconds for PM5 to boot and begin BLE advertising..."
-sleep 6
-echo "✅ PM5 wake sequence completed."
-
-# Re-check frontend after the long Shelly delay
-echo "🔁 Re-checking frontend availability after Shelly wake..."
-until curl -s http://localhost:5173 > /dev/null; do
-  echo "… frontend not reachable after Shelly wake, retrying..."
-  sleep 1
-done
-echo "✅ Frontend still reachable."
+# The backend wakes the PM5 itself (Shelly power cycle, only if it isn't advertising)
 
 if [[ "$SKIP_CHROMIUM" == "1" ]]; then
   echo "🖥️ SKIP_CHROMIUM=1 set → not launching browser here."
@@ -60,7 +78,7 @@ if [[ "$SKIP_CHROMIUM" == "1" ]]; then
 fi
 
 echo "🖥️ Launching Chromium browser in kiosk mode..."
-chromium-browser --kiosk http://localhost:5173 \
+chromium-browser --kiosk "$KIOSK_URL" \
   --disable-background-networking \
   --disable-component-update \
   --disable-default-apps \